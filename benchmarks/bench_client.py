@@ -0,0 +1,221 @@
+"""
+Client overhead benchmarks against a local stub XCover server, plus micro-benchmarks of the
+signing and encoding helpers. Results are written as JSON.
+
+    python -m benchmarks.bench_client [--seconds 2] [--transport urllib3] [--output results.json]
+    python -m benchmarks.bench_client --compare baseline.json
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import platform
+import statistics
+import sys
+import time
+from decimal import Decimal
+from importlib.metadata import PackageNotFoundError, version
+
+import requests
+
+from xcover import XCover, XCoverConfig
+from xcover.auth import XCoverAuth
+from xcover.encoder import JSONEncoder
+from xcover.utils import http_date
+
+from .stub_server import serve
+
+PARTNER_CODE = "LLODT"
+BOOKING_ID = "VGU8R-JVDNL-INS"
+
+QUOTE_PAYLOAD = {
+    "request": [
+        {
+            "policy_type": "travel_cancellation",
+            "policy_currency": "GBP",
+            "policy_start_date": datetime.datetime(2025, 5, 1, tzinfo=datetime.timezone.utc),
+            "total_tour_price": Decimal("1250.00"),
+            "trip_start_date": datetime.date(2025, 5, 1),
+            "trip_end_date": datetime.date(2025, 5, 15),
+            "travellers": [
+                {"first_name": "Ada", "last_name": "Lovelace", "age": 36},
+                {"first_name": "Alan", "last_name": "Turing", "age": 41},
+            ],
+            "destinations": ["FR", "IT", "ES"],
+        }
+    ],
+    "currency": "GBP",
+    "customer_country": "GB",
+    "customer_language": "en",
+    "partner_transaction_id": "BENCH-1",
+}
+
+BOOKING_PAYLOAD = {
+    **QUOTE_PAYLOAD,
+    "policyholder": {
+        "first_name": "Ada",
+        "last_name": "Lovelace",
+        "email": "ada@example.com",
+        "country": "GB",
+    },
+    "payment_method": "PAYMENT_METHOD_PARTNER",
+}
+
+
+def measure(name: str, kind: str, func, seconds: float, warmup: int = 10) -> dict:
+    """Call `func` repeatedly for `seconds` and summarise latency, throughput and CPU time."""
+    for _ in range(warmup):
+        func()
+
+    latencies = []
+    clock = time.perf_counter
+    cpu_started = time.process_time()
+    started = clock()
+    deadline = started + seconds
+    now = started
+    while now < deadline:
+        func()
+        finished = clock()
+        latencies.append(finished - now)
+        now = finished
+    elapsed = now - started
+    cpu = time.process_time() - cpu_started
+
+    calls = len(latencies)
+    percentiles = statistics.quantiles(latencies, n=100) if calls > 1 else latencies * 99
+    return {
+        "name": name,
+        "kind": kind,
+        "calls": calls,
+        "seconds": round(elapsed, 6),
+        "calls_per_second": round(calls / elapsed, 2),
+        "p50_us": round(percentiles[49] * 1e6, 3),
+        "p95_us": round(percentiles[94] * 1e6, 3),
+        "p99_us": round(percentiles[98] * 1e6, 3),
+        "cpu_us_per_call": round(cpu / calls * 1e6, 3),
+    }
+
+
+def client_benchmarks(base_url: str, seconds: float, transport: str) -> list:
+    config = XCoverConfig(
+        base_url=base_url,
+        partner_code=PARTNER_CODE,
+        auth_api_key="api_key",
+        auth_api_secret="api_secret",
+        transport=transport,
+    )
+    with XCover(config) as client:
+        scenarios = {
+            "create_quote": lambda: client.create_quote(QUOTE_PAYLOAD),
+            "instant_booking": lambda: client.instant_booking(BOOKING_PAYLOAD),
+            "get_booking": lambda: client.get_booking(BOOKING_ID),
+            "list_bookings": lambda: client.list_bookings(params={"limit": 20}),
+            "call": lambda: client.call("GET", f"partners/{PARTNER_CODE}/bookings/{BOOKING_ID}/"),
+        }
+        return [measure(name, "client", func, seconds) for name, func in scenarios.items()]
+
+
+def micro_benchmarks(seconds: float) -> list:
+    config = XCoverConfig(
+        auth_api_key="api_key", auth_api_secret="api_secret", headers="(request-target) date"
+    )
+    auth_config = config.auth_config
+    auth = XCoverAuth(auth_config)
+    request = requests.Request(
+        "POST", f"https://api.xcover.com/xcover/partners/{PARTNER_CODE}/bookings/{BOOKING_ID}/"
+    ).prepare()
+    auth(request)
+
+    def sign():
+        del request.headers["date"]
+        auth(request)
+
+    scenarios = {
+        "XCoverAuth.__call__": sign,
+        "AuthConfig.build_string_to_sign": lambda: auth_config.build_string_to_sign(request),
+        "JSONEncoder": lambda: json.dumps(BOOKING_PAYLOAD, cls=JSONEncoder),
+        "http_date": http_date,
+    }
+    return [measure(name, "micro", func, seconds) for name, func in scenarios.items()]
+
+
+def package_version() -> str:
+    try:
+        return version("xcover-python")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def run(seconds: float, transport: str = "requests") -> dict:
+    # The stub server runs in its own process so that its CPU time isn't charged to the client
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    server = context.Process(target=serve, kwargs={"ready": ready}, daemon=True)
+    server.start()
+    try:
+        port = ready.get(timeout=30)
+        results = client_benchmarks(f"http://127.0.0.1:{port}/", seconds, transport)
+    finally:
+        server.terminate()
+        server.join()
+
+    return {
+        "version": package_version(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "seconds_per_benchmark": seconds,
+        "transport": transport,
+        "results": results + micro_benchmarks(seconds),
+    }
+
+
+def print_summary(report: dict, baseline: dict = None, file=sys.stderr):
+    baseline_rates = {
+        result["name"]: result["calls_per_second"]
+        for result in (baseline or {}).get("results", ())
+    }
+    print(
+        f"{'benchmark':<34} {'calls/s':>12} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} "
+        f"{'cpu us':>10} {'vs base':>8}",
+        file=file,
+    )
+    for result in report["results"]:
+        base_rate = baseline_rates.get(result["name"])
+        change = f"{result['calls_per_second'] / base_rate:>7.2f}x" if base_rate else f"{'-':>8}"
+        print(
+            f"{result['name']:<34} {result['calls_per_second']:>12,.0f} {result['p50_us']:>10,.1f} "
+            f"{result['p95_us']:>10,.1f} {result['p99_us']:>10,.1f} "
+            f"{result['cpu_us_per_call']:>10,.1f} {change}",
+            file=file,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0, help="duration of each benchmark")
+    parser.add_argument("--transport", default="requests", help="XCoverConfig.transport to use")
+    parser.add_argument("--output", default="-", help="JSON results file, `-` for stdout")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    args = parser.parse_args()
+
+    report = run(args.seconds, args.transport)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    print_summary(report, baseline)
+
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Import time of the client, measured in fresh interpreters with `-X importtime`, and a check
+that the HTTP stack is only imported when the first request is sent.
+
+    python -m benchmarks.bench_import [--runs 10] [--max-ms 60] [--output results.json]
+
+Exits with status 1 when a scenario imports a deferred module or its median time exceeds
+`--max-ms`, so it can guard against regressions in CI.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    "import xcover": "import xcover",
+    "from xcover import XCover": "from xcover import XCover, XCoverConfig",
+    "XCover()": "from xcover import XCover, XCoverConfig; XCover(XCoverConfig())",
+}
+
+# Imported on first request (or first use of the feature needing them) only
+DEFERRED_MODULES = ("requests", "urllib3", "asyncio", "httpx", "sqlite3")
+
+PROBE = """
+import sys
+{statement}
+print(" ".join(name for name in {deferred!r} if name in sys.modules))
+"""
+
+
+def parse_importtime(stderr: str) -> dict:
+    """`{module: (depth, cumulative microseconds)}` from `-X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            modules[name.strip()] = (depth, int(cumulative))
+    return modules
+
+
+def measure(statement: str, runs: int) -> dict:
+    totals, modules, imported = [], {}, set()
+    code = PROBE.format(statement=statement, deferred=DEFERRED_MODULES)
+    for _ in range(runs):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        modules = parse_importtime(process.stderr)
+        # Modules imported at depth 0 include the time of everything they imported first
+        totals.append(
+            sum(
+                us
+                for name, (depth, us) in modules.items()
+                if not depth and name.startswith("xcover")
+            )
+        )
+        imported.update(process.stdout.split())
+
+    xcover_modules = {name: us for name, (_, us) in modules.items() if name.startswith("xcover.")}
+    return {
+        "median_ms": statistics.median(totals) / 1000,
+        "min_ms": min(totals) / 1000,
+        "deferred_imported": sorted(imported),
+        "slowest_modules_ms": {
+            name: us / 1000
+            for name, us in sorted(xcover_modules.items(), key=lambda item: -item[1])[:5]
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters per scenario")
+    parser.add_argument("--max-ms", type=float, help="fail when a median exceeds this")
+    parser.add_argument("--output", default="-", help="JSON results file, `-` for stdout")
+    args = parser.parse_args()
+
+    report = {name: measure(statement, args.runs) for name, statement in SCENARIOS.items()}
+
+    failures = []
+    for name, result in report.items():
+        print(
+            f"{name:28} median {result['median_ms']:7.1f}ms  min {result['min_ms']:7.1f}ms",
+            file=sys.stderr,
+        )
+        if result["deferred_imported"]:
+            failures.append(f"{name} imports {', '.join(result['deferred_imported'])}")
+        if args.max_ms is not None and result["median_ms"] > args.max_ms:
+            failures.append(f"{name} takes {result['median_ms']:.1f}ms > {args.max_ms}ms")
+
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
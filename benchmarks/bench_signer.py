@@ -0,0 +1,87 @@
+"""
+Signatures/second of the per-call signing path used before `Signer` was introduced
+versus the compiled `Signer` held by each client.
+
+    python -m benchmarks.bench_signer [--seconds 1]
+"""
+
+import argparse
+import base64
+import hmac
+import time
+from urllib.parse import quote
+
+import requests
+
+from xcover.auth import XCoverAuth
+from xcover.config import SignatureAlgorithm, XCoverConfig
+from xcover.utils import http_date
+
+
+def legacy_sign(config: XCoverConfig, request: requests.PreparedRequest):
+    """Signing as done on every call before compiled signers: config, auth and HMAC per call."""
+    auth_config = config.auth_config
+    if not request.headers.get("date"):
+        request.headers["date"] = http_date()
+
+    signature = hmac.new(
+        key=auth_config.api_secret.encode("utf-8", "strict"),
+        msg=auth_config.build_string_to_sign(request).encode("utf-8", "strict"),
+        digestmod=auth_config.hash_function,
+    ).digest()
+    signature = quote(base64.b64encode(signature), safe="")
+    request.headers["authorization"] = (
+        f'Signature keyId="{auth_config.api_key}",algorithm="{auth_config.algorithm.value}",'
+        f'headers="{auth_config.headers}",signature="{signature}"'
+    )
+
+
+def rate(func, seconds: float) -> float:
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(1000):
+            func()
+        count += 1000
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    request = requests.Request(
+        "POST", "https://api.xcover.com/xcover/partners/LLODT/bookings/ABCDE-FGHIJ-INS/confirm"
+    ).prepare()
+
+    print(f"{'algorithm':<12} {'before/s':>12} {'after/s':>12} {'speedup':>8}")
+    for algorithm in SignatureAlgorithm:
+        config = XCoverConfig(
+            auth_api_key="api_key",
+            auth_api_secret="api_secret",
+            auth_algorithm=algorithm.value,
+            headers="(request-target) date",
+        )
+        auth = XCoverAuth(config.auth_config)
+
+        def before():
+            del request.headers["date"]
+            legacy_sign(config, request)
+
+        def after():
+            del request.headers["date"]
+            auth(request)
+
+        legacy_sign(config, request)
+        before_rate = rate(before, args.seconds)
+        after_rate = rate(after, args.seconds)
+        print(
+            f"{algorithm.value:<12} {before_rate:>12,.0f} {after_rate:>12,.0f} "
+            f"{after_rate / before_rate:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
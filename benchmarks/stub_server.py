@@ -0,0 +1,135 @@
+"""
+Local stand-in for the XCover partner API used by the benchmarks. Answers
+`partners/{code}/...` endpoints with canned JSON so that measurements only reflect the client.
+
+    python -m benchmarks.stub_server [--port 8000]
+"""
+
+import argparse
+import json
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QUOTE = {
+    "id": "VGU8R-JVDNL-INS",
+    "status": "RECEIVED",
+    "currency": "GBP",
+    "total_price": 25.36,
+    "total_price_formatted": "£25.36",
+    "partner_transaction_id": "BENCH-1",
+    "quotes": [
+        {
+            "id": "4f9c5b35-6a6e-4a2b-8d3e-1a7b1d3c7f11",
+            "policy_start_date": "2025-05-01T00:00:00Z",
+            "policy_end_date": "2025-05-15T00:00:00Z",
+            "status": "RECEIVED",
+            "price": 25.36,
+            "price_formatted": "£25.36",
+            "policy": {
+                "policy_type": "travel_cancellation",
+                "policy_name": "Travel Cancellation Protection",
+                "policy_code": "LLODT-TC",
+                "category": "travel",
+                "content": {"title": "Cancellation cover", "description": "Lorem ipsum " * 20},
+            },
+            "insurer": {"name": "Insurer Ltd", "underwriter": "Underwriter plc"},
+            "tax": {"total_tax": 2.1, "total_amount_without_tax": 23.26},
+            "benefits": [
+                {"benefit_content_id": f"benefit-{index}", "description": "Benefit " * 5}
+                for index in range(8)
+            ],
+        }
+    ],
+}
+
+BOOKING = {**QUOTE, "status": "CONFIRMED"}
+
+BOOKINGS = {
+    "count": 20,
+    "next": None,
+    "previous": None,
+    "results": [{**BOOKING, "id": f"BOOK{index:02d}-ABCDE-INS"} for index in range(20)],
+}
+
+# Path (relative to `partners/{code}/`) -> (method, status, body)
+ROUTES = (
+    (re.compile(r"^quotes/$"), "POST", 201, QUOTE),
+    (re.compile(r"^instant_booking/$"), "POST", 201, BOOKING),
+    (re.compile(r"^bookings/$"), "GET", 200, BOOKINGS),
+    (re.compile(r"^bookings/[^/]+/$"), "GET", 200, BOOKING),
+)
+
+PARTNER_PATH = re.compile(r"^/partners/[^/]+/(?P<endpoint>[^?]*)")
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.routes = [
+            (pattern, method, status, json.dumps(body).encode())
+            for pattern, method, status, body in ROUTES
+        ]
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address
+        return f"http://{host}:{port}/"
+
+    def route(self, method: str, path: str):
+        match = PARTNER_PATH.match(path)
+        if match is not None:
+            endpoint = match.group("endpoint")
+            for pattern, route_method, status, body in self.routes:
+                if route_method == method and pattern.match(endpoint):
+                    return status, body
+        return 404, b'{"detail": "Not found."}'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, don't let Nagle hold back the body
+    disable_nagle_algorithm = True
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        status, body = self.server.route(self.command, self.path)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_request
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int = 0, ready=None):
+    """Serve until killed, reporting the bound port through the `ready` queue if given."""
+    server = StubServer(port)
+    if ready is not None:
+        ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = StubServer(args.port)
+    print(f"Serving XCover stub on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import pytest
 
-from xcover import XCover
+from xcover import XCover, XCoverConfig
+
+from .utils import StubServer
 
 
 @pytest.fixture(scope="session")
@@ -11,3 +13,23 @@ def vcr_config():
 @pytest.fixture()
 def client():
     yield XCover()
+
+
+@pytest.fixture()
+def stub_server():
+    server = StubServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture()
+def config(stub_server):
+    return XCoverConfig(
+        base_url=stub_server.url,
+        partner_code="LLODT",
+        auth_api_key="test_api_key",
+        auth_api_secret="test_api_secret",
+        auth_algorithm="hmac-sha256",
+        retry_backoff_factor=0,
+    )
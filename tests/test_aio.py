@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+from xcover.auth import XCoverAuth
+from xcover.exceptions import XCoverDeadlineExceeded, XCoverHttpException
+
+from .factories import InstantBookingFactory, QuotePackageFactory
+
+httpx = pytest.importorskip("httpx")
+
+from xcover.aio import AsyncXCover  # noqa: E402
+
+
+def run(coroutine_function, config):
+    async def main():
+        async with AsyncXCover(config) as client:
+            return await coroutine_function(client)
+
+    return asyncio.run(main())
+
+
+def test_create_quote(stub_server, config):
+    stub_server.add_response(200, {"id": "VGU8R-JVDNL-INS"})
+    payload = QuotePackageFactory()
+
+    quote = run(lambda client: client.create_quote(payload), config)
+
+    assert quote == {"id": "VGU8R-JVDNL-INS"}
+    request = stub_server.requests[0]
+    assert request.method == "POST"
+    assert request.path == "/partners/LLODT/quotes/"
+    assert request.json()["currency"] == payload["currency"]
+    assert request.headers["Content-Type"] == "application/json"
+    assert "x-idempotency-key" not in request.headers
+
+
+def test_request_is_signed(stub_server, config):
+    stub_server.add_response(200, {"id": "VGU8R-JVDNL-INS"})
+
+    run(lambda client: client.get_booking("VGU8R-JVDNL-INS", params={"a": 1}), config)
+
+    request = stub_server.requests[0]
+    assert request.path == "/partners/LLODT/bookings/VGU8R-JVDNL-INS/?a=1"
+    expected = requests.Request(
+        "GET", f"{stub_server.url}partners/LLODT/bookings/VGU8R-JVDNL-INS/?a=1"
+    ).prepare()
+    expected.headers["date"] = request.headers["date"]
+    XCoverAuth(config.auth_config)(expected)
+    assert request.headers["authorization"] == expected.headers["authorization"]
+
+
+def test_idempotency_key(stub_server, config):
+    stub_server.add_response(200, {"status": "CONFIRMED"})
+
+    run(lambda client: client.confirm_booking("VGU8R-JVDNL-INS"), config)
+
+    assert stub_server.requests[0].method == "PUT"
+    assert stub_server.requests[0].headers["x-idempotency-key"]
+
+
+def test_no_content(stub_server, config):
+    stub_server.add_response(202)
+
+    assert run(lambda client: client.trigger_email("VGU8R-JVDNL-INS"), config) is True
+
+
+def test_client_error(stub_server, config):
+    stub_server.add_response(422, {"detail": "error"})
+
+    with pytest.raises(XCoverHttpException, match="422 Client Error"):
+        run(lambda client: client.create_quote(QuotePackageFactory()), config)
+
+
+def test_server_error_without_retry(stub_server, config):
+    stub_server.add_response(503)
+
+    with pytest.raises(XCoverHttpException, match="503 Server Error"):
+        run(lambda client: client.get_quote("VGU8R-JVDNL-INS"), config)
+
+    assert len(stub_server.requests) == 1
+
+
+def test_auto_retry(stub_server, config):
+    stub_server.add_response(503)
+    stub_server.add_response(429, headers={"Retry-After": "0"})
+    stub_server.add_response(200, {"status": "CONFIRMED"})
+
+    booking = run(lambda client: client.instant_booking(InstantBookingFactory()), config)
+
+    assert booking == {"status": "CONFIRMED"}
+    assert len(stub_server.requests) == 3
+    idempotency_keys = {request.headers["x-idempotency-key"] for request in stub_server.requests}
+    assert len(idempotency_keys) == 1
+
+
+def test_auto_retry_exhausted(stub_server, config):
+    config.retry_total = 2
+    for _ in range(3):
+        stub_server.add_response(502)
+
+    with pytest.raises(XCoverHttpException, match="Max retries exceeded"):
+        run(lambda client: client.instant_booking(InstantBookingFactory()), config)
+
+    assert len(stub_server.requests) == 3
+
+
+def test_connection_is_reused(stub_server, config):
+    async def calls(client):
+        await client.get_quote("VGU8R-JVDNL-INS")
+        await client.get_quote("VGU8R-JVDNL-INS")
+
+    run(calls, config)
+
+    assert stub_server.requests[0].client_address == stub_server.requests[1].client_address
+
+
+def test_concurrent_calls(stub_server, config):
+    async def calls(client):
+        return await asyncio.gather(*(client.get_quote(str(i)) for i in range(20)))
+
+    assert run(calls, config) == [{}] * 20
+    assert len(stub_server.requests) == 20
+
+
+def test_rate_limiter(stub_server, config):
+    config.rate_limits = {"bookings": 100}
+    stub_server.add_response(429, headers={"Retry-After": "0"})
+    stub_server.add_response(200, {"status": "CONFIRMED"})
+
+    async def main():
+        async with AsyncXCover(config) as client:
+            await client.instant_booking(InstantBookingFactory())
+            return client.rate_limiter.bucket("bookings", "LLODT").current_rate
+
+    assert asyncio.run(main()) == 55
+
+
+def test_rate_limit_wait_is_bounded_by_deadline(stub_server, config):
+    config.rate_limits = {"quotes": 1}
+
+    async def main(client):
+        await client.get_quote("ABC-INS")
+        started = time.monotonic()
+        with pytest.raises(XCoverDeadlineExceeded):
+            await client.get_quote("ABC-INS", deadline=0.2)
+        return time.monotonic() - started
+
+    assert run(main, config) < 0.2
+    assert len(stub_server.requests) == 1
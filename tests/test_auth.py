@@ -1,6 +1,11 @@
+import base64
+import hmac
+from urllib.parse import quote, urlparse
+
+import pytest
 import requests
 
-from xcover.auth import XCoverAuth
+from xcover.auth import Signer, XCoverAuth, url_path
 from xcover.config import AuthConfig, SignatureAlgorithm
 
 
@@ -49,3 +54,57 @@ def test_date_header_is_not_overridden():
         == 'Signature keyId="test_api_key",algorithm="hmac-sha256",headers="date",'
         'signature="bfxytCfvFqito27v0%2FKcN1jBJsgnCReimKXdAWwoi0k%3D"'
     )
+
+
+def reference_authorization(config: AuthConfig, request: requests.PreparedRequest) -> str:
+    signature = hmac.new(
+        key=config.api_secret.encode("utf-8", "strict"),
+        msg=config.build_string_to_sign(request).encode("utf-8", "strict"),
+        digestmod=config.hash_function,
+    ).digest()
+    signature = quote(base64.b64encode(signature), safe="")
+    return (
+        f'Signature keyId="{config.api_key}",algorithm="{config.algorithm.value}",'
+        f'headers="{config.headers}",signature="{signature}"'
+    )
+
+
+@pytest.mark.parametrize("algorithm", list(SignatureAlgorithm))
+@pytest.mark.parametrize(
+    "headers", ("date", "(request-target) date", "(request-target)  date x-custom unknown")
+)
+def test_signer_matches_reference(algorithm, headers):
+    config = AuthConfig(
+        api_key="test_api_key", api_secret="test_api_secret", algorithm=algorithm, headers=headers
+    )
+    signer = Signer(config)
+
+    for url in (
+        "https://api.xcover.com/xcover/partners/LLODT/quotes/",
+        "https://api.xcover.com/xcover/partners/LLODT/bookings/?limit=1&offset=2",
+    ):
+        req = requests.Request(
+            "POST", url, headers={"date": "Sun, 29 Aug 2021 12:07:26 GMT", "x-custom": "1"}
+        ).prepare()
+        expected = reference_authorization(config, req)
+
+        # The same signer is used for several requests
+        for _ in range(2):
+            assert signer.authorization(req.method, req.url, req.headers) == expected
+
+
+@pytest.mark.parametrize(
+    "url",
+    (
+        "https://api.xcover.com/xcover/partners/LLODT/quotes/",
+        "https://api.xcover.com/xcover/quotes/?limit=1&next=/a#b",
+        "https://api.xcover.com/x#frag?not-a-query",
+        "https://api.xcover.com",
+        "https://api.xcover.com?a=/b",
+        "https://api.xcover.com/a;params/b;c?d",
+        "http://[::1]:8000/a/b/",
+        "/relative/path?a",
+    ),
+)
+def test_url_path(url):
+    assert url_path(url) == urlparse(url).path
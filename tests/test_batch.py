@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import requests
+
+from xcover import XCover
+from xcover.batch import BatchResult, unpack_call
+from xcover.exceptions import XCoverHttpException
+
+from .factories import QuotePackageFactory
+
+
+class ConcurrencyTracker:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+
+        currency = request.json()["currency"]
+        if currency == "XXX":
+            return 422, {"detail": "Unknown currency"}, {}
+        return 200, {"currency": currency}, {}
+
+
+def test_unpack_call():
+    assert unpack_call(("GET", "quotes/1/")) == ("GET", "quotes/1/", {})
+    assert unpack_call(("GET", "quotes/1/", {"params": {"a": 1}})) == (
+        "GET",
+        "quotes/1/",
+        {"params": {"a": 1}},
+    )
+
+
+def test_batch_result():
+    assert BatchResult(result={}).ok is True
+    assert BatchResult(error=XCoverHttpException()).ok is False
+
+
+def test_create_quotes_many(stub_server, config):
+    tracker = ConcurrencyTracker()
+    stub_server.responder = tracker
+    currencies = ["GBP", "XXX", "AUD", "USD", "EUR", "XXX", "JPY", "NZD"]
+
+    with XCover(config) as client:
+        results = client.create_quotes_many(
+            [QuotePackageFactory(currency=currency) for currency in currencies],
+            max_concurrency=4,
+        )
+
+    assert [result.ok for result in results] == [currency != "XXX" for currency in currencies]
+    for currency, result in zip(currencies, results):
+        if result.ok:
+            assert result.result == {"currency": currency}
+        else:
+            assert isinstance(result.error, XCoverHttpException)
+    assert 1 < tracker.max_in_flight <= 4
+    assert all("x-idempotency-key" not in request.headers for request in stub_server.requests)
+
+
+def test_call_many(stub_server, config):
+    stub_server.add_response(200, {"id": "1"})
+
+    with XCover(config) as client:
+        results = client.call_many([("GET", "quotes/1/", {"params": {"a": 1}})], max_concurrency=1)
+
+    assert results == [BatchResult(result={"id": "1"})]
+    assert stub_server.requests[0].path == "/partners/LLODT/quotes/1/?a=1"
+
+
+def test_call_many_connection_error(config):
+    config.base_url = "http://127.0.0.1:1/"
+
+    with XCover(config) as client:
+        results = client.call_many([("GET", "quotes/1/")])
+
+    assert isinstance(results[0].error, requests.ConnectionError)
+
+
+def test_call_many_empty(config):
+    assert XCover(config).call_many([]) == []
+
+
+def test_async_create_quotes_many(stub_server, config):
+    pytest.importorskip("httpx")
+    from xcover.aio import AsyncXCover
+
+    tracker = ConcurrencyTracker()
+    stub_server.responder = tracker
+    currencies = ["GBP", "XXX", "AUD", "USD", "EUR"]
+
+    async def main():
+        async with AsyncXCover(config) as client:
+            return await client.create_quotes_many(
+                [QuotePackageFactory(currency=currency) for currency in currencies],
+                max_concurrency=3,
+            )
+
+    results = asyncio.run(main())
+
+    assert [result.ok for result in results] == [currency != "XXX" for currency in currencies]
+    assert results[0].result == {"currency": "GBP"}
+    assert 1 < tracker.max_in_flight <= 3
@@ -0,0 +1,185 @@
+from dataclasses import replace
+
+import pytest
+
+from xcover import XCover, XCoverConfig
+from xcover.cache import CacheStats, ResponseCache, resource_id
+from xcover.exceptions import XCoverHttpException
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    (
+        ("quotes/ABC-INS/", "ABC-INS"),
+        ("quotes/ABC-INS/add/", "ABC-INS"),
+        ("bookings/ABC-INS/confirm", "ABC-INS"),
+        ("bookings/ABC-INS/instalments/", "ABC-INS"),
+        ("renewals/ABC-INS/confirm/renewal-id/", "ABC-INS"),
+        ("bookings/", None),
+        ("quotes/", None),
+        ("instant_booking/", None),
+    ),
+)
+def test_resource_id(url, expected):
+    assert resource_id(url) == expected
+
+
+def test_lru_eviction():
+    cache = ResponseCache(maxsize=2)
+    cache.set("a", "A", 1)
+    cache.set("b", "B", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", "C", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats == CacheStats(hits=3, misses=1, evictions=1, size=2)
+
+
+def test_ttl():
+    clock = FakeClock()
+    cache = ResponseCache(ttl=10, clock=clock)
+    cache.set("a", "A", 1)
+
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_invalidate():
+    cache = ResponseCache()
+    cache.set("quote", "ABC-INS", 1)
+    cache.set("instalments", "ABC-INS", 2)
+    cache.set("other", "DEF-INS", 3)
+
+    cache.invalidate("ABC-INS")
+
+    assert cache.get("quote") is None
+    assert cache.get("instalments") is None
+    assert cache.get("other") == 3
+    assert cache.stats.invalidations == 2
+
+
+def test_value_fetched_before_invalidation_is_not_stored():
+    cache = ResponseCache(maxsize=1)
+    token = cache.token()
+    cache.invalidate("ABC-INS")
+
+    cache.set("quote", "ABC-INS", 1, token)
+    assert cache.get("quote") is None
+
+    # Invalidations of other resources don't matter...
+    token = cache.token()
+    cache.invalidate("DEF-INS")
+    cache.set("quote", "ABC-INS", 1, token)
+    assert cache.get("quote") == 1
+
+    # ...unless they pushed the resource out of the bounded invalidation log
+    token = cache.token()
+    cache.invalidate("ABC-INS")
+    cache.invalidate("GHI-INS")
+    cache.set("quote", "ABC-INS", 1, token)
+    assert cache.get("quote") is None
+
+
+def test_clear():
+    cache = ResponseCache()
+    token = cache.token()
+    cache.set("quote", "ABC-INS", 1)
+
+    cache.clear()
+
+    assert len(cache) == 0
+    cache.set("quote", "ABC-INS", 1, token)
+    assert len(cache) == 0
+
+
+@pytest.fixture()
+def client(config):
+    with XCover(replace(config, cache_maxsize=10)) as client:
+        yield client
+
+
+def test_cache_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("XC_CACHE_MAXSIZE", raising=False)
+
+    assert XCover(XCoverConfig()).cache is None
+
+
+def test_get_booking_is_cached(stub_server, client):
+    stub_server.add_response(200, {"id": "ABC-INS", "status": "CONFIRMED"})
+
+    booking = client.get_booking("ABC-INS")
+    booking["status"] = "modified by caller"
+
+    assert client.get_booking("ABC-INS") == {"id": "ABC-INS", "status": "CONFIRMED"}
+    assert len(stub_server.requests) == 1
+    assert client.cache.stats.hits == 1
+
+
+def test_cache_key_includes_params(stub_server, client):
+    client.get_quote("ABC-INS")
+    client.get_quote("ABC-INS", params={"language": "fr"})
+    client.get_quote("ABC-INS", params={"language": "fr"})
+    client.get_instalments("ABC-INS")
+
+    assert len(stub_server.requests) == 3
+
+
+def test_use_cache_false(stub_server, client):
+    client.get_quote("ABC-INS")
+    client.get_quote("ABC-INS", use_cache=False)
+
+    assert len(stub_server.requests) == 2
+
+
+def test_mutation_invalidates(stub_server, client):
+    stub_server.add_response(200, {"status": "PENDING_PAYMENT"})
+    stub_server.add_response(200, {"status": "CONFIRMED"})
+    stub_server.add_response(200, {"status": "CONFIRMED"})
+
+    assert client.get_booking("ABC-INS")["status"] == "PENDING_PAYMENT"
+    client.confirm_booking("ABC-INS")
+
+    assert client.get_booking("ABC-INS")["status"] == "CONFIRMED"
+    assert len(stub_server.requests) == 3
+
+
+def test_failed_mutation_invalidates(stub_server, client):
+    client.get_quote("ABC-INS")
+    stub_server.add_response(400, {})
+
+    with pytest.raises(XCoverHttpException):
+        client.update_quote("ABC-INS", {"currency": "AUD"})
+    client.get_quote("ABC-INS")
+
+    assert len(stub_server.requests) == 3
+
+
+def test_errors_are_not_cached(stub_server, client):
+    stub_server.add_response(404, {})
+
+    with pytest.raises(XCoverHttpException):
+        client.get_booking("ABC-INS")
+    client.get_booking("ABC-INS")
+
+    assert len(stub_server.requests) == 2
+
+
+def test_list_bookings_is_not_cached(stub_server, client):
+    client.list_bookings()
+    client.list_bookings()
+
+    assert len(stub_server.requests) == 2
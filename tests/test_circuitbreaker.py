@@ -0,0 +1,187 @@
+from dataclasses import replace
+
+import pytest
+import requests
+
+from xcover import XCover, XCoverConfig
+from xcover.circuitbreaker import Circuit, CircuitBreaker, CircuitState
+from xcover.exceptions import (
+    XCoverCircuitOpenError,
+    XCoverDeadlineExceeded,
+    XCoverError,
+    XCoverHttpException,
+)
+from xcover.timeouts import Deadline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture()
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture()
+def circuit(clock):
+    return Circuit(
+        failure_threshold=0.5, minimum_calls=4, window_size=4, recovery_timeout=10, clock=clock
+    )
+
+
+def test_circuit_opens_on_failure_rate(circuit):
+    for success in (True, False, True):
+        assert circuit.allow()
+        circuit.record(success)
+    assert circuit.state == CircuitState.CLOSED
+
+    circuit.record(False)
+
+    assert circuit.state == CircuitState.OPEN
+    assert not circuit.allow()
+    assert circuit.retry_in() == 10
+
+
+def test_circuit_half_open_probe_success(circuit, clock):
+    for _ in range(4):
+        circuit.record(False)
+
+    clock.now += 10
+    assert circuit.allow()
+    assert circuit.state == CircuitState.HALF_OPEN
+    # Only one probe at a time
+    assert not circuit.allow()
+
+    circuit.record(True)
+
+    assert circuit.state == CircuitState.CLOSED
+    assert circuit.allow()
+    assert circuit.failure_rate == 0
+
+
+def test_circuit_half_open_probe_failure(circuit, clock):
+    for _ in range(4):
+        circuit.record(False)
+    clock.now += 10
+    assert circuit.allow()
+
+    circuit.record(False)
+
+    assert circuit.state == CircuitState.OPEN
+    assert not circuit.allow()
+
+
+def test_circuit_released_probe_is_replaced(circuit, clock):
+    for _ in range(4):
+        circuit.record(False)
+    clock.now += 10
+    assert circuit.allow()
+
+    circuit.release()
+
+    assert circuit.allow()
+    assert not circuit.allow()
+
+
+def test_circuit_lost_probe_is_replaced(circuit, clock):
+    for _ in range(4):
+        circuit.record(False)
+    clock.now += 10
+    assert circuit.allow()
+    assert not circuit.allow()
+
+    clock.now += 10
+
+    assert circuit.allow()
+
+
+def test_circuit_breaker_families(clock):
+    breaker = CircuitBreaker(minimum_calls=1, clock=clock)
+    breaker.record("bookings", False, "LLODT")
+
+    with pytest.raises(XCoverCircuitOpenError) as exc_info:
+        breaker.before_call("bookings", "LLODT")
+    breaker.before_call("quotes", "LLODT")
+    breaker.before_call("bookings", "PARTA")
+
+    assert isinstance(exc_info.value, XCoverError)
+    assert exc_info.value.family == "bookings"
+    assert breaker.states() == {
+        ("LLODT", "bookings"): CircuitState.OPEN,
+        ("LLODT", "quotes"): CircuitState.CLOSED,
+        ("PARTA", "bookings"): CircuitState.CLOSED,
+    }
+
+
+@pytest.fixture()
+def client(config):
+    with XCover(
+        replace(config, circuit_breaker=True, circuit_minimum_calls=2, circuit_window_size=2)
+    ) as client:
+        yield client
+
+
+def test_circuit_breaker_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("XC_CIRCUIT_BREAKER", raising=False)
+
+    assert XCover(XCoverConfig()).circuit_breaker is None
+
+
+def test_server_errors_open_circuit(stub_server, client):
+    stub_server.add_response(500)
+    stub_server.add_response(503)
+
+    for _ in range(2):
+        with pytest.raises(XCoverHttpException):
+            client.get_booking("ABC-INS")
+    with pytest.raises(XCoverCircuitOpenError):
+        client.get_booking("ABC-INS")
+
+    # Other families are not affected
+    client.get_quote("ABC-INS")
+    assert len(stub_server.requests) == 3
+    assert client.circuit_breaker.states()[("LLODT", "bookings")] == CircuitState.OPEN
+
+
+def test_client_errors_keep_circuit_closed(stub_server, client):
+    stub_server.add_response(404)
+    stub_server.add_response(422)
+
+    for _ in range(2):
+        with pytest.raises(XCoverHttpException):
+            client.get_booking("ABC-INS")
+
+    assert client.circuit_breaker.states()[("LLODT", "bookings")] == CircuitState.CLOSED
+
+
+def test_expired_deadline_keeps_probe(stub_server, client):
+    stub_server.add_response(500)
+    stub_server.add_response(503)
+    for _ in range(2):
+        with pytest.raises(XCoverHttpException):
+            client.get_booking("ABC-INS")
+    circuit = client.circuit_breaker.circuit("bookings", "LLODT")
+    circuit.opened_at -= circuit.recovery_timeout
+
+    with pytest.raises(XCoverDeadlineExceeded):
+        client.get_booking("ABC-INS", deadline=Deadline(0))
+    client.get_booking("ABC-INS")
+
+    assert circuit.state == CircuitState.CLOSED
+    assert len(stub_server.requests) == 3
+
+
+def test_connection_errors_open_circuit(client):
+    client.config.base_url = "http://127.0.0.1:1/"
+
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            client.get_booking("ABC-INS")
+
+    with pytest.raises(XCoverCircuitOpenError):
+        client.get_booking("ABC-INS")
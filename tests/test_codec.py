@@ -0,0 +1,162 @@
+import dataclasses
+import datetime
+import decimal
+import enum
+import json
+import uuid
+
+import pytest
+
+from xcover import XCover, XCoverConfig
+from xcover.codec import JSONCodec, OrjsonCodec, get_codec
+from xcover.exceptions import XCoverError
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+requires_orjson = pytest.mark.skipif(orjson is None, reason="orjson is not installed")
+
+CODECS = [JSONCodec, pytest.param(OrjsonCodec, marks=requires_orjson)]
+
+PAYLOAD = {
+    "naive": datetime.datetime(2020, 1, 1, 10, 30, 0, 15),
+    "utc": datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc),
+    "offset": datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.max),
+    "date": datetime.date(2020, 1, 1),
+    "price": decimal.Decimal("33.33"),
+    "uuid": uuid.UUID("8667b385-8d0c-4462-863a-feacec57c0b9"),
+    "bytes": b"aa",
+    "nested": [{"tickets": [{"price": 100}]}, None, True, 1.5, "£"],
+    "big_int": 2**70,
+    1: "non string key",
+}
+
+
+class DateTimeSubclass(datetime.datetime):
+    pass
+
+
+class Color(enum.Enum):
+    RED = "red"
+
+
+class Size(enum.IntEnum):
+    SMALL = 1
+
+
+class Name(str):
+    pass
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+
+
+def as_text(data) -> str:
+    return data.decode() if isinstance(data, bytes) else data
+
+
+def loaded_or_error(codec, value):
+    try:
+        return json.loads(as_text(codec.dumps({"value": value})))
+    except TypeError:
+        return TypeError
+
+
+@pytest.mark.parametrize("codec_class", CODECS)
+def test_dumps_matches_json_encoder(codec_class):
+    expected = json.loads(JSONCodec().dumps(PAYLOAD))
+
+    assert json.loads(codec_class().dumps(PAYLOAD)) == expected
+    assert expected["utc"] == "2020-01-01T00:00:00Z"
+    assert expected["naive"] == "2020-01-01T10:30:00.000015"
+    assert expected["price"] == 33.33
+
+
+@pytest.mark.parametrize("codec_class", CODECS)
+def test_dumps_datetime_subclass(codec_class):
+    value = DateTimeSubclass(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+    assert json.loads(codec_class().dumps([value])) == ["2020-01-01T00:00:00Z"]
+
+
+@pytest.mark.parametrize("codec_class", CODECS)
+def test_dumps_unsupported_type(codec_class):
+    with pytest.raises(TypeError):
+        codec_class().dumps({"value": object()})
+    with pytest.raises(TypeError):
+        codec_class().dumps({"value": datetime.time(10, 30)})
+
+
+@requires_orjson
+@pytest.mark.parametrize(
+    "value",
+    [
+        float("nan"),
+        float("inf"),
+        [None, {"price": float("-inf")}],
+        decimal.Decimal("NaN"),
+        {"price": None},
+    ],
+)
+def test_orjson_dumps_non_finite_like_json(value):
+    data = OrjsonCodec().dumps({"value": value})
+
+    # repr() as NaN isn't equal to itself
+    expected = json.loads(JSONCodec().dumps({"value": value}))
+    assert repr(json.loads(as_text(data))) == repr(expected)
+
+
+@requires_orjson
+@pytest.mark.parametrize(
+    "value",
+    [
+        Color.RED,
+        [Size.SMALL],
+        Point(1),
+        Name("ABC"),
+        {uuid.UUID("8667b385-8d0c-4462-863a-feacec57c0b9"): 1},
+        {datetime.date(2020, 1, 1): 1},
+        {1: "one", 2.5: "half", None: "none"},
+        {Name("key"): 1},
+        {Size.SMALL: "small"},
+    ],
+)
+def test_orjson_dumps_like_json(value):
+    assert loaded_or_error(OrjsonCodec(), value) == loaded_or_error(JSONCodec(), value)
+
+
+@pytest.mark.parametrize("codec_class", CODECS)
+def test_loads(codec_class):
+    codec = codec_class()
+
+    assert codec.loads('{"price": 1.99, "name": "£"}'.encode()) == {"price": 1.99, "name": "£"}
+    assert codec.loads(b'{"value": NaN, "big": 100000000000000000000000}')["big"] == 10**23
+    with pytest.raises(ValueError):
+        codec.loads(b"")
+
+
+def test_get_codec():
+    codec = JSONCodec()
+
+    assert get_codec(codec) is codec
+    assert isinstance(get_codec("json"), JSONCodec)
+    with pytest.raises(XCoverError):
+        get_codec("unknown")
+
+
+@requires_orjson
+def test_get_codec_auto():
+    assert isinstance(get_codec("auto"), OrjsonCodec)
+    assert isinstance(get_codec(None), OrjsonCodec)
+    assert isinstance(get_codec("orjson"), OrjsonCodec)
+
+
+def test_client_codec_from_config():
+    client = XCover(XCoverConfig(json_codec="json"))
+
+    assert type(client.codec) is JSONCodec
+    assert client.codec is client.codec
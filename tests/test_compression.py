@@ -0,0 +1,162 @@
+import asyncio
+import gzip
+import json
+import zlib
+from dataclasses import replace
+
+import pytest
+
+from xcover import XCover, XCoverConfig
+from xcover.auth import Signer
+from xcover.codec import JSONCodec
+from xcover.compression import body_digest, get_compressor
+from xcover.exceptions import XCoverError
+
+from .factories import QuotePackageFactory
+
+
+@pytest.fixture()
+def config(config):
+    return replace(config, request_compression="gzip", compression_min_size=200)
+
+
+def large_payload():
+    payload = QuotePackageFactory()
+    payload["request"] = payload["request"] * 20
+    return json.loads(JSONCodec().dumps(payload))
+
+
+def headers_of(request) -> dict:
+    return {name.lower(): value for name, value in request.headers.items()}
+
+
+def test_unknown_compression():
+    assert get_compressor(None) is None
+    with pytest.raises(XCoverError):
+        get_compressor("brotli")
+
+
+def test_body_digest():
+    assert body_digest(None) == "SHA-256=47DEQpj8HBSa+/TImW+5JCeuQeRkm5NMpJWZG3hSuFU="
+    assert body_digest("{}") == body_digest(b"{}")
+
+
+@pytest.mark.parametrize("transport", ["requests", "urllib3"])
+def test_large_body_is_compressed(stub_server, config, transport):
+    config.transport = transport
+    client = XCover(config)
+    payload = large_payload()
+
+    client.create_quote(payload)
+
+    request = stub_server.requests[0]
+    assert headers_of(request)["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(request.body)) == payload
+    assert int(headers_of(request)["content-length"]) == len(request.body)
+
+
+def test_deflate(stub_server, config):
+    config.request_compression = "deflate"
+    client = XCover(config)
+    payload = large_payload()
+
+    client.create_quote(payload)
+
+    request = stub_server.requests[0]
+    assert headers_of(request)["content-encoding"] == "deflate"
+    assert json.loads(zlib.decompress(request.body)) == payload
+
+
+def test_small_body_is_not_compressed(stub_server, config):
+    client = XCover(config)
+
+    client.opt_out("VGU8R-JVDNL-INS")
+    client.get_booking("VGU8R-JVDNL-INS")
+
+    for request in stub_server.requests:
+        assert "content-encoding" not in headers_of(request)
+    assert stub_server.requests[0].json() == {}
+
+
+def test_compression_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("XC_REQUEST_COMPRESSION", raising=False)
+
+    assert XCover(XCoverConfig()).compressor is None
+
+
+def test_uncompressed_without_request_compression(stub_server, config):
+    config.request_compression = None
+    client = XCover(config)
+
+    client.create_quote(large_payload())
+
+    assert "content-encoding" not in headers_of(stub_server.requests[0])
+
+
+@pytest.mark.parametrize("transport", ["requests", "urllib3"])
+def test_digest_of_compressed_body_is_signed(stub_server, config, transport):
+    config.transport = transport
+    config.headers = "(request-target) date digest"
+    client = XCover(config)
+
+    client.create_quote(large_payload())
+
+    request = stub_server.requests[0]
+    headers = headers_of(request)
+    assert headers["digest"] == body_digest(request.body)
+    expected = Signer(config.auth_config).authorization(
+        "POST",
+        f"{stub_server.url}partners/LLODT/quotes/",
+        {"date": headers["date"], "digest": headers["digest"]},
+    )
+    assert headers["authorization"] == expected
+    assert 'headers="(request-target) date digest"' in expected
+
+
+def test_digest_is_not_sent_unless_signed(stub_server, config):
+    client = XCover(config)
+
+    client.create_quote(large_payload())
+
+    assert "digest" not in headers_of(stub_server.requests[0])
+
+
+@pytest.mark.parametrize("transport", ["requests", "urllib3"])
+def test_accept_encoding(stub_server, config, transport):
+    config.transport = transport
+    config.accept_encoding = "gzip"
+    client = XCover(config)
+
+    client.get_booking("VGU8R-JVDNL-INS")
+
+    assert headers_of(stub_server.requests[0])["accept-encoding"] == "gzip"
+
+
+@pytest.mark.parametrize("transport", ["requests", "urllib3"])
+def test_compressed_response(stub_server, config, transport):
+    config.transport = transport
+    page = {"count": 500, "results": [{"id": f"BOOKING-{i}"} for i in range(500)]}
+    stub_server.add_response(
+        200, gzip.compress(json.dumps(page).encode()), {"Content-Encoding": "gzip"}
+    )
+    client = XCover(config)
+
+    assert client.list_bookings() == page
+
+
+def test_async_compression(stub_server, config):
+    pytest.importorskip("httpx")
+    from xcover.aio import AsyncXCover
+
+    config.headers = "(request-target) date digest"
+    payload = large_payload()
+
+    async def main():
+        async with AsyncXCover(config) as client:
+            await client.create_quote(payload)
+
+    asyncio.run(main())
+
+    request = stub_server.requests[0]
+    assert json.loads(gzip.decompress(request.body)) == payload
+    assert headers_of(request)["digest"] == body_digest(request.body)
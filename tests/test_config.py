@@ -12,3 +12,28 @@ def test_config_is_provided():
     )
 
     assert client.config.auth_config.headers == "(request-target) date"
+
+
+def test_rate_limits_from_env(monkeypatch):
+    monkeypatch.setenv("XC_RATE_LIMITS", "quotes=50, bookings=2.5")
+
+    assert XCoverConfig().rate_limits == {"quotes": 50, "bookings": 2.5}
+
+
+def test_env_is_read_on_instantiation(monkeypatch):
+    monkeypatch.setenv("XC_HTTP_TIMEOUT", "2.5")
+    monkeypatch.setenv("XC_RETRY_TOTAL", "1")
+    monkeypatch.setenv("XC_COALESCE_GETS", "yes")
+
+    config = XCoverConfig()
+
+    assert config.http_timeout == 2.5
+    assert config.retry_total == 1
+    assert config.coalesce_gets is True
+
+    monkeypatch.delenv("XC_HTTP_TIMEOUT")
+    monkeypatch.delenv("XC_COALESCE_GETS")
+
+    assert XCoverConfig().http_timeout == 60
+    assert XCoverConfig().coalesce_gets is False
+    assert XCoverConfig(retry_total=3).retry_total == 3
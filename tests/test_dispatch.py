@@ -0,0 +1,147 @@
+import threading
+import time
+
+import pytest
+
+from xcover import XCover
+from xcover.dispatch import Dispatcher
+from xcover.exceptions import XCoverError, XCoverHttpException, XCoverQueueFullError
+
+
+def test_submit_returns_future():
+    dispatcher = Dispatcher(workers=2)
+
+    futures = [dispatcher.submit(pow, 2, exponent) for exponent in range(5)]
+
+    assert [future.result(timeout=5) for future in futures] == [1, 2, 4, 8, 16]
+    dispatcher.shutdown()
+
+
+def test_exception_is_set_on_future():
+    dispatcher = Dispatcher(workers=1)
+
+    future = dispatcher.submit(int, "not a number")
+
+    assert isinstance(future.exception(timeout=5), ValueError)
+    dispatcher.shutdown()
+
+
+def test_drop_policy():
+    release = threading.Event()
+    dispatcher = Dispatcher(workers=1, maxsize=1, overflow="drop")
+
+    running = dispatcher.submit(release.wait, 5)
+    while not running.running():
+        time.sleep(0.001)
+    queued = dispatcher.submit(lambda: "queued")
+    dropped = dispatcher.submit(lambda: "dropped")
+
+    assert isinstance(dropped.exception(timeout=0), XCoverQueueFullError)
+    assert dispatcher.dropped == 1
+    release.set()
+    assert queued.result(timeout=5) == "queued"
+    dispatcher.shutdown()
+
+
+def test_block_policy():
+    release = threading.Event()
+    dispatcher = Dispatcher(workers=1, maxsize=1)
+    running = dispatcher.submit(release.wait, 5)
+    while not running.running():
+        time.sleep(0.001)
+    dispatcher.submit(lambda: None)
+
+    threading.Timer(0.1, release.set).start()
+    started = time.perf_counter()
+    future = dispatcher.submit(lambda: "blocked")
+
+    assert time.perf_counter() - started >= 0.05
+    assert future.result(timeout=5) == "blocked"
+    dispatcher.shutdown()
+
+
+def test_unknown_overflow_policy():
+    with pytest.raises(XCoverError):
+        Dispatcher(overflow="spill")
+
+
+def test_shutdown_drains_queue():
+    dispatcher = Dispatcher(workers=2)
+    done = []
+    futures = [
+        dispatcher.submit(lambda i=i: time.sleep(0.01) or done.append(i)) for i in range(10)
+    ]
+
+    assert dispatcher.shutdown() is True
+    assert sorted(done) == list(range(10))
+    assert all(future.done() for future in futures)
+    with pytest.raises(XCoverError):
+        dispatcher.submit(lambda: None)
+
+
+def test_shutdown_timeout_cancels_queued_calls():
+    release = threading.Event()
+    dispatcher = Dispatcher(workers=1)
+    dispatcher.submit(release.wait, 5)
+    queued = dispatcher.submit(lambda: None)
+
+    assert dispatcher.shutdown(timeout=0.05) is False
+    assert queued.cancelled()
+    release.set()
+
+
+def test_client_dispatch(stub_server, config):
+    stub_server.responder = lambda request: (time.sleep(0.1) or 204, None, {})
+    client = XCover(config)
+    completed = threading.Event()
+
+    started = time.perf_counter()
+    future = client.dispatch(client.trigger_email, "VGU8R-JVDNL-INS")
+    future.add_done_callback(lambda future: completed.set())
+
+    assert time.perf_counter() - started < 0.1
+    assert completed.wait(5)
+    assert future.result() is True
+    assert stub_server.requests[0].path.endswith("/bookings/VGU8R-JVDNL-INS/send_email")
+
+
+def test_client_dispatch_error(stub_server, config):
+    stub_server.add_response(404, {"detail": "Not found."})
+    client = XCover(config)
+
+    future = client.dispatch(client.opt_out, "VGU8R-JVDNL-INS")
+
+    assert isinstance(future.exception(timeout=5), XCoverHttpException)
+
+
+def test_client_close_drains_dispatch_queue(stub_server, config):
+    stub_server.responder = lambda request: (time.sleep(0.02) or 204, None, {})
+    config.dispatch_workers = 2
+
+    with XCover(config) as client:
+        futures = [client.dispatch(client.trigger_email, f"booking-{i}") for i in range(6)]
+
+    assert all(future.result(timeout=0) is True for future in futures)
+    assert len(stub_server.requests) == 6
+
+
+def test_shutdown_timeout_with_full_queue():
+    release = threading.Event()
+    dispatcher = Dispatcher(workers=3, maxsize=1)
+    running = [dispatcher.submit(release.wait, 5) for _ in range(3)]
+    while not all(future.running() for future in running):
+        time.sleep(0.001)
+    dispatcher.submit(lambda: None)
+    late = []
+    submitter = threading.Thread(target=lambda: late.append(dispatcher.submit(lambda: None)))
+    submitter.start()
+    time.sleep(0.05)
+
+    started = time.perf_counter()
+    assert dispatcher.shutdown(timeout=0.1) is False
+    elapsed = time.perf_counter() - started
+
+    release.set()
+    submitter.join(5)
+    assert elapsed < 0.5
+    assert late[0].cancelled()
@@ -0,0 +1,213 @@
+import itertools
+import threading
+import time
+from dataclasses import replace
+
+import pytest
+
+from xcover import XCover, XCoverConfig
+from xcover.exceptions import XCoverHttpException
+from xcover.hedging import Hedging, LatencyTracker
+
+
+@pytest.fixture()
+def config(config):
+    return replace(config, hedge_gets=True, hedge_delay=0.05, hedge_max_rate=1)
+
+
+def slow_first(delays):
+    """`send` function sleeping `delays[n]` on its n-th call and returning n."""
+    counter = itertools.count()
+    lock = threading.Lock()
+
+    def send():
+        with lock:
+            call = next(counter)
+        time.sleep(delays[call])
+        return call
+
+    return send
+
+
+def test_latency_tracker():
+    tracker = LatencyTracker(window=100, min_samples=10)
+    for latency in range(9):
+        tracker.observe("key", latency / 100)
+
+    assert tracker.percentile("key", 0.95) is None
+
+    for latency in range(9, 100):
+        tracker.observe("key", latency / 100)
+
+    assert tracker.percentile("key", 0.95) == 0.95
+    assert tracker.percentile("key", 0.5) == 0.5
+    assert tracker.percentile("other", 0.5) is None
+
+
+def test_latency_tracker_window():
+    tracker = LatencyTracker(window=10, min_samples=1)
+    for latency in (5.0,) * 10 + (1.0,) * 10:
+        tracker.observe("key", latency)
+
+    assert tracker.percentile("key", 0.99) == 1.0
+
+
+def test_slow_call_is_hedged():
+    hedging = Hedging(delay=0.05, max_rate=1)
+    send = slow_first([1.0, 0.0])
+
+    started = time.perf_counter()
+    assert hedging.run("key", send) == 1
+    assert time.perf_counter() - started < 0.5
+    assert hedging.hedged == 1
+    hedging.close()
+
+
+def test_fast_call_is_not_hedged():
+    hedging = Hedging(delay=0.5, max_rate=1)
+
+    assert hedging.run("key", slow_first([0.01, 0.0])) == 0
+    assert hedging.hedged == 0
+    hedging.close()
+
+
+def test_hedge_budget():
+    hedging = Hedging(delay=0.01, max_rate=0.5, burst=1)
+    send = slow_first([0.05] * 10)
+
+    results = [hedging.run("key", send) for _ in range(4)]
+
+    # Every other call can afford a hedge; unhedged calls run inline
+    assert hedging.hedged == 2
+    assert len(results) == 4
+    hedging.close()
+
+
+def test_concurrent_calls_do_not_queue_for_hedge_workers():
+    hedging = Hedging(delay=0.3, max_rate=1, max_workers=2)
+    threads = [
+        threading.Thread(target=hedging.run, args=("key", lambda: time.sleep(0.1)))
+        for _ in range(20)
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert time.perf_counter() - started < 0.25
+    assert hedging.hedged == 0
+    hedging.close()
+
+
+def test_concurrent_calls_have_bounded_threads():
+    hedging = Hedging(delay=0.5, max_rate=1, max_workers=4)
+    baseline = threading.active_count()
+    peak = []
+
+    def send():
+        peak.append(threading.active_count())
+        time.sleep(0.02)
+
+    threads = [
+        threading.Thread(target=lambda: [hedging.run("key", send) for _ in range(5)])
+        for _ in range(40)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) <= baseline + len(threads) + hedging.max_workers
+    hedging.close()
+
+
+def test_delay_from_observed_percentile():
+    hedging = Hedging(max_rate=1)
+    hedging.latencies = LatencyTracker(min_samples=5)
+
+    for _ in range(5):
+        hedging.run("key", lambda: time.sleep(0.02))
+    assert hedging.hedged == 0
+    assert 0.02 <= hedging.hedge_delay("key") < 0.1
+
+    started = time.perf_counter()
+    assert hedging.run("key", slow_first([1.0, 0.0])) == 1
+    assert time.perf_counter() - started < 0.5
+    hedging.close()
+
+
+def test_first_error_waits_for_the_other_request():
+    hedging = Hedging(delay=0.01, max_rate=1)
+    counter = itertools.count()
+
+    def send():
+        if next(counter) == 0:
+            time.sleep(0.05)
+            raise ValueError("boom")
+        time.sleep(0.1)
+        return "hedge"
+
+    assert hedging.run("key", send) == "hedge"
+    hedging.close()
+
+
+def test_error_before_delay_is_raised():
+    hedging = Hedging(delay=1, max_rate=1)
+
+    def send():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        hedging.run("key", send)
+    assert hedging.hedged == 0
+    hedging.close()
+
+
+def test_client_hedges_slow_gets(stub_server, config):
+    count = itertools.count()
+
+    def respond(request):
+        if next(count) == 0:
+            time.sleep(1)
+        return 200, {"id": "VGU8R-JVDNL-INS"}, {}
+
+    stub_server.responder = respond
+    client = XCover(config)
+    records = []
+    client.hooks.register("after_response", records.append)
+
+    started = time.perf_counter()
+    assert client.get_booking("VGU8R-JVDNL-INS") == {"id": "VGU8R-JVDNL-INS"}
+
+    assert time.perf_counter() - started < 0.5
+    assert records[0].hedged
+    assert len(stub_server.requests) == 2
+    first, second = stub_server.requests
+    assert first.path == second.path
+    assert second.headers["authorization"]
+    client.close()
+
+
+def test_client_does_not_hedge_writes(stub_server, config):
+    stub_server.responder = lambda request: (time.sleep(0.2) or 200, {}, {})
+    client = XCover(config)
+
+    client.confirm_booking("VGU8R-JVDNL-INS")
+
+    assert len(stub_server.requests) == 1
+
+
+def test_hedged_errors_are_raised(stub_server, config):
+    stub_server.responder = lambda request: (404, {"detail": "Not found."}, {})
+    client = XCover(config)
+
+    with pytest.raises(XCoverHttpException):
+        client.get_booking("VGU8R-JVDNL-INS")
+
+
+def test_hedging_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("XC_HEDGE_GETS", raising=False)
+
+    assert XCover(XCoverConfig()).hedging is None
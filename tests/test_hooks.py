@@ -0,0 +1,182 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from xcover import XCover
+from xcover.exceptions import XCoverHttpException
+from xcover.hooks import HOOK_EVENTS, CallRecord, Hooks, current_call
+
+
+@pytest.fixture()
+def events():
+    return []
+
+
+def record_events(client, events):
+    for event in HOOK_EVENTS:
+        client.hooks.register(event, lambda record, event=event: events.append((event, record)))
+
+
+def test_hooks_events(stub_server, config, events):
+    stub_server.add_response(200, {"status": "CONFIRMED"})
+    client = XCover(config)
+    record_events(client, events)
+
+    client.confirm_booking("VGU8R-JVDNL-INS", {"quotes": []})
+
+    assert [event for event, _ in events] == ["before_request", "after_sign", "after_response"]
+    record = events[-1][1]
+    assert record.method == "PUT"
+    assert record.endpoint == "bookings/{booking_id}/confirm"
+    assert record.url == "partners/LLODT/bookings/VGU8R-JVDNL-INS/confirm"
+    assert record.partner_code == "LLODT"
+    assert record.idempotency_key == stub_server.requests[0].headers["x-idempotency-key"]
+    assert record.status_code == 200
+    assert record.attempts == 1
+    assert record.error is None
+    assert {"encode", "sign", "prepare", "connect", "wait", "read", "decode", "total"} <= set(
+        record.timings
+    )
+    assert "send" not in record.timings
+    assert all(duration >= 0 for duration in record.timings.values())
+    assert record.timings["total"] >= record.timings["wait"]
+
+
+def test_hooks_connection_reuse(stub_server, config, events):
+    stub_server.add_response(200, {"id": "VGU8R-JVDNL-INS"})
+    stub_server.add_response(200, {"id": "VGU8R-JVDNL-INS"})
+    client = XCover(config)
+    client.hooks.register("after_response", events.append)
+
+    client.get_quote("VGU8R-JVDNL-INS")
+    client.get_quote("VGU8R-JVDNL-INS")
+
+    assert "connect" in events[0].timings
+    assert "connect" not in events[1].timings
+    assert "acquire" in events[1].timings
+
+
+def test_hooks_on_retry(stub_server, config, events):
+    stub_server.add_response(503)
+    stub_server.add_response(200, {"status": "CONFIRMED"})
+    client = XCover(config)
+    record_events(client, events)
+
+    client.confirm_booking("VGU8R-JVDNL-INS", {"quotes": []}, auto_retry=True)
+
+    assert [event for event, _ in events] == [
+        "before_request",
+        "after_sign",
+        "on_retry",
+        "after_response",
+    ]
+    record = events[-1][1]
+    assert record.attempts == 2
+    assert record.status_code == 200
+
+
+def test_hooks_on_error(stub_server, config, events):
+    stub_server.add_response(422, {"detail": "error"})
+    client = XCover(config)
+    record_events(client, events)
+
+    with pytest.raises(XCoverHttpException):
+        client.get_booking("VGU8R-JVDNL-INS")
+
+    assert [event for event, _ in events] == ["before_request", "after_sign", "on_error"]
+    record = events[-1][1]
+    assert record.status_code == 422
+    assert isinstance(record.error, XCoverHttpException)
+    assert "total" in record.timings
+
+
+def test_hooks_cached(stub_server, config, events):
+    stub_server.add_response(200, {"id": "VGU8R-JVDNL-INS"})
+    config.cache_maxsize = 10
+    client = XCover(config)
+    client.hooks.register("after_response", events.append)
+
+    client.get_quote("VGU8R-JVDNL-INS")
+    client.get_quote("VGU8R-JVDNL-INS")
+
+    assert [record.cached for record in events] == [False, True]
+    assert set(events[1].timings) == {"decode", "total"}
+
+
+def test_hooks_exception_is_ignored(stub_server, config, caplog):
+    stub_server.add_response(200, {"id": "VGU8R-JVDNL-INS"})
+    client = XCover(config)
+
+    @client.hooks.register("before_request")
+    def broken_hook(record):
+        raise RuntimeError("boom")
+
+    assert client.get_quote("VGU8R-JVDNL-INS") == {"id": "VGU8R-JVDNL-INS"}
+    assert "before_request hook" in caplog.text
+
+
+def test_no_record_without_hooks(stub_server, config):
+    stub_server.add_response(200, {"id": "VGU8R-JVDNL-INS"})
+    client = XCover(config)
+
+    with patch("xcover.base.CallRecord") as mocked_record:
+        client.get_quote("VGU8R-JVDNL-INS")
+
+    mocked_record.assert_not_called()
+    assert current_call.get() is None
+
+
+def test_hooks_register_unknown_event():
+    hooks = Hooks()
+
+    with pytest.raises(ValueError):
+        hooks.register("before_everything", print)
+
+
+def test_hooks_unregister():
+    hooks = Hooks()
+    assert not hooks
+
+    hooks.register("on_error", print)
+    assert hooks
+
+    hooks.unregister("on_error", print)
+    assert not hooks
+
+
+def test_call_record_finish():
+    record = CallRecord(method="GET", endpoint="quotes/{id}/", url="partners/LLODT/quotes/1/")
+    record.timings.update(prepare=0.5, sign=0.2, acquire=0.1, connect=0.3, tls=0.4, send=2.0)
+
+    record.finish()
+
+    assert record.timings["prepare"] == pytest.approx(0.3)
+    assert record.timings["wait"] == pytest.approx(1.2)
+    assert "send" not in record.timings
+    assert record.timings["total"] > 0
+
+
+def test_async_hooks(stub_server, config, events):
+    pytest.importorskip("httpx")
+    from xcover.aio import AsyncXCover
+
+    stub_server.add_response(503)
+    stub_server.add_response(200, {"status": "CONFIRMED"})
+
+    async def main():
+        async with AsyncXCover(config) as client:
+            record_events(client, events)
+            return await client.confirm_booking("VGU8R-JVDNL-INS", {"quotes": []}, auto_retry=True)
+
+    assert asyncio.run(main()) == {"status": "CONFIRMED"}
+    assert [event for event, _ in events] == [
+        "before_request",
+        "after_sign",
+        "on_retry",
+        "after_response",
+    ]
+    record = events[-1][1]
+    assert record.endpoint == "bookings/{booking_id}/confirm"
+    assert record.attempts == 2
+    assert {"encode", "sign", "connect", "wait", "read", "decode", "total"} <= set(record.timings)
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+
+import pytest
+
+DEFERRED_MODULES = ("requests", "urllib3", "asyncio", "httpx", "sqlite3")
+
+
+def imported_modules(code: str) -> set:
+    probe = f"import sys\n{code}\nprint(' '.join(sys.modules))"
+    output = subprocess.run(
+        [sys.executable, "-c", probe], capture_output=True, text=True, check=True
+    ).stdout
+    return set(output.split())
+
+
+@pytest.mark.parametrize(
+    "code",
+    (
+        "import xcover",
+        "from xcover import XCover, XCoverConfig",
+        "from xcover import XCover, XCoverConfig; XCover(XCoverConfig(base_url='http://x/'))",
+    ),
+)
+def test_http_stack_is_imported_lazily(code):
+    assert imported_modules(code).isdisjoint(DEFERRED_MODULES)
+
+
+def test_http_stack_is_imported_on_first_use():
+    modules = imported_modules("from xcover import XCover; XCover().transport")
+
+    assert {"requests", "urllib3"} <= modules
+
+
+def test_unknown_attribute():
+    import xcover
+
+    with pytest.raises(AttributeError):
+        xcover.Missing
@@ -0,0 +1,115 @@
+import json
+import random
+
+import pytest
+
+from xcover.exceptions import XCoverError
+from xcover.loadtest import Histogram, LoadTest, main, parse_mix, quote_payload
+from xcover.testing import FakeXCover, Faults, constant
+
+
+def test_parse_mix():
+    assert parse_mix("create_quote=3, get_booking=1,list_bookings=0") == {
+        "create_quote": 0.75,
+        "get_booking": 0.25,
+    }
+    with pytest.raises(XCoverError):
+        parse_mix("create_quote=1,delete_everything=1")
+    with pytest.raises(XCoverError):
+        parse_mix("create_quote=0")
+
+
+def test_histogram():
+    histogram = Histogram()
+    rng = random.Random(0)
+    latencies = sorted(rng.uniform(0.001, 0.1) for _ in range(10000))
+    for latency in latencies:
+        histogram.record(latency)
+
+    for percentile in (0.5, 0.9, 0.99):
+        exact = latencies[int(percentile * len(latencies)) - 1]
+        assert histogram.percentile(percentile) == pytest.approx(exact, rel=0.05)
+    assert histogram.max == latencies[-1]
+    # Latencies count towards the bound above their bucket, a few percent off at most
+    assert histogram.buckets((0.01, 0.05)) == [
+        [0.01, pytest.approx(909, abs=200)],
+        [0.05, pytest.approx(4040, abs=200)],
+        [float("inf"), pytest.approx(5050, abs=200)],
+    ]
+
+
+def test_payloads_are_accepted(config):
+    client = FakeXCover().client(config)
+
+    assert client.create_quote(quote_payload(random.Random(0)))["status"] == "RECEIVED"
+
+
+def test_run_rate(config):
+    fake = FakeXCover(
+        endpoint_faults={"instant_booking/": Faults(throttle_rate=0.5, retry_after=0)}, seed=1
+    )
+    mix = parse_mix("create_quote=6,get_quote=2,instant_booking=1,get_booking=1")
+    test = LoadTest(fake.client(config), mix, seed=1, prefill=2)
+
+    report = test.run_rate(1000, requests=200, max_in_flight=8)
+
+    assert report["mode"] == "open"
+    assert report["calls"] == 200
+    assert set(report["endpoints"]) == set(mix)
+    assert report["retries"] == sum(report["retries_by_endpoint"].values()) > 0
+    assert report["retries_by_endpoint"].keys() == {"instant_booking/"}
+    # Only bookings throttled more times than they are retried fail
+    assert report["errors"] == sum(report["endpoints"]["instant_booking"]["errors"].values())
+    assert report["cpu"]["us_per_call"] > 0
+    quotes = report["endpoints"]["create_quote"]
+    assert sum(count for _, count in quotes["histogram"]) == quotes["calls"]
+
+
+def test_open_loop_measures_from_schedule(config):
+    fake = FakeXCover(Faults(latency=constant(0.02)))
+    test = LoadTest(fake.client(config), {"create_quote": 1})
+
+    report = test.run_rate(200, requests=20, max_in_flight=1, poisson=False)
+
+    latency = report["endpoints"]["create_quote"]["latency_ms"]
+    # Calls queue behind the single thread, their wait counts towards latency
+    assert latency["max"] > 200
+    assert report["endpoints"]["create_quote"]["service_time_p99_ms"] < 100
+
+
+def test_run_concurrency(config):
+    fake = FakeXCover(
+        Faults(latency=constant(0.01), error_rate=0.1, error_statuses=(500,)), seed=3
+    )
+    test = LoadTest(fake.client(config), {"instant_booking": 1, "get_booking": 1}, seed=3)
+
+    report = test.run_concurrency(5, requests=100)
+
+    assert report["mode"] == "closed"
+    assert report["calls"] == 100
+    errors = sum(stats["errors"].get("HTTP 500", 0) for stats in report["endpoints"].values())
+    assert errors == report["errors"] > 0
+    assert report["calls_per_second"] > 100
+
+
+def test_main(tmp_path, monkeypatch, capsys):
+    for name in ("XC_PARTNER_CODE", "XC_AUTH_API_KEY", "XC_AUTH_API_SECRET"):
+        monkeypatch.delenv(name, raising=False)
+    output = tmp_path / "report.json"
+
+    main(
+        [
+            "--fake",
+            "--fake-latency=0.001",
+            "--rate=200",
+            "--requests=40",
+            "--prefill=2",
+            "--seed=1",
+            f"--output={output}",
+        ]
+    )
+
+    report = json.loads(output.read_text())
+    assert report["calls"] == 40
+    assert report["errors"] == 0
+    assert "create_quote" in capsys.readouterr().out
@@ -0,0 +1,178 @@
+import datetime
+from dataclasses import replace
+from decimal import Decimal
+
+import pytest
+
+from xcover import XCover
+from xcover.models import (
+    Booking,
+    BookingPage,
+    Instalments,
+    Quote,
+    QuotePackage,
+    to_datetime,
+    to_decimal,
+)
+
+QUOTE_PACKAGE = {
+    "id": "VGU8R-JVDNL-INS",
+    "status": "RECEIVED",
+    "currency": "GBP",
+    "total_price": 4.02,
+    "total_price_formatted": "£4.02",
+    "partner_transaction_id": None,
+    "created_at": "2021-09-24T13:30:18.491325Z",
+    "quotes": {
+        "1": {"id": "quote-2", "price": 2.01, "policy_start_date": "2021-09-25T00:11:11+00:00"},
+        "0": {"id": "quote-1", "price": 2.01, "tax": {"total_tax": 1.11}},
+    },
+    "unknown_field": [1, 2, 3],
+}
+
+INSTALMENTS = {
+    "quotes": [
+        {
+            "id": "quote-1",
+            "paid_until": "2021-11-26T12:54:07.365858Z",
+            "next_payment": {"id": "payment-2", "number": 2, "total_amount": 0.17},
+            "payment_schedule": [
+                {"id": "payment-1", "number": 1, "status": "PAID", "total_amount": 0.17},
+                {"id": "payment-2", "number": 2, "status": "UNPAID", "total_amount": 0.17},
+            ],
+        }
+    ]
+}
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    ((2.01, Decimal("2.01")), (5, Decimal(5)), ("0.10", Decimal("0.10")), (None, None)),
+)
+def test_to_decimal(value, expected):
+    assert to_decimal(value) == expected
+    if expected is not None:
+        assert str(to_decimal(value)) == str(expected)
+
+
+def test_to_datetime():
+    assert to_datetime("2021-09-24T13:30:18.491325Z") == datetime.datetime(
+        2021, 9, 24, 13, 30, 18, 491325, tzinfo=datetime.timezone.utc
+    )
+    assert to_datetime("2021-09-25T00:11:11+00:00").tzinfo == datetime.timezone.utc
+    assert to_datetime(None) is None
+
+
+def test_quote_package():
+    package = QuotePackage(QUOTE_PACKAGE)
+
+    assert package.id == "VGU8R-JVDNL-INS"
+    assert package.total_price == Decimal("4.02")
+    assert package.partner_transaction_id is None
+    assert package.created_at.year == 2021
+    assert [quote.id for quote in package.quotes] == ["quote-1", "quote-2"]
+    assert all(isinstance(quote, Quote) for quote in package.quotes)
+    assert package.quotes[0].price + package.quotes[1].price == package.total_price
+    assert package.quotes[0].tax == {"total_tax": 1.11}
+    assert package.quotes[1].policy_start_date.day == 25
+    assert package.get("unknown_field") == [1, 2, 3]
+    assert package.raw is QUOTE_PACKAGE
+
+
+def test_fields_are_converted_lazily():
+    package = QuotePackage(QUOTE_PACKAGE)
+
+    with pytest.raises(AttributeError):
+        package._quotes
+
+    quotes = package.quotes
+
+    assert package.quotes is quotes
+    assert package._quotes is quotes
+
+
+def test_models_are_slotted():
+    booking = Booking({"id": "VGU8R-JVDNL-INS", "policyholder": {"first_name": "Ada"}})
+
+    assert not hasattr(booking, "__dict__")
+    assert booking.policyholder == {"first_name": "Ada"}
+    with pytest.raises(AttributeError):
+        booking.anything = 1
+
+
+def test_model_repr_and_equality():
+    assert repr(Booking({"id": "VGU8R-JVDNL-INS"})) == "<Booking VGU8R-JVDNL-INS>"
+    assert Booking({"id": "A"}) == Booking({"id": "A"})
+    assert Booking({"id": "A"}) != QuotePackage({"id": "A"})
+
+
+def test_booking_page():
+    page = BookingPage({"count": 2, "next": None, "results": [{"id": "A"}, {"id": "B"}]})
+
+    assert page.count == 2
+    assert page.next is None
+    assert [booking.id for booking in page.results] == ["A", "B"]
+
+
+def test_instalments():
+    instalments = Instalments(INSTALMENTS)
+    quote = instalments.quotes[0]
+
+    assert quote.paid_until.month == 11
+    assert quote.next_payment.number == 2
+    assert [payment.status for payment in quote.payment_schedule] == ["PAID", "UNPAID"]
+    assert sum(payment.total_amount for payment in quote.payment_schedule) == Decimal("0.34")
+
+
+@pytest.fixture()
+def config(config):
+    return replace(config, response_models=True)
+
+
+def test_client_returns_models(stub_server, config):
+    stub_server.add_response(200, QUOTE_PACKAGE)
+    stub_server.add_response(200, {"id": "VGU8R-JVDNL-INS", "status": "CONFIRMED"})
+    stub_server.add_response(200, INSTALMENTS)
+    stub_server.add_response(204)
+    client = XCover(config)
+
+    quote = client.get_quote("VGU8R-JVDNL-INS")
+    booking = client.instant_booking({})
+    instalments = client.get_instalments("VGU8R-JVDNL-INS")
+
+    assert isinstance(quote, QuotePackage)
+    assert quote.total_price == Decimal("4.02")
+    assert isinstance(booking, Booking)
+    assert booking.status == "CONFIRMED"
+    assert isinstance(instalments, Instalments)
+    # Endpoints without a model or without content are unaffected
+    assert client.trigger_email("VGU8R-JVDNL-INS") is True
+
+
+def test_client_returns_dicts_by_default(stub_server, config):
+    config.response_models = False
+    stub_server.add_response(200, QUOTE_PACKAGE)
+    client = XCover(config)
+
+    assert client.get_quote("VGU8R-JVDNL-INS") == QUOTE_PACKAGE
+
+
+def test_iter_bookings_yields_models(stub_server, config):
+    stub_server.add_response(
+        200, {"count": 2, "next": None, "results": [{"id": "A"}, {"id": "B"}]}
+    )
+    client = XCover(config)
+
+    bookings = list(client.iter_bookings())
+
+    assert [booking.id for booking in bookings] == ["A", "B"]
+    assert all(isinstance(booking, Booking) for booking in bookings)
+
+
+def test_create_quotes_many_returns_models(stub_server, config):
+    stub_server.responder = lambda request: (200, QUOTE_PACKAGE, {})
+    client = XCover(config)
+
+    results = client.create_quotes_many([{}, {}])
+
+    assert [result.result.id for result in results] == ["VGU8R-JVDNL-INS"] * 2
@@ -0,0 +1,169 @@
+import sqlite3
+import time
+
+import pytest
+
+from xcover import XCover
+from xcover.exceptions import XCoverError, XCoverHttpException
+from xcover.outbox import DONE, FAILED, PENDING, SENDING, Outbox
+
+
+@pytest.fixture()
+def path(tmp_path):
+    return str(tmp_path / "outbox.sqlite3")
+
+
+def test_calls_are_journaled(stub_server, config, path):
+    outbox = Outbox(XCover(config), path)
+
+    key = outbox.confirm_booking("VGU8R-JVDNL-INS", {"security_token": "abc"})
+
+    assert stub_server.requests == []
+    entry = outbox.entry(key)
+    assert entry.status == PENDING
+    assert entry.url == "bookings/VGU8R-JVDNL-INS/confirm"
+    assert outbox.counts() == {PENDING: 1}
+
+
+def test_outbox_uses_client_state(config, path):
+    client = XCover(config)
+    outbox = Outbox(client, path)
+
+    assert outbox.config is client.config
+    assert outbox.codec is client.codec
+    assert outbox.auth is client.auth
+    assert outbox.cache is client.cache
+    assert outbox.hooks is client.hooks
+    outbox.close()
+
+
+def test_flush_sends_with_idempotency_key(stub_server, config, path):
+    stub_server.add_response(200, {"status": "CONFIRMED"})
+    stub_server.add_response(204)
+    outbox = Outbox(XCover(config), path)
+    confirm_key = outbox.confirm_booking("VGU8R-JVDNL-INS", {"security_token": "abc"})
+    email_key = outbox.trigger_email("VGU8R-JVDNL-INS")
+
+    assert outbox.flush() == 1
+    assert outbox.flush() == 1
+    assert outbox.flush() == 0
+
+    requests = stub_server.requests
+    assert requests[0].headers["x-idempotency-key"] == confirm_key
+    assert requests[0].json() == {"security_token": "abc"}
+    assert requests[1].path.endswith("/send_email")
+    assert outbox.entry(confirm_key).result == {"status": "CONFIRMED"}
+    assert outbox.entry(email_key).result is True
+    assert all(entry.ok for entry in outbox.entries())
+
+
+def test_flush_batches_independent_resources(stub_server, config, path):
+    stub_server.responder = lambda request: (200, {}, {})
+    outbox = Outbox(XCover(config), path, batch_size=10)
+    for booking_id in ("A", "B", "C"):
+        outbox.confirm_booking(booking_id)
+    outbox.cancel_booking("A")
+
+    assert outbox.flush() == 3
+    assert outbox.flush() == 1
+    assert outbox.counts() == {DONE: 4}
+
+
+def test_failed_call_is_retried(stub_server, config, path):
+    stub_server.add_response(503)
+    stub_server.add_response(200, {"status": "CONFIRMED"})
+    outbox = Outbox(XCover(config), path)
+    key = outbox.update_instalment_payment_status("VGU8R-JVDNL-INS", {}, auto_retry=False)
+
+    outbox.flush()
+    entry = outbox.entry(key)
+    assert entry.status == PENDING
+    assert entry.attempts == 1
+    assert "503" in entry.error
+
+    outbox.flush()
+    assert outbox.entry(key).status == DONE
+    assert [request.headers["x-idempotency-key"] for request in stub_server.requests] == [key] * 2
+
+
+def test_client_error_is_final(stub_server, config, path):
+    stub_server.add_response(400, {"detail": "Invalid."})
+    outbox = Outbox(XCover(config), path)
+    key = outbox.confirm_booking("VGU8R-JVDNL-INS")
+
+    outbox.flush()
+
+    assert outbox.entry(key).status == FAILED
+    assert outbox.flush() == 0
+
+
+def test_max_attempts(stub_server, config, path):
+    stub_server.responder = lambda request: (503, None, {})
+    outbox = Outbox(XCover(config), path, max_attempts=2)
+    key = outbox.confirm_booking("VGU8R-JVDNL-INS", auto_retry=False)
+
+    outbox.flush()
+    outbox.flush()
+
+    assert outbox.entry(key).status == FAILED
+    assert outbox.entry(key).attempts == 2
+
+
+def test_crash_resume(stub_server, config, path):
+    stub_server.add_response(200, {"status": "CONFIRMED"})
+    key = Outbox(XCover(config), path).confirm_booking("VGU8R-JVDNL-INS")
+    # Process died while the call was in flight
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE outbox SET status = ?", (SENDING,))
+
+    outbox = Outbox(XCover(config), path)
+
+    assert outbox.entry(key).status == PENDING
+    outbox.flush()
+    assert outbox.entry(key).status == DONE
+    assert stub_server.requests[0].headers["x-idempotency-key"] == key
+
+
+def test_background_flushing(stub_server, config, path):
+    stub_server.responder = lambda request: (time.sleep(0.05) or 200, {}, {})
+
+    with Outbox(XCover(config), path, flush_interval=0.05) as outbox:
+        started = time.perf_counter()
+        keys = [outbox.confirm_booking(f"booking-{index}") for index in range(10)]
+        # Journaling doesn't wait for XCover
+        assert time.perf_counter() - started < 0.05 * 10
+        assert outbox.drain(timeout=5)
+
+    assert len(stub_server.requests) == 10
+    assert {request.headers["x-idempotency-key"] for request in stub_server.requests} == set(keys)
+
+
+def test_reads_are_rejected(config, path):
+    outbox = Outbox(XCover(config), path)
+
+    with pytest.raises(XCoverError):
+        outbox.get_booking("VGU8R-JVDNL-INS")
+
+
+def test_http_exception_status_code(stub_server, config):
+    stub_server.add_response(404, {"detail": "Not found."})
+
+    with pytest.raises(XCoverHttpException) as exc_info:
+        XCover(config).get_booking("VGU8R-JVDNL-INS")
+
+    assert exc_info.value.status_code == 404
+
+
+def test_idempotency_key_opt_out(stub_server, config, path):
+    stub_server.add_response(200, {"id": "QUOTE"})
+    stub_server.add_response(200, {"id": "QUOTE"})
+    outbox = Outbox(XCover(config), path)
+    key = outbox.create_quote({"request": []})
+
+    assert outbox.flush() == 1
+    outbox.client.create_quote({"request": []})
+
+    sent, direct = stub_server.requests
+    assert "x-idempotency-key" not in sent.headers
+    assert "x-idempotency-key" not in direct.headers
+    assert outbox.entry(key).result == {"id": "QUOTE"}
@@ -0,0 +1,246 @@
+import asyncio
+import time
+from dataclasses import replace
+
+import pytest
+
+from xcover import XCover
+from xcover.auth import PartnerSigners
+from xcover.config import PartnerConfig
+from xcover.exceptions import XCoverCircuitOpenError, XCoverError, XCoverHttpException
+from xcover.workflow import Workflow
+
+PARTNERS = [
+    PartnerConfig("PARTA", "key-a", "secret-a"),
+    PartnerConfig("PARTB", "key-b", "secret-b", auth_algorithm="hmac-sha384"),
+]
+
+
+@pytest.fixture()
+def config(config):
+    return replace(config, partners=list(PARTNERS))
+
+
+def key_id(request) -> str:
+    return request.headers["authorization"].split('keyId="', 1)[1].split('"', 1)[0]
+
+
+def test_signers_are_compiled_once():
+    signers = PartnerSigners("(request-target) date")
+    signers.add(PARTNERS[0])
+
+    auth = signers.get("PARTA")
+
+    assert signers.get("PARTA") is auth
+    assert auth.config.api_key == "key-a"
+    assert auth.config.headers == "(request-target) date"
+
+
+def test_signers_lru():
+    signers = PartnerSigners("date", maxsize=1)
+    for partner in PARTNERS:
+        signers.add(partner)
+
+    auth = signers.get("PARTA")
+    signers.get("PARTB")
+
+    assert len(signers) == 1
+    assert signers.get("PARTA") is not auth
+
+
+def test_signers_replaced_partner():
+    signers = PartnerSigners("date")
+    signers.add(PARTNERS[0])
+    signers.get("PARTA")
+
+    signers.add(PartnerConfig("PARTA", "key-rotated", "secret-rotated"))
+
+    assert signers.get("PARTA").config.api_key == "key-rotated"
+
+
+def test_unknown_partner():
+    signers = PartnerSigners("date")
+
+    with pytest.raises(XCoverError):
+        signers.get("NOPE")
+
+
+def test_partner_argument(stub_server, config):
+    client = XCover(config)
+
+    client.get_booking("VGU8R-JVDNL-INS")
+    client.get_booking("VGU8R-JVDNL-INS", partner="PARTA")
+    client.confirm_booking("VGU8R-JVDNL-INS", partner="PARTB")
+
+    default, first, second = stub_server.requests
+    assert default.path == "/partners/LLODT/bookings/VGU8R-JVDNL-INS/"
+    assert key_id(default) == "test_api_key"
+    assert first.path == "/partners/PARTA/bookings/VGU8R-JVDNL-INS/"
+    assert key_id(first) == "key-a"
+    assert second.path == "/partners/PARTB/bookings/VGU8R-JVDNL-INS/confirm"
+    assert key_id(second) == "key-b"
+    assert 'algorithm="hmac-sha384"' in second.headers["authorization"]
+
+
+def test_unregistered_partner_is_not_called(stub_server, config):
+    client = XCover(config)
+
+    with pytest.raises(XCoverError):
+        client.get_booking("VGU8R-JVDNL-INS", partner="NOPE")
+    assert stub_server.requests == []
+
+
+def test_add_partner(stub_server, config):
+    client = XCover(config)
+    client.add_partner(PartnerConfig("PARTC", "key-c", "secret-c"))
+
+    client.get_quote("VGU8R-JVDNL-INS", partner="PARTC")
+
+    assert key_id(stub_server.requests[0]) == "key-c"
+
+
+def test_partner_view(stub_server, config):
+    client = XCover(config)
+    partner = client.partner("PARTA")
+
+    partner.get_booking("VGU8R-JVDNL-INS")
+    results = partner.create_quotes_many([{"request": 1}, {"request": 2}])
+
+    assert all(result.ok for result in results)
+    assert [request.path for request in stub_server.requests] == [
+        "/partners/PARTA/bookings/VGU8R-JVDNL-INS/",
+        "/partners/PARTA/quotes/",
+        "/partners/PARTA/quotes/",
+    ]
+    assert {key_id(request) for request in stub_server.requests} == {"key-a"}
+    assert partner.hooks is client.hooks
+    assert partner.transport is client.transport
+
+
+def test_partner_view_iter_bookings(stub_server, config):
+    stub_server.add_response(200, {"count": 1, "next": None, "results": [{"id": "BOOKING"}]})
+    client = XCover(config)
+
+    assert list(client.partner("PARTB").iter_bookings()) == [{"id": "BOOKING"}]
+    assert stub_server.requests[0].path.startswith("/partners/PARTB/bookings/")
+
+
+def test_iter_bookings_partner(stub_server, config):
+    stub_server.add_response(200, {"count": 1, "next": None, "results": [{"id": "BOOKING"}]})
+    client = XCover(config)
+
+    assert list(client.iter_bookings(partner="PARTA", status="CONFIRMED")) == [{"id": "BOOKING"}]
+    path, _, query = stub_server.requests[0].path.partition("?")
+    assert path == "/partners/PARTA/bookings/"
+    assert "partner" not in query and "status=CONFIRMED" in query
+
+
+def test_partners_have_separate_circuits(stub_server, config):
+    config.circuit_breaker = True
+    config.circuit_minimum_calls = 2
+    config.circuit_window_size = 2
+    stub_server.add_response(500)
+    stub_server.add_response(503)
+    client = XCover(config)
+
+    for _ in range(2):
+        with pytest.raises(XCoverHttpException):
+            client.get_booking("VGU8R-JVDNL-INS", partner="PARTA")
+    with pytest.raises(XCoverCircuitOpenError):
+        client.get_booking("VGU8R-JVDNL-INS", partner="PARTA")
+
+    client.get_booking("VGU8R-JVDNL-INS", partner="PARTB")
+    client.get_booking("VGU8R-JVDNL-INS")
+    assert len(stub_server.requests) == 4
+
+
+def test_partners_have_separate_rate_limits(stub_server, config):
+    config.rate_limit = 100
+    stub_server.add_response(429, {"detail": "Throttled."}, {"Retry-After": "0"})
+    client = XCover(config)
+
+    with pytest.raises(XCoverHttpException):
+        client.get_booking("VGU8R-JVDNL-INS", partner="PARTA")
+    client.get_booking("VGU8R-JVDNL-INS", partner="PARTB")
+
+    assert client.rate_limiter.bucket("bookings", "PARTA").current_rate == 50
+    assert client.rate_limiter.bucket("bookings", "PARTB").current_rate == 100
+
+
+def test_partner_rate_limits(config):
+    config.rate_limits = {"quotes": 20, "bookings": 10}
+    config.partners = [
+        PartnerConfig("PARTA", "key-a", "secret-a", rate_limits={"bookings": 2}),
+        PartnerConfig("PARTB", "key-b", "secret-b", rate_limit=0),
+        PartnerConfig("PARTC", "key-c", "secret-c"),
+    ]
+    client = XCover(config)
+    client.add_partner(PartnerConfig("PARTD", "key-d", "secret-d", rate_limit=1))
+    limiter = client.rate_limiter
+
+    assert limiter.bucket("bookings", "PARTA").rate == 2
+    assert limiter.bucket("quotes", "PARTA") is None
+    assert limiter.bucket("bookings", "PARTB") is None
+    assert limiter.bucket("bookings", "PARTC").rate == 10
+    assert limiter.bucket("quotes", "PARTD").rate == 1
+    assert limiter.bucket("quotes", "LLODT").rate == 20
+
+
+def test_partner_rate_limits_without_client_limits(stub_server, config):
+    config.rate_limit_burst = 1
+    config.partners = [PartnerConfig("PARTA", "key-a", "secret-a", rate_limit=20)]
+    client = XCover(config)
+
+    started = time.monotonic()
+    for _ in range(3):
+        client.get_quote("VGU8R-JVDNL-INS", partner="PARTA")
+    client.get_quote("VGU8R-JVDNL-INS")
+
+    assert time.monotonic() - started >= 2 / 20
+    assert client.rate_limiter.bucket("quotes", "LLODT") is None
+
+
+def test_partner_view_workflows(stub_server, config):
+    client = XCover(config)
+    workflow = Workflow("booking").then("get", lambda client, results: client.get_booking("B1"))
+
+    (result,) = client.partner("PARTB").run_workflows([workflow])
+
+    assert result.ok
+    assert stub_server.requests[0].path == "/partners/PARTB/bookings/B1/"
+
+
+def test_cache_is_keyed_by_partner(stub_server, config):
+    config.cache_maxsize = 10
+    client = XCover(config)
+
+    for partner in ("PARTA", "PARTB", "PARTA"):
+        client.get_booking("VGU8R-JVDNL-INS", partner=partner)
+
+    assert len(stub_server.requests) == 2
+
+
+def test_call_record_partner(stub_server, config):
+    client = XCover(config)
+    records = []
+    client.hooks.register("after_response", records.append)
+
+    client.partner("PARTA").get_booking("VGU8R-JVDNL-INS")
+
+    assert records[0].partner_code == "PARTA"
+    assert records[0].url == "partners/PARTA/bookings/VGU8R-JVDNL-INS/"
+    assert key_id(stub_server.requests[0]) == "key-a"
+
+
+def test_async_partner(stub_server, config):
+    pytest.importorskip("httpx")
+    from xcover.aio import AsyncXCover
+
+    async def main():
+        async with AsyncXCover(config) as client:
+            await client.partner("PARTB").get_booking("VGU8R-JVDNL-INS")
+
+    asyncio.run(main())
+
+    assert stub_server.requests[0].path == "/partners/PARTB/bookings/VGU8R-JVDNL-INS/"
+    assert key_id(stub_server.requests[0]) == "key-b"
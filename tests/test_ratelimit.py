@@ -0,0 +1,185 @@
+import time
+from dataclasses import replace
+
+import pytest
+
+from xcover import XCover, XCoverConfig
+from xcover.exceptions import XCoverDeadlineExceeded, XCoverHttpException
+from xcover.ratelimit import RateLimiter, TokenBucket
+
+from .factories import InstantBookingFactory
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=2, clock=clock)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1)
+    assert bucket.reserve() == pytest.approx(0.2)
+
+    clock.now += 1
+    assert bucket.reserve() == 0
+
+
+def test_token_bucket_max_wait():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=1, clock=clock)
+
+    assert bucket.reserve(max_wait=0.05) == 0
+    assert bucket.reserve(max_wait=0.05) is None
+    # The token wasn't taken
+    assert bucket.reserve(max_wait=0.2) == pytest.approx(0.1)
+
+
+def test_token_bucket_throttle():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=10, clock=clock)
+
+    bucket.throttle(retry_after=2)
+
+    assert bucket.current_rate == 5
+    assert bucket.reserve() == pytest.approx(2 + 1 / 5)
+
+    # Nothing is accumulated while paused
+    clock.now += 2
+    assert bucket.reserve() == pytest.approx(2 / 5)
+
+
+def test_token_bucket_recover():
+    bucket = TokenBucket(rate=10, clock=FakeClock())
+    for _ in range(10):
+        bucket.throttle()
+    assert bucket.current_rate == 1
+
+    bucket.recover()
+    assert bucket.current_rate == 1.5
+
+    for _ in range(100):
+        bucket.recover()
+    assert bucket.current_rate == 10
+
+
+def test_rate_limiter_families():
+    limiter = RateLimiter(rate=0, family_rates={"quotes": 1})
+
+    assert limiter.bucket("bookings") is None
+    assert limiter.reserve("bookings") == 0
+    assert limiter.bucket("quotes").rate == 1
+    assert limiter.bucket("quotes") is limiter.bucket("quotes")
+    limiter.throttle("bookings", 10)
+    assert limiter.reserve("bookings") == 0
+
+
+def test_rate_limiter_partners():
+    limiter = RateLimiter(rate=10, family_rates={"quotes": 50}, burst=2)
+    assert limiter.bucket("bookings", "PARTA").rate == 10
+
+    limiter.add_partner("PARTA", rate=1)
+    limiter.add_partner("PARTB", family_rates={"bookings": 5})
+
+    assert limiter.bucket("bookings", "PARTA").rate == 1
+    assert limiter.bucket("quotes", "PARTA").rate == 1
+    assert limiter.bucket("bookings", "PARTA").burst == 2
+    assert limiter.bucket("bookings", "PARTB").rate == 5
+    assert limiter.bucket("quotes", "PARTB") is None
+    assert limiter.bucket("quotes", "LLODT").rate == 50
+
+
+@pytest.fixture()
+def config(config):
+    return replace(config, rate_limits={"quotes": 20, "bookings": 100}, rate_limit_burst=1)
+
+
+def test_rate_limit_config(config):
+    client = XCover(config)
+
+    assert client.rate_limiter.bucket("quotes", "LLODT").rate == 20
+    assert client.rate_limiter.bucket("quotes", "LLODT").burst == 1
+    assert client.rate_limiter.bucket("renewals") is None
+
+
+def test_rate_limiter_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("XC_RATE_LIMIT", raising=False)
+    monkeypatch.delenv("XC_RATE_LIMITS", raising=False)
+
+    assert XCover(XCoverConfig()).rate_limiter is None
+
+
+def test_shared_rate_limiter(config):
+    limiter = RateLimiter(rate=1)
+
+    assert XCover(config, rate_limiter=limiter).rate_limiter is limiter
+    assert XCover(config, rate_limiter=limiter).rate_limiter is limiter
+
+
+def test_calls_are_rate_limited(stub_server, config):
+    with XCover(config) as client:
+        started = time.monotonic()
+        for _ in range(5):
+            client.get_quote("ABC-INS")
+        elapsed = time.monotonic() - started
+
+    assert elapsed >= 4 / 20
+
+
+def test_429_throttles(stub_server, config):
+    stub_server.add_response(429, headers={"Retry-After": "0"})
+
+    with XCover(config) as client:
+        with pytest.raises(XCoverHttpException):
+            client.get_quote("ABC-INS")
+        assert client.rate_limiter.bucket("quotes", "LLODT").current_rate == 10
+
+        client.get_quote("ABC-INS")
+        assert client.rate_limiter.bucket("quotes", "LLODT").current_rate == 11
+
+
+def test_retried_429_throttles(stub_server, config):
+    stub_server.add_response(429, headers={"Retry-After": "0"})
+    stub_server.add_response(429, headers={"Retry-After": "0"})
+    stub_server.add_response(200, {"status": "CONFIRMED"})
+
+    with XCover(config) as client:
+        assert client.instant_booking(InstantBookingFactory()) == {"status": "CONFIRMED"}
+        # Halved twice by retried responses, then recovered once
+        assert client.rate_limiter.bucket("bookings", "LLODT").current_rate == 30
+
+    assert len(stub_server.requests) == 3
+
+
+def test_rate_limit_wait_is_bounded_by_deadline(stub_server, config):
+    config.rate_limits = {"quotes": 1}
+
+    with XCover(config) as client:
+        client.get_quote("ABC-INS")
+        started = time.monotonic()
+        with pytest.raises(XCoverDeadlineExceeded):
+            client.get_quote("ABC-INS", deadline=0.2)
+        elapsed = time.monotonic() - started
+
+    assert elapsed < 0.2
+    assert len(stub_server.requests) == 1
+
+
+def test_retry_rate_limit_wait_is_bounded_by_deadline(stub_server, config):
+    config.rate_limits = {"bookings": 1}
+    stub_server.add_response(429, headers={"Retry-After": "0"})
+
+    with XCover(config) as client:
+        started = time.monotonic()
+        with pytest.raises(XCoverDeadlineExceeded):
+            client.instant_booking(InstantBookingFactory(), deadline=0.3)
+        elapsed = time.monotonic() - started
+
+    assert elapsed < 0.3
+    assert len(stub_server.requests) == 1
@@ -0,0 +1,143 @@
+import pytest
+
+from xcover.renewals import FAILED, OPTED_OUT, RENEWED, RENEWING, SKIPPED, BulkRenewal
+from xcover.testing import FakeXCover, Faults
+
+from .factories import InstantBookingFactory
+
+CONFIRM = "renewals/{booking_id}/confirm/{renewal_id}/"
+
+
+@pytest.fixture()
+def fake():
+    return FakeXCover(seed=1)
+
+
+@pytest.fixture()
+def path(tmp_path):
+    return str(tmp_path / "renewals.sqlite3")
+
+
+def book(client, count):
+    return [client.instant_booking(InstantBookingFactory())["id"] for _ in range(count)]
+
+
+def test_run(fake, config, path):
+    client = fake.client(config)
+    booking_ids = book(client, 6)
+    decisions = dict(zip(booking_ids, [True, True, True, False, False, None]))
+
+    with BulkRenewal(client, path, lambda booking_id, renewal: decisions[booking_id]) as renewals:
+        summary = renewals.run(booking_ids)
+        assert renewals.counts() == {RENEWED: 3, OPTED_OUT: 2, SKIPPED: 1}
+
+    assert (summary.renewed, summary.opted_out, summary.skipped) == (3, 2, 1)
+    assert summary.ok and summary.processed == 6 and summary.already_done == 0
+    assert fake.calls[(CONFIRM, 200)] == 3
+    assert fake.calls[("renewals/{booking_id}/opt_out/", 204)] == 2
+    assert not fake.packages["LLODT"][booking_ids[3]]["quotes"][0]["is_renewable"]
+
+
+def test_resume_skips_completed_bookings(fake, config, path):
+    client = fake.client(config)
+    booking_ids = book(client, 5)
+    decided = []
+
+    def decide(booking_id, renewal):
+        decided.append(booking_id)
+        return True
+
+    with BulkRenewal(client, path, decide, max_concurrency=2) as renewals:
+        renewals.run(booking_ids[:3])
+
+    with BulkRenewal(client, path, decide, max_concurrency=2) as renewals:
+        summary = renewals.run(iter(booking_ids + booking_ids[:1]))
+
+    assert (summary.renewed, summary.already_done) == (2, 3)
+    assert sorted(decided) == sorted(booking_ids)
+    assert fake.calls[(CONFIRM, 200)] == 5
+
+
+def test_failed_quote_is_retried(fake, config, path):
+    client = fake.client(config)
+    (booking_id,) = book(client, 1)
+
+    with BulkRenewal(client, path, lambda booking_id, renewal: True) as renewals:
+        summary = renewals.run([booking_id, "UNKNOWN-BOOKING-INS"])
+
+        assert (summary.renewed, summary.failed) == (1, 1)
+        assert "UNKNOWN-BOOKING-INS" in summary.errors
+        assert renewals.counts() == {RENEWED: 1, FAILED: 1}
+        assert renewals.run([booking_id, "UNKNOWN-BOOKING-INS"]).failed == 1
+    assert fake.calls[("renewals/{booking_id}/quote_for_renewal/", 404)] == 2
+
+
+def test_unknown_outcome_is_sent_again_with_same_key(fake, config, path):
+    config.http_timeout = 0.05
+    config.retry_total = 1
+    client = fake.client(config)
+    (booking_id,) = book(client, 1)
+    end_date = fake.packages["LLODT"][booking_id]["quotes"][0]["policy_end_date"]
+    fake.endpoint_faults[CONFIRM] = Faults(timeout_rate=1)
+
+    with BulkRenewal(client, path, lambda booking_id, renewal: True) as renewals:
+        assert renewals.run([booking_id]).failed == 1
+        # The confirmation was applied, only its response was lost
+        assert renewals.counts() == {RENEWING: 1}
+
+        del fake.endpoint_faults[CONFIRM]
+        assert renewals.run([booking_id]).renewed == 1
+    renewed = client.get_booking(booking_id)
+    assert renewed["quotes"][0]["policy_start_date"] == end_date
+    assert fake.calls[("renewals/{booking_id}/quote_for_renewal/", 200)] == 1
+
+
+def test_decide_error_stops_run(fake, config, path):
+    client = fake.client(config)
+    booking_ids = book(client, 10)
+
+    def decide(booking_id, renewal):
+        raise ValueError("No price rule")
+
+    with BulkRenewal(client, path, decide, max_concurrency=1) as renewals:
+        with pytest.raises(ValueError):
+            renewals.run(booking_ids)
+        assert renewals.counts() == {}
+    assert fake.calls[("renewals/{booking_id}/quote_for_renewal/", 200)] < 10
+
+
+def test_quote_without_renewal_id_fails(fake, config, path, monkeypatch):
+    client = fake.client(config)
+    booking_ids = book(client, 2)
+    quote_for_renewal = client.quote_for_renewal
+
+    def quote_without_id(booking_id):
+        renewal = dict(quote_for_renewal(booking_id))
+        del renewal["renewal_id"]
+        return renewal
+
+    monkeypatch.setattr(client, "quote_for_renewal", quote_without_id)
+    decisions = dict(zip(booking_ids, [True, False]))
+
+    with BulkRenewal(client, path, lambda booking_id, renewal: decisions[booking_id]) as renewals:
+        summary = renewals.run(booking_ids)
+        assert renewals.counts() == {FAILED: 1, OPTED_OUT: 1}
+
+    assert (summary.failed, summary.opted_out) == (1, 1)
+    assert "renewal_id" in summary.errors[booking_ids[0]]
+    assert not any(endpoint == CONFIRM for endpoint, _ in fake.calls)
+
+
+def test_repeated_booking_is_processed_once(fake, config, path):
+    client = fake.client(config)
+    booking_ids = book(client, 6)
+
+    with BulkRenewal(
+        client, path, lambda booking_id, renewal: True, max_concurrency=2
+    ) as renewals:
+        summary = renewals.run(
+            iter(booking_ids + ["UNKNOWN-BOOKING-INS"] + booking_ids * 2 + ["UNKNOWN-BOOKING-INS"])
+        )
+
+    assert (summary.renewed, summary.failed, summary.already_done) == (6, 1, 0)
+    assert fake.calls[(CONFIRM, 200)] == 6
@@ -0,0 +1,254 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+import pytest
+
+from xcover import XCover
+from xcover.exceptions import XCoverDeadlineExceeded, XCoverHttpException
+from xcover.singleflight import AsyncSingleFlight, SingleFlight
+from xcover.timeouts import Deadline
+
+
+@pytest.fixture()
+def config(config):
+    return replace(config, coalesce_gets=True)
+
+
+def slow_responder(status, data, delay=0.2):
+    def respond(request):
+        time.sleep(delay)
+        return status, data, {}
+
+    return respond
+
+
+def test_singleflight_shares_result():
+    singleflight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"id": 1}
+
+    with ThreadPoolExecutor(4) as executor:
+        leader = executor.submit(singleflight.do, "key", func)
+        started.wait(5)
+        followers = [executor.submit(singleflight.do, "key", func) for _ in range(3)]
+        time.sleep(0.05)
+        release.set()
+        results = [leader.result()] + [future.result() for future in followers]
+
+    assert calls == [1]
+    assert results == [{"id": 1}] * 4
+    assert len(singleflight) == 0
+
+
+def test_singleflight_shares_exception():
+    singleflight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def func():
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(2) as executor:
+        leader = executor.submit(singleflight.do, "key", func)
+        started.wait(5)
+        follower = executor.submit(singleflight.do, "key", func)
+        time.sleep(0.05)
+        release.set()
+
+        with pytest.raises(ValueError):
+            leader.result()
+        with pytest.raises(ValueError):
+            follower.result()
+
+    assert len(singleflight) == 0
+
+
+def test_singleflight_runs_again_after_completion():
+    singleflight = SingleFlight()
+
+    assert singleflight.do("key", lambda: 1) == 1
+    assert singleflight.do("key", lambda: 2) == 2
+
+
+def test_singleflight_follower_deadline():
+    singleflight = SingleFlight()
+    started = threading.Event()
+
+    def func():
+        started.set()
+        time.sleep(0.5)
+        return "done"
+
+    with ThreadPoolExecutor(2) as executor:
+        leader = executor.submit(singleflight.do, "key", func)
+        started.wait(5)
+        begin = time.perf_counter()
+        with pytest.raises(XCoverDeadlineExceeded):
+            singleflight.do("key", func, Deadline(0.1))
+        assert time.perf_counter() - begin < 0.3
+        assert leader.result() == "done"
+
+
+def test_async_singleflight():
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"id": 1}
+
+    async def main():
+        singleflight = AsyncSingleFlight()
+        results = await asyncio.gather(*(singleflight.do("key", func) for _ in range(5)))
+        assert len(singleflight) == 0
+        return results
+
+    assert asyncio.run(main()) == [{"id": 1}] * 5
+    assert calls == [1]
+
+
+def test_async_singleflight_cancelled_caller():
+    async def func():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        singleflight = AsyncSingleFlight()
+        first = asyncio.ensure_future(singleflight.do("key", func))
+        second = asyncio.ensure_future(singleflight.do("key", func))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(main()) == ("done", True)
+
+
+def test_async_singleflight_shares_exception():
+    async def func():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        singleflight = AsyncSingleFlight()
+        return await asyncio.gather(
+            singleflight.do("key", func), singleflight.do("key", func), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+
+
+def test_async_singleflight_follower_deadline():
+    async def func():
+        await asyncio.sleep(0.3)
+        return "done"
+
+    async def main():
+        singleflight = AsyncSingleFlight()
+        leader = asyncio.ensure_future(singleflight.do("key", func))
+        await asyncio.sleep(0)
+        with pytest.raises(XCoverDeadlineExceeded):
+            await singleflight.do("key", func, Deadline(0.05))
+        return await leader
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_concurrent_gets_are_coalesced(stub_server, config):
+    stub_server.responder = slow_responder(200, {"id": "VGU8R-JVDNL-INS"})
+    client = XCover(config)
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: client.get_quote("VGU8R-JVDNL-INS"), range(8)))
+
+    assert results == [{"id": "VGU8R-JVDNL-INS"}] * 8
+    assert len(stub_server.requests) == 1
+    # Each caller gets its own decoded result
+    assert len({id(result) for result in results}) == 8
+
+
+def test_coalesced_call_keeps_follower_deadline(stub_server, config):
+    stub_server.responder = slow_responder(200, {"id": "VGU8R-JVDNL-INS"}, delay=1.0)
+    client = XCover(config)
+
+    with ThreadPoolExecutor(1) as executor:
+        leader = executor.submit(client.get_quote, "VGU8R-JVDNL-INS")
+        time.sleep(0.1)
+        started = time.perf_counter()
+        with pytest.raises(XCoverDeadlineExceeded):
+            client.get_quote("VGU8R-JVDNL-INS", deadline=0.2)
+        assert time.perf_counter() - started < 0.5
+        assert leader.result() == {"id": "VGU8R-JVDNL-INS"}
+    assert len(stub_server.requests) == 1
+
+
+def test_coalesced_error_is_raised_to_all_callers(stub_server, config):
+    stub_server.responder = slow_responder(404, {"detail": "Not found."})
+    client = XCover(config)
+
+    def get_booking(_):
+        with pytest.raises(XCoverHttpException):
+            client.get_booking("VGU8R-JVDNL-INS")
+
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(get_booking, range(4)))
+
+    assert len(stub_server.requests) == 1
+
+
+def test_different_params_are_not_coalesced(stub_server, config):
+    stub_server.responder = slow_responder(200, {"results": []}, delay=0.1)
+    client = XCover(config)
+
+    with ThreadPoolExecutor(2) as executor:
+        list(executor.map(lambda offset: client.list_bookings(params={"offset": offset}), (0, 10)))
+
+    assert len(stub_server.requests) == 2
+
+
+def test_writes_are_not_coalesced(stub_server, config):
+    stub_server.responder = slow_responder(200, {"id": "VGU8R-JVDNL-INS"}, delay=0.1)
+    client = XCover(config)
+
+    with ThreadPoolExecutor(2) as executor:
+        list(executor.map(lambda _: client.create_quote({}), range(2)))
+
+    assert len(stub_server.requests) == 2
+
+
+def test_gets_are_not_coalesced_when_disabled(stub_server, config):
+    config.coalesce_gets = False
+    stub_server.responder = slow_responder(200, {"id": "VGU8R-JVDNL-INS"}, delay=0.1)
+    client = XCover(config)
+
+    with ThreadPoolExecutor(2) as executor:
+        list(executor.map(lambda _: client.get_quote("VGU8R-JVDNL-INS"), range(2)))
+
+    assert client.singleflight is None
+    assert len(stub_server.requests) == 2
+
+
+def test_async_concurrent_gets_are_coalesced(stub_server, config):
+    pytest.importorskip("httpx")
+    from xcover.aio import AsyncXCover
+
+    stub_server.responder = slow_responder(200, {"id": "VGU8R-JVDNL-INS"})
+
+    async def main():
+        async with AsyncXCover(config) as client:
+            return await asyncio.gather(*(client.get_quote("VGU8R-JVDNL-INS") for _ in range(8)))
+
+    assert asyncio.run(main()) == [{"id": "VGU8R-JVDNL-INS"}] * 8
+    assert len(stub_server.requests) == 1
@@ -0,0 +1,309 @@
+import asyncio
+import random
+import time
+
+import pytest
+import requests
+
+from xcover import XCover
+from xcover.config import PartnerConfig
+from xcover.exceptions import XCoverDeadlineExceeded, XCoverHttpException
+from xcover.testing import FakeXCover, FakeXCoverServer, Faults, constant, lognormal, uniform
+
+from .factories import InstantBookingFactory, PolicyholderFactory, QuotePackageFactory
+
+
+@pytest.fixture()
+def fake():
+    return FakeXCover(seed=1)
+
+
+def test_quote_and_booking(fake, config):
+    client = fake.client(config)
+
+    quote = client.create_quote(QuotePackageFactory())
+    assert quote["status"] == "RECEIVED"
+    assert quote["id"].endswith("-INS") and len(quote["id"]) == 15
+    assert quote["total_price"] == 2.01
+    assert quote["total_price_formatted"] == "£2.01"
+    (quote_id,) = [item["id"] for item in quote["quotes"].values()]
+
+    with pytest.raises(XCoverHttpException) as exc_info:
+        client.get_booking(quote["id"])
+    assert exc_info.value.status_code == 404
+
+    booking = client.create_booking(
+        quote["id"],
+        {"quotes": [{"id": quote_id}], "policyholder": PolicyholderFactory()},
+    )
+    assert booking["status"] == "CONFIRMED"
+    assert client.get_booking(quote["id"]) == booking
+    assert client.confirm_booking(quote["id"])["status"] == "CONFIRMED"
+
+    with pytest.raises(XCoverHttpException) as exc_info:
+        client.create_booking(quote["id"], {"policyholder": PolicyholderFactory()})
+    assert exc_info.value.status_code == 422
+
+
+def test_quote_updates(fake, config):
+    client = fake.client(config)
+    quote = client.create_quote(QuotePackageFactory())
+
+    added = client.add_quotes(quote["id"], {"request": QuotePackageFactory()["request"]})
+    assert len(added["quotes"]) == 2
+    assert added["total_price"] == 4.02
+
+    deleted = client.delete_quotes(quote["id"], {"quotes": [added["quotes"][0]["id"]]})
+    assert [item["id"] for item in deleted["quotes"]] == [added["quotes"][1]["id"]]
+
+    client.opt_out(quote["id"])
+    assert client.get_quote(quote["id"])["status"] == "OPTED_OUT"
+
+
+def test_cancellation(fake, config):
+    client = fake.client(config)
+    booking = client.instant_booking(InstantBookingFactory())
+
+    preview = client.cancel_booking(booking["id"], {"preview": True})
+    assert preview["cancellation_id"].endswith("-CCL")
+    assert client.get_booking(booking["id"])["status"] == "CONFIRMED"
+
+    cancelled = client.confirm_booking_cancellation(booking["id"], preview["cancellation_id"])
+    assert cancelled["status"] == "CANCELLED"
+    assert cancelled["total_refund"] == booking["total_price"]
+    assert client.get_booking(booking["id"])["status"] == "CANCELLED"
+    client.trigger_email(booking["id"], {"event": "BOOKING_CANCELLED"})
+
+    with pytest.raises(XCoverHttpException) as exc_info:
+        client.confirm_booking_cancellation(booking["id"], preview["cancellation_id"])
+    assert exc_info.value.status_code == 404
+
+
+def test_modification(fake, config):
+    client = fake.client(config)
+    booking = client.instant_booking(InstantBookingFactory())
+    quote_id = booking["quotes"][0]["id"]
+
+    update = client.booking_modification_quote(
+        booking["id"],
+        {"quotes": [{"id": quote_id, "update_fields": {"tickets": [{"price": 100500}]}}]},
+    )
+    assert update["update_id"].endswith("-UPD")
+    assert update["total_price_diff"] > 0
+    assert client.get_booking(booking["id"])["total_price"] == booking["total_price"]
+
+    client.confirm_booking_modification(booking["id"], update["update_id"])
+    assert client.get_booking(booking["id"])["total_price"] == update["total_price"]
+
+    modified = client.booking_modification(
+        booking["id"], {"policyholder": {"phone": "+442071234567"}}
+    )
+    assert modified["policyholder"]["phone"] == "+442071234567"
+    with pytest.raises(XCoverHttpException):
+        client.booking_modification(booking["id"], {"policyholder": {"phone": "invalid phone"}})
+
+
+def test_renewal(fake, config):
+    client = fake.client(config)
+    booking = client.instant_booking(InstantBookingFactory())
+
+    renewal = client.quote_for_renewal(booking["id"])
+    renewed = client.renewal_confirmation(booking["id"], renewal["renewal_id"])
+
+    quote, renewed_quote = booking["quotes"][0], renewed["quotes"][0]
+    assert renewed_quote["policy_start_date"] == quote["policy_end_date"]
+    client.renewal_opt_out(booking["id"])
+    with pytest.raises(XCoverHttpException):
+        client.quote_for_renewal(booking["id"])
+
+
+def test_instalments(fake, config):
+    client = fake.client(config)
+    quote = client.create_quote(QuotePackageFactory())
+    quote_id = quote["quotes"]["0"]["id"]
+    client.create_booking(
+        quote["id"],
+        {
+            "quotes": [{"id": quote_id, "instalment_plan": "1year-monthly"}],
+            "policyholder": PolicyholderFactory(),
+        },
+    )
+
+    (instalments,) = client.get_instalments(quote["id"])["quotes"]
+    assert len(instalments["payment_schedule"]) == 12
+    assert instalments["next_payment"]["number"] == 2
+
+    client.update_instalment_payment_status(
+        quote["id"],
+        {"quotes": [{"id": quote_id, "payment_status": "PAID", "instalment_number": 2}]},
+    )
+    (instalments,) = client.get_instalments(quote["id"])["quotes"]
+    assert instalments["next_payment"]["number"] == 3
+
+
+def test_list_bookings(fake, config):
+    client = fake.client(config)
+    for _ in range(3):
+        client.instant_booking(InstantBookingFactory())
+    client.create_quote(QuotePackageFactory())
+
+    page = client.list_bookings(params={"limit": 2, "offset": 0})
+
+    assert page["count"] == 3
+    assert len(page["results"]) == 2
+    assert page["next"].endswith("/partners/LLODT/bookings/?limit=2&offset=2")
+    assert len(list(client.iter_bookings(page_size=2))) == 3
+
+
+def test_ids_are_reproducible(config):
+    ids = []
+    for _ in range(2):
+        client = FakeXCover(seed=7).client(config)
+        ids.append(client.create_quote(QuotePackageFactory())["id"])
+
+    assert ids[0] == ids[1]
+
+
+def test_partners_are_isolated(fake, config):
+    config.partners = [PartnerConfig("PARTA", "key-a", "secret-a")]
+    client = fake.client(config)
+    booking = client.instant_booking(InstantBookingFactory())
+
+    with pytest.raises(XCoverHttpException) as exc_info:
+        client.get_booking(booking["id"], partner="PARTA")
+    assert exc_info.value.status_code == 404
+
+
+def test_invalid_signature(fake, config):
+    client = fake.client(config)
+    fake.add_partner(PartnerConfig("LLODT", "test_api_key", "rotated_secret"))
+
+    with pytest.raises(XCoverHttpException) as exc_info:
+        client.create_quote(QuotePackageFactory())
+    assert exc_info.value.status_code == 401
+    assert fake.packages["LLODT"] == {}
+
+
+def test_signed_digest(fake, config):
+    config.headers = "(request-target) date digest"
+    config.request_compression = "gzip"
+    config.compression_min_size = 10
+    client = fake.client(config)
+
+    assert client.create_quote(QuotePackageFactory())["status"] == "RECEIVED"
+
+
+def test_idempotency_key(fake, config):
+    client = fake.client(config)
+    headers = {"x-idempotency-key": "key-1"}
+
+    first = client.instant_booking(InstantBookingFactory(), headers=dict(headers))
+    second = client.instant_booking(InstantBookingFactory(), headers=dict(headers))
+
+    assert first == second
+    assert len(fake.packages["LLODT"]) == 1
+
+
+def test_throttling_is_retried(config):
+    fake = FakeXCover(
+        endpoint_faults={"bookings": Faults(throttle_rate=0.5, retry_after=0)}, seed=3
+    )
+    client = fake.client(config)
+    retries = []
+    client.hooks.register("on_retry", retries.append)
+
+    for _ in range(10):
+        client.instant_booking(InstantBookingFactory())
+
+    assert retries
+    assert fake.calls[("instant_booking/", 429)] == len(retries)
+    assert fake.calls[("instant_booking/", 200)] == 10
+
+
+def test_server_errors(config):
+    fake = FakeXCover(Faults(error_rate=1, error_statuses=(503,)))
+    config.retry_total = 2
+    client = fake.client(config)
+
+    with pytest.raises(XCoverHttpException, match="Max retries exceeded"):
+        client.instant_booking(InstantBookingFactory())
+    assert fake.calls[("instant_booking/", 503)] == 3
+
+    with pytest.raises(XCoverHttpException) as exc_info:
+        client.create_quote(QuotePackageFactory())
+    assert exc_info.value.status_code == 503
+
+
+def test_timeouts(config):
+    fake = FakeXCover(Faults(timeout_rate=1))
+    config.http_timeout = 0.05
+    client = fake.client(config)
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.create_quote(QuotePackageFactory())
+    # The quote was created, only its response was lost
+    assert len(fake.packages["LLODT"]) == 1
+
+    started = time.perf_counter()
+    with pytest.raises(XCoverDeadlineExceeded):
+        client.create_quote(QuotePackageFactory(), deadline=0.02)
+    assert time.perf_counter() - started < 0.05
+
+
+def test_latency(config):
+    fake = FakeXCover(Faults(latency=constant(0.02)))
+    client = fake.client(config)
+
+    started = time.perf_counter()
+    client.create_quote(QuotePackageFactory())
+    assert time.perf_counter() - started >= 0.02
+
+
+def test_latency_distributions():
+    rng = random.Random(0)
+
+    assert all(0.1 <= uniform(0.1, 0.2)(rng) <= 0.2 for _ in range(100))
+    samples = sorted(lognormal(0.1)(rng) for _ in range(1000))
+    assert samples[500] == pytest.approx(0.1, rel=0.1)
+    assert samples[990] > 2 * samples[500]
+
+
+@pytest.mark.parametrize("transport", ["requests", "urllib3"])
+def test_http_server(config, transport):
+    config.transport = transport
+    with FakeXCoverServer(FakeXCover(Faults(throttle_rate=0.3, retry_after=0), seed=5)) as server:
+        config.base_url = server.url
+        server.engine.add_config(config)
+        client = XCover(config)
+
+        bookings = [client.instant_booking(InstantBookingFactory()) for _ in range(5)]
+
+        assert [client.get_booking(booking["id"])["id"] for booking in bookings] == [
+            booking["id"] for booking in bookings
+        ]
+        client.close()
+
+
+def test_http_server_timeout(config):
+    with FakeXCoverServer(FakeXCover(Faults(timeout_rate=1)), hang=1) as server:
+        config.base_url = server.url
+        config.http_timeout = 0.1
+        server.engine.add_config(config)
+
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            XCover(config).get_quote("VGU8R-JVDNL-INS")
+
+
+def test_async_client(config):
+    pytest.importorskip("httpx")
+    fake = FakeXCover(Faults(throttle_rate=0.3, retry_after=0), seed=2)
+
+    async def main():
+        async with fake.async_client(config) as client:
+            bookings = await asyncio.gather(
+                *(client.instant_booking(InstantBookingFactory()) for _ in range(10))
+            )
+            return await client.get_booking(bookings[0]["id"])
+
+    assert asyncio.run(main())["status"] == "CONFIRMED"
+    assert len(fake.packages["LLODT"]) == 10
@@ -0,0 +1,190 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+from xcover import XCover, XCoverConfig
+from xcover.exceptions import XCoverDeadlineExceeded
+from xcover.hedging import LatencyTracker
+from xcover.timeouts import Deadline, Timeouts
+
+
+def slow(seconds, status=200, headers=None):
+    def respond(request):
+        time.sleep(seconds)
+        return status, {"id": "VGU8R-JVDNL-INS"}, headers or {}
+
+    return respond
+
+
+def test_default_timeout():
+    assert Timeouts(60).timeout("quotes/") is None
+
+
+def test_endpoint_timeouts():
+    timeouts = Timeouts(60, {"bookings": 30, "bookings/{booking_id}/confirm": (5, 90)})
+
+    assert timeouts.timeout("quotes/") == 60
+    assert timeouts.timeout("bookings/VGU8R-JVDNL-INS") == 30
+    assert timeouts.timeout("bookings/VGU8R-JVDNL-INS/confirm") == (5, 90)
+    assert timeouts.timeout("bookings/VGU8R-JVDNL-INS/instalments/") == 60
+
+
+def test_adaptive_timeouts():
+    timeouts = Timeouts((5, 60), adaptive=True, minimum=0.5)
+    timeouts.latencies = LatencyTracker(min_samples=10)
+
+    for _ in range(10):
+        timeouts.observe("bookings/VGU8R-JVDNL-INS", 0.4)
+    assert timeouts.timeout("bookings/OTHER-BOOKING-INS") == (5, pytest.approx(1.2))
+
+    for _ in range(10):
+        timeouts.observe("quotes/", 0.01)
+    assert timeouts.timeout("quotes/") == (5, 0.5)
+    assert timeouts.timeout("renewals/VGU8R-JVDNL-INS") == (5, 60)
+
+
+def test_deadline():
+    deadline = Deadline(0.05)
+
+    assert 0 < deadline.remaining() <= 0.05
+    assert deadline.allows(0.01)
+    assert not deadline.expired
+    assert not deadline.allows(1)
+    assert deadline.expired
+
+
+def test_env_endpoint_timeouts(monkeypatch):
+    monkeypatch.setenv("XC_HTTP_TIMEOUTS", "quotes=10, bookings/{booking_id}/confirm=30")
+
+    assert XCoverConfig().http_timeouts == {"quotes": 10, "bookings/{booking_id}/confirm": 30}
+
+
+@pytest.mark.parametrize("transport", ["requests", "urllib3"])
+def test_endpoint_timeout(stub_server, config, transport):
+    stub_server.responder = slow(0.5)
+    config.transport = transport
+    config.http_timeouts = {"bookings": 0.1}
+    client = XCover(config)
+
+    started = time.perf_counter()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.get_booking("VGU8R-JVDNL-INS")
+    assert time.perf_counter() - started < 0.4
+
+    assert client.get_quote("VGU8R-JVDNL-INS") == {"id": "VGU8R-JVDNL-INS"}
+
+
+@pytest.mark.parametrize("transport", ["requests", "urllib3"])
+def test_deadline_bounds_attempt(stub_server, config, transport):
+    stub_server.responder = slow(1)
+    config.transport = transport
+    client = XCover(config)
+
+    started = time.perf_counter()
+    with pytest.raises(XCoverDeadlineExceeded) as exc_info:
+        client.get_booking("VGU8R-JVDNL-INS", deadline=0.2)
+    assert 0.2 <= time.perf_counter() - started < 0.6
+    assert exc_info.value.seconds == 0.2
+
+
+@pytest.mark.parametrize("transport", ["requests", "urllib3"])
+def test_deadline_bounds_retries(stub_server, config, transport):
+    stub_server.responder = slow(0.1, status=503)
+    config.transport = transport
+    client = XCover(config)
+
+    started = time.perf_counter()
+    with pytest.raises(XCoverDeadlineExceeded):
+        client.confirm_booking("VGU8R-JVDNL-INS", deadline=0.35)
+    assert time.perf_counter() - started < 0.6
+    assert 2 <= len(stub_server.requests) <= 4
+
+
+@pytest.mark.parametrize("transport", ["requests", "urllib3"])
+def test_deadline_skips_retry_after_past_it(stub_server, config, transport):
+    stub_server.responder = slow(0, status=503, headers={"Retry-After": "5"})
+    config.transport = transport
+    client = XCover(config)
+    retries = []
+    client.hooks.register("on_retry", retries.append)
+
+    started = time.perf_counter()
+    with pytest.raises(XCoverDeadlineExceeded):
+        client.confirm_booking("VGU8R-JVDNL-INS", deadline=1)
+
+    assert time.perf_counter() - started < 0.5
+    assert len(stub_server.requests) == 1
+    assert retries == []
+
+
+def test_configured_deadline(stub_server, config):
+    stub_server.responder = slow(1)
+    config.deadline = 0.1
+
+    with pytest.raises(XCoverDeadlineExceeded):
+        XCover(config).get_booking("VGU8R-JVDNL-INS")
+
+
+def test_shared_deadline(stub_server, config):
+    stub_server.responder = slow(0.15)
+    client = XCover(config)
+    deadline = Deadline(0.25)
+
+    client.get_booking("VGU8R-JVDNL-INS", deadline=deadline)
+    with pytest.raises(XCoverDeadlineExceeded):
+        client.get_booking("VGU8R-JVDNL-INS", deadline=deadline)
+
+    requests_sent = len(stub_server.requests)
+    with pytest.raises(XCoverDeadlineExceeded):
+        client.get_booking("VGU8R-JVDNL-INS", deadline=deadline)
+    assert len(stub_server.requests) == requests_sent
+
+
+def test_adaptive_client_timeouts(stub_server, config):
+    stub_server.responder = slow(0.01)
+    config.adaptive_timeouts = True
+    client = XCover(config)
+    client.timeouts.latencies = LatencyTracker(min_samples=5)
+    client.timeouts.minimum = 0.1
+
+    for _ in range(5):
+        client.get_booking("VGU8R-JVDNL-INS")
+
+    stub_server.responder = slow(1)
+    started = time.perf_counter()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.get_booking("VGU8R-JVDNL-INS")
+    assert time.perf_counter() - started < 0.5
+
+
+def test_async_deadline(stub_server, config):
+    pytest.importorskip("httpx")
+    from xcover.aio import AsyncXCover
+
+    stub_server.responder = slow(1)
+
+    async def main():
+        async with AsyncXCover(config) as client:
+            await client.get_booking("VGU8R-JVDNL-INS", deadline=0.2)
+
+    started = time.perf_counter()
+    with pytest.raises(XCoverDeadlineExceeded):
+        asyncio.run(main())
+    assert time.perf_counter() - started < 0.6
+
+
+def test_async_endpoint_timeout(stub_server, config):
+    httpx = pytest.importorskip("httpx")
+    from xcover.aio import AsyncXCover
+
+    stub_server.responder = slow(0.5)
+    config.http_timeouts = {"bookings": 0.1}
+
+    async def main():
+        async with AsyncXCover(config) as client:
+            await client.get_booking("VGU8R-JVDNL-INS")
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(main())
@@ -0,0 +1,203 @@
+import socket
+from dataclasses import replace
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+from requests.utils import DEFAULT_ACCEPT_ENCODING, default_user_agent
+
+from xcover import XCover
+from xcover.auth import Signer
+from xcover.exceptions import XCoverError, XCoverHttpException
+from xcover.transport import (
+    RequestsTransport,
+    Response,
+    Transport,
+    Urllib3Transport,
+    get_transport,
+)
+
+
+@pytest.fixture(params=["requests", "urllib3"])
+def config(request, config):
+    return replace(config, transport=request.param)
+
+
+def test_get_transport():
+    assert get_transport("requests") is RequestsTransport
+    assert get_transport("urllib3") is Urllib3Transport
+    assert get_transport(None) is RequestsTransport
+
+    class CustomTransport(Transport):
+        pass
+
+    assert get_transport(CustomTransport) is CustomTransport
+
+    with pytest.raises(XCoverError):
+        get_transport("curl")
+
+
+def test_client_uses_configured_transport(config):
+    client = XCover(config)
+
+    assert isinstance(client.transport, get_transport(config.transport))
+    assert client.transport.observer is client
+
+
+def test_request_is_signed(stub_server, config):
+    stub_server.add_response(200, {"id": "VGU8R-JVDNL-INS"})
+    client = XCover(config)
+
+    assert client.get_booking("VGU8R-JVDNL-INS", params={"a": 1}) == {"id": "VGU8R-JVDNL-INS"}
+
+    headers = {name.lower(): value for name, value in stub_server.requests[0].headers.items()}
+    url = f"{stub_server.url}partners/LLODT/bookings/VGU8R-JVDNL-INS/?a=1"
+    expected = Signer(config.auth_config).authorization("GET", url, {"date": headers["date"]})
+    assert headers["authorization"] == expected
+    assert headers["content-type"] == "application/json"
+    assert headers["accept-encoding"] == DEFAULT_ACCEPT_ENCODING
+
+
+def test_payload_and_params(stub_server, config):
+    stub_server.add_response(201, {"id": "VGU8R-JVDNL-INS"})
+    client = XCover(config)
+
+    response = client.call(
+        "POST",
+        "partners/LLODT/quotes/",
+        payload={"name": "Zoë"},
+        params={"status": ["RECEIVED", "CONFIRMED"]},
+        headers={"x-custom-header": "test"},
+    )
+
+    assert response.status_code == 201
+    assert response.reason == "Created"
+    assert response.json() == {"id": "VGU8R-JVDNL-INS"}
+    assert response.request.headers["x-custom-header"] == "test"
+    request = stub_server.requests[0]
+    assert request.json() == {"name": "Zoë"}
+    assert parse_qs(urlparse(request.path).query) == {"status": ["RECEIVED", "CONFIRMED"]}
+
+
+def test_client_error(stub_server, config):
+    stub_server.add_response(404, {"detail": "Not found."})
+    client = XCover(config)
+
+    with pytest.raises(XCoverHttpException) as exc_info:
+        client.get_booking("VGU8R-JVDNL-INS")
+
+    assert "404 Client Error: Not Found" in str(exc_info.value)
+
+
+def test_auto_retry(stub_server, config):
+    stub_server.add_response(503)
+    stub_server.add_response(429, headers={"Retry-After": "0"})
+    stub_server.add_response(200, {"status": "CONFIRMED"})
+    client = XCover(config)
+    retries = []
+    client.hooks.register("on_retry", lambda record: retries.append(record.status_code))
+
+    assert client.confirm_booking("VGU8R-JVDNL-INS") == {"status": "CONFIRMED"}
+    assert retries == [503, 429]
+    assert len(stub_server.requests) == 3
+
+
+def test_auto_retry_exhausted(stub_server, config):
+    config.retry_total = 2
+    for _ in range(3):
+        stub_server.add_response(502)
+    client = XCover(config)
+
+    with pytest.raises(XCoverHttpException):
+        client.confirm_booking("VGU8R-JVDNL-INS")
+
+    assert len(stub_server.requests) == 3
+
+
+def test_no_retry_without_auto_retry(stub_server, config):
+    stub_server.add_response(503)
+    client = XCover(config)
+
+    with pytest.raises(XCoverHttpException):
+        client.get_booking("VGU8R-JVDNL-INS")
+
+    assert len(stub_server.requests) == 1
+
+
+def test_connection_error(config):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    config.base_url = f"http://127.0.0.1:{port}/"
+    client = XCover(config)
+
+    with pytest.raises(requests.ConnectionError):
+        client.get_booking("VGU8R-JVDNL-INS")
+
+
+def test_connection_is_reused(stub_server, config):
+    stub_server.add_response(200, {})
+    stub_server.add_response(200, {})
+    client = XCover(config)
+
+    client.get_booking("VGU8R-JVDNL-INS")
+    client.get_booking("VGU8R-JVDNL-INS")
+
+    assert stub_server.requests[0].client_address == stub_server.requests[1].client_address
+
+
+def test_hooks_timings(stub_server, config):
+    stub_server.add_response(200, {"id": "VGU8R-JVDNL-INS"})
+    client = XCover(config)
+    records = []
+    client.hooks.register("after_response", records.append)
+
+    client.get_booking("VGU8R-JVDNL-INS")
+
+    assert {"encode", "prepare", "sign", "connect", "wait", "read", "decode"} <= set(
+        records[0].timings
+    )
+
+
+def test_redirects_and_user_agent(stub_server, config):
+    stub_server.add_response(307, None, {"Location": "/moved/"})
+    stub_server.add_response(302, None, {"Location": "/moved/again/"})
+    stub_server.add_response(200, {"status": "CONFIRMED"})
+    client = XCover(config)
+
+    result = client.confirm_booking("VGU8R-JVDNL-INS", {"security_token": "abc"})
+
+    assert result == {"status": "CONFIRMED"}
+    body = stub_server.requests[0].body
+    assert [(request.method, request.body) for request in stub_server.requests] == [
+        ("PUT", body),
+        ("PUT", body),
+        ("GET", b""),
+    ]
+    assert [request.path for request in stub_server.requests[1:]] == ["/moved/", "/moved/again/"]
+    assert {request.headers["User-Agent"] for request in stub_server.requests} == {
+        default_user_agent()
+    }
+
+
+def test_too_many_redirects(stub_server, config):
+    stub_server.responder = lambda request: (302, None, {"Location": "/loop/"})
+    client = XCover(config)
+
+    with pytest.raises(requests.TooManyRedirects):
+        client.get_booking("VGU8R-JVDNL-INS")
+    assert len(stub_server.requests) == 31
+
+
+def test_close(stub_server, config):
+    stub_server.add_response(200, {})
+    with XCover(config) as client:
+        client.get_booking("VGU8R-JVDNL-INS")
+
+
+def test_response():
+    response = Response(200, "OK", "https://api.xcover.com/", {}, b'{"id": 1}', None)
+
+    assert response.ok
+    assert response.text == '{"id": 1}'
+    assert response.json() == {"id": 1}
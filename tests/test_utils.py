@@ -1,7 +1,9 @@
 from datetime import datetime, timezone
 from unittest import mock
 
-from xcover.utils import http_date
+import pytest
+
+from xcover.utils import cached_http_date, endpoint_family, endpoint_template, http_date
 
 
 def test_http_date():
@@ -15,3 +17,56 @@ def test_http_date():
 
         mock_datetime.now.assert_called_once_with(timezone.utc)
         assert date_header == "Tue, 08 Apr 2025 12:00:00 GMT"
+
+
+def test_cached_http_date():
+    timestamp = datetime(2025, 4, 8, 12, 0, 0, tzinfo=timezone.utc).timestamp()
+
+    with mock.patch("xcover.utils.time.time", return_value=timestamp + 0.1):
+        assert cached_http_date() == "Tue, 08 Apr 2025 12:00:00 GMT"
+
+    with mock.patch("xcover.utils.datetime") as mock_datetime, mock.patch(
+        "xcover.utils.time.time", return_value=timestamp + 0.9
+    ):
+        assert cached_http_date() == "Tue, 08 Apr 2025 12:00:00 GMT"
+        mock_datetime.fromtimestamp.assert_not_called()
+
+    with mock.patch("xcover.utils.time.time", return_value=timestamp + 1):
+        assert cached_http_date() == "Tue, 08 Apr 2025 12:00:01 GMT"
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    (
+        ("quotes/", "quotes"),
+        ("quotes/ABC-INS/add/", "quotes"),
+        ("instant_booking/", "bookings"),
+        ("bookings/ABC-INS/confirm", "bookings"),
+        ("bookings/ABC-INS/instalments/", "instalments"),
+        ("renewals/ABC-INS/opt_out/", "renewals"),
+        ("partners/LLODT/bookings/?limit=1", "bookings"),
+        ("/xcover/partners/LLODT/bookings/ABC-INS/instalments/", "instalments"),
+        ("/xcover/partners/LLODT/", "other"),
+        ("unknown/", "other"),
+    ),
+)
+def test_endpoint_family(url, expected):
+    assert endpoint_family(url) == expected
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    (
+        ("quotes/", "quotes/"),
+        ("quotes/ABC-INS/add/", "quotes/{quote_id}/add/"),
+        ("partners/LLODT/bookings/ABC-INS/?limit=1", "partners/LLODT/bookings/{booking_id}/"),
+        (
+            "partners/LLODT/renewals/ABC-INS/confirm/REN-1/",
+            "partners/LLODT/renewals/{booking_id}/confirm/{renewal_id}/",
+        ),
+        ("bookings/ABC-INS/instalments/", "bookings/{booking_id}/instalments/"),
+        ("instant_booking/", "instant_booking/"),
+    ),
+)
+def test_endpoint_template(url, expected):
+    assert endpoint_template(url) == expected
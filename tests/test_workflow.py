@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from xcover import XCover
+from xcover.exceptions import XCoverHttpException
+from xcover.models import QuotePackage
+from xcover.workflow import (
+    Workflow,
+    booking_workflow,
+    cancellation_workflow,
+    modification_workflow,
+    quote_ids,
+)
+
+
+def booking_api(delay=0.0, fail_customer=None):
+    """Responder for the quote -> book -> confirm -> email chain, one booking per customer."""
+
+    def respond(request):
+        time.sleep(delay)
+        path = request.path.split("/partners/LLODT/", 1)[1]
+        if path == "quotes/":
+            customer = request.json()["customer"]
+            if customer == fail_customer:
+                return 400, {"detail": "Invalid quote."}, {}
+            return 201, {"id": f"Q-{customer}", "quotes": {"0": {"id": f"q-{customer}"}}}, {}
+        if path.endswith("/confirm"):
+            return 200, {"id": path.split("/")[1], "status": "CONFIRMED"}, {}
+        if path.endswith("/send_email"):
+            return 204, None, {}
+        booking_id = path.split("/")[1]
+        assert request.json()["quotes"] == [{"id": f"q-{booking_id[2:]}"}]
+        return 201, {"id": booking_id, "status": "PENDING"}, {}
+
+    return respond
+
+
+def test_quote_ids():
+    assert quote_ids({"quotes": {"1": {"id": "b"}, "0": {"id": "a"}}}) == ["a", "b"]
+    assert quote_ids({"quotes": [{"id": "a"}]}) == ["a"]
+    assert quote_ids(QuotePackage({"quotes": {"0": {"id": "a"}}})) == ["a"]
+    assert quote_ids({}) == []
+
+
+def test_workflow_threads_results():
+    calls = []
+    workflow = (
+        Workflow("customer-1")
+        .then("first", lambda client, results: calls.append(dict(results)) or 1)
+        .then("second", lambda client, results: calls.append(dict(results)) or 2)
+    )
+
+    result = workflow.run(None)
+
+    assert result.ok
+    assert result.results == {"first": 1, "second": 2}
+    assert calls == [{}, {"first": 1}]
+
+
+def test_workflow_stops_at_failed_step():
+    def fail(client, results):
+        raise KeyError("id")
+
+    workflow = Workflow().then("first", lambda *_: 1).then("second", fail)
+    workflow.then("third", lambda *_: 3)
+
+    result = workflow.run(None)
+
+    assert not result.ok
+    assert result.failed_step == "second"
+    assert isinstance(result.error, KeyError)
+    assert result.results == {"first": 1}
+
+
+def test_duplicate_step_name():
+    with pytest.raises(ValueError):
+        Workflow().then("quote", lambda *_: 1).then("quote", lambda *_: 2)
+
+
+def test_run_workflows(stub_server, config):
+    stub_server.responder = booking_api(fail_customer=2)
+    client = XCover(config)
+    workflows = [
+        booking_workflow({"customer": customer}, {"first_name": "Ada"}, email=True, name=customer)
+        for customer in range(4)
+    ]
+
+    results = client.run_workflows(workflows)
+
+    assert [result.name for result in results] == [0, 1, 2, 3]
+    assert [result.ok for result in results] == [True, True, False, True]
+    assert results[0].results["booking"] == {"id": "Q-0", "status": "PENDING"}
+    assert results[0].results["confirmation"]["status"] == "CONFIRMED"
+    assert results[0].results["email"] is True
+    assert results[2].failed_step == "quote"
+    assert isinstance(results[2].error, XCoverHttpException)
+    assert len(stub_server.requests) == 3 * 4 + 1
+    # Each chain's steps reach the API in order
+    paths = [request.path.split("/partners/LLODT/", 1)[1] for request in stub_server.requests]
+    for customer in (0, 1, 3):
+        booking = f"bookings/Q-{customer}/"
+        steps = [path for path in paths if path.startswith(booking)]
+        assert steps == [booking, f"{booking}confirm", f"{booking}send_email"]
+    assert paths.count("quotes/") == 4
+
+
+def test_run_workflows_concurrently(stub_server, config):
+    respond = booking_api(delay=0.1)
+    lock = threading.Lock()
+    in_flight = [0, 0]  # current, peak
+
+    def track(request):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        try:
+            return respond(request)
+        finally:
+            with lock:
+                in_flight[0] -= 1
+
+    stub_server.responder = track
+    client = XCover(config)
+    workflows = [booking_workflow({"customer": customer}, {}) for customer in range(8)]
+
+    results = client.run_workflows(workflows, max_concurrency=8)
+
+    assert all(result.ok for result in results)
+    assert len(stub_server.requests) == 3 * 8
+    # Chains overlap rather than running one after the other
+    assert in_flight[1] >= 4
+
+
+def test_cancellation_workflow(stub_server, config):
+    stub_server.add_response(200, {"cancellation_id": "C-1", "refund_value": 10})
+    stub_server.add_response(200, {"status": "CANCELLED"})
+    client = XCover(config)
+
+    (result,) = client.run_workflows([cancellation_workflow("VGU8R-JVDNL-INS")])
+
+    assert result.ok
+    assert result.name == "VGU8R-JVDNL-INS"
+    assert result.results["confirmation"] == {"status": "CANCELLED"}
+    assert stub_server.requests[0].json() == {"preview": True}
+    assert stub_server.requests[1].path.endswith("/confirm_cancellation/C-1/")
+
+
+def test_modification_workflow_missing_id(stub_server, config):
+    stub_server.add_response(200, {"detail": "No changes."})
+    client = XCover(config)
+
+    (result,) = client.run_workflows([modification_workflow("VGU8R-JVDNL-INS", {"quotes": []})])
+
+    assert result.failed_step == "confirmation"
+    assert isinstance(result.error, KeyError)
+    assert len(stub_server.requests) == 1
+
+
+def test_async_run_workflows(stub_server, config):
+    pytest.importorskip("httpx")
+    from xcover.aio import AsyncXCover
+
+    stub_server.responder = booking_api(delay=0.1, fail_customer=1)
+
+    async def main():
+        async with AsyncXCover(config) as client:
+            workflows = [booking_workflow({"customer": customer}, {}) for customer in range(4)]
+            return await client.run_workflows(workflows)
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+
+    assert time.perf_counter() - started < 1.0
+    assert [result.ok for result in results] == [True, False, True, True]
+    assert results[3].results["confirmation"] == {"id": "Q-3", "status": "CONFIRMED"}
@@ -1,7 +1,13 @@
+import time
 from http import HTTPStatus
+from http.client import HTTPMessage
 from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
 
 import pytest
+import requests
+from requests.cookies import MockRequest
+from requests.cookies import MockResponse as MockCookieResponse
 
 from xcover import XCoverConfig
 from xcover.exceptions import XCoverHttpException
@@ -418,3 +424,122 @@ def test_auto_retry():
 
     with pytest.raises(XCoverHttpException):
         client.instant_booking(InstantBookingFactory())
+
+
+def test_session_is_reused():
+    client = XCover()
+
+    assert client.session is client.session
+    assert client.auto_retry_session is client.auto_retry_session
+    assert client.session is not client.auto_retry_session
+
+
+def test_session_pool_config():
+    config = XCoverConfig()
+    config.pool_connections = 3
+    config.pool_maxsize = 7
+    config.pool_block = True
+    client = XCover(config=config)
+
+    for session in (client.session, client.auto_retry_session):
+        for prefix in ("http://", "https://"):
+            adapter = session.get_adapter(f"{prefix}api.xcover.com")
+            assert adapter._pool_connections == 3
+            assert adapter._pool_maxsize == 7
+            assert adapter._pool_block is True
+
+    assert client.session.get_adapter("https://api.xcover.com").max_retries.total == 0
+    assert (
+        client.auto_retry_session.get_adapter("https://api.xcover.com").max_retries.total
+        == config.retry_total
+    )
+
+
+def test_session_does_not_store_cookies():
+    client = XCover()
+    headers = HTTPMessage()
+    headers["Set-Cookie"] = "__cf_bm=value; Domain=api.xcover.com; Path=/"
+    request = requests.Request("GET", "https://api.xcover.com/").prepare()
+    client.session.cookies.extract_cookies(MockCookieResponse(headers), MockRequest(request))
+
+    assert len(client.session.cookies) == 0
+
+
+def test_close():
+    client = XCover()
+    session = client.session
+
+    with patch.object(requests.Session, "close") as close:
+        with client:
+            pass
+
+    close.assert_called_once_with()
+    assert client.session is not session
+
+
+class BookingPages:
+    def __init__(self, total: int, with_count: bool = True, delay: float = 0):
+        self.bookings = [{"id": f"BOOKING-{i}"} for i in range(total)]
+        self.with_count = with_count
+        self.delay = delay
+
+    def __call__(self, request):
+        query = parse_qs(urlparse(request.path).query)
+        limit, offset = int(query["limit"][0]), int(query["offset"][0])
+        time.sleep(self.delay)
+        end = offset + limit
+        data = {
+            "next": f"/bookings/?limit={limit}&offset={end}" if end < len(self.bookings) else None,
+            "results": self.bookings[offset:end],
+        }
+        if self.with_count:
+            data["count"] = len(self.bookings)
+        return 200, data, {}
+
+
+@pytest.fixture()
+def stub_client(config):
+    with XCover(config) as client:
+        yield client
+
+
+@pytest.mark.parametrize("prefetch", (0, 1, 3))
+def test_iter_bookings(stub_server, stub_client, prefetch):
+    pages = BookingPages(total=23)
+    stub_server.responder = pages
+
+    bookings = list(stub_client.iter_bookings(page_size=5, prefetch=prefetch, status="CONFIRMED"))
+
+    assert bookings == pages.bookings
+    offsets = sorted(
+        int(parse_qs(urlparse(request.path).query)["offset"][0])
+        for request in stub_server.requests
+    )
+    assert offsets == [0, 5, 10, 15, 20]
+    assert all("status=CONFIRMED" in request.path for request in stub_server.requests)
+
+
+def test_iter_bookings_without_count(stub_server, stub_client):
+    pages = BookingPages(total=10, with_count=False)
+    stub_server.responder = pages
+
+    assert list(stub_client.iter_bookings(page_size=5, prefetch=3)) == pages.bookings
+
+
+def test_iter_bookings_empty(stub_server, stub_client):
+    stub_server.responder = BookingPages(total=0)
+
+    assert list(stub_client.iter_bookings()) == []
+    assert len(stub_server.requests) == 1
+
+
+def test_iter_bookings_prefetches(stub_server, stub_client):
+    stub_server.responder = BookingPages(total=20, delay=0.1)
+
+    bookings = stub_client.iter_bookings(page_size=5, prefetch=3)
+    assert next(bookings) == {"id": "BOOKING-0"}
+    time.sleep(0.15)
+
+    # Following pages have been requested while the first one was consumed
+    assert len(stub_server.requests) == 4
+    assert len(list(bookings)) == 19
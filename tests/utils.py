@@ -1,7 +1,103 @@
+import json
+import threading
+from collections import deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
 class MockResponse:
     def __init__(self, status_code: int, data: dict = None):
         self.status_code = status_code
         self.data = data or {}
 
+    @property
+    def content(self) -> bytes:
+        return json.dumps(self.data).encode()
+
     def json(self):
         return self.data
+
+
+class StubServer:
+    """
+    Local HTTP server answering with queued responses and recording received requests.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.responses = deque()
+        self.responder = None
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.handler_class())
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/"
+
+    def add_response(self, status: int = 200, data=None, headers: dict = None):
+        self.responses.append((status, data, headers or {}))
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def handle_request(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = StubRequest(
+                    method=self.command,
+                    path=self.path,
+                    headers=dict(self.headers),
+                    body=self.rfile.read(length),
+                    client_address=self.client_address,
+                )
+                server.requests.append(request)
+                if server.responder is not None:
+                    status, data, headers = server.responder(request)
+                else:
+                    try:
+                        status, data, headers = server.responses.popleft()
+                    except IndexError:
+                        status, data, headers = 200, {}, {}
+
+                if isinstance(data, bytes):
+                    body = data
+                else:
+                    body = json.dumps(data).encode() if data is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_request
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@dataclass
+class StubRequest:
+    method: str
+    path: str
+    headers: dict
+    body: bytes
+    client_address: tuple
+
+    def json(self):
+        return json.loads(self.body)
@@ -1 +1,20 @@
-from .xcover import XCover, XCoverConfig
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .config import XCoverConfig
+    from .xcover import XCover
+
+__all__ = ["XCover", "XCoverConfig"]
+
+
+def __getattr__(name: str):
+    # Submodules are imported on first access to keep `import xcover` cheap
+    if name == "XCover":
+        from .xcover import XCover
+
+        return XCover
+    if name == "XCoverConfig":
+        from .config import XCoverConfig
+
+        return XCoverConfig
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
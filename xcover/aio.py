@@ -0,0 +1,326 @@
+import asyncio
+import time
+from functools import partial
+from typing import Iterable, List, Tuple
+from urllib.parse import urljoin
+
+import httpx
+import requests
+
+from .base import BaseXCover
+from .batch import BatchResult, unpack_call
+from .cache import resource_id
+from .circuitbreaker import CircuitBreaker
+from .config import XCoverConfig
+from .exceptions import XCoverDeadlineExceeded, XCoverError, XCoverHttpException
+from .hooks import CallRecord, current_call
+from .ratelimit import RateLimiter
+from .retry import RetryLoop
+from .singleflight import AsyncSingleFlight
+from .timeouts import Deadline, Timeout, connect_read
+from .transport import build_retry
+from .utils import endpoint_family
+from .workflow import Workflow, WorkflowResult
+
+
+def trace_connection(record: CallRecord):
+    """httpcore `trace` extension reporting `connect` and `tls` phases to `record`."""
+    phases = {"connection.connect_tcp": "connect", "connection.start_tls": "tls"}
+    started = {}
+
+    async def trace(event: str, info: dict):
+        name, _, stage = event.rpartition(".")
+        phase = phases.get(name)
+        if phase is None:
+            return
+        if stage == "started":
+            started[phase] = time.perf_counter()
+        elif phase in started:
+            record.mark(phase, started.pop(phase))
+
+    return trace
+
+
+def httpx_timeout(timeout: Timeout) -> httpx.Timeout:
+    connect, read = connect_read(timeout)
+    return httpx.Timeout(read, connect=connect)
+
+
+class AsyncXCover(BaseXCover):
+    """asyncio flavour of `XCover`, sharing one `httpx.AsyncClient` pool per instance."""
+
+    def __init__(
+        self,
+        config: XCoverConfig = None,
+        transport: httpx.AsyncBaseTransport = None,
+        rate_limiter: RateLimiter = None,
+        circuit_breaker: CircuitBreaker = None,
+    ):
+        super().__init__(config, rate_limiter=rate_limiter, circuit_breaker=circuit_breaker)
+        if self.config.coalesce_gets:
+            self.singleflight = AsyncSingleFlight()
+        self.retry = build_retry(self.config, observer=self)
+        self._transport = transport
+        self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx_timeout(self.config.http_timeout)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.config.pool_maxsize,
+                    max_keepalive_connections=self.config.pool_maxsize,
+                ),
+                timeout=self.timeout,
+                transport=self._transport,
+            )
+
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def prepare_request(
+        self,
+        method: str,
+        url: str,
+        payload=None,
+        params=None,
+        headers: dict = None,
+        partner: str = None,
+    ) -> requests.PreparedRequest:
+        # Requests are built and signed exactly like in the sync client
+        record = current_call.get()
+        if record is None:
+            (data, headers), auth = self.encode(payload, headers), self.signer(partner)
+        else:
+            started = time.perf_counter()
+            (data, headers), auth = self.encode(payload, headers), self.traced_auth
+            started = record.mark("encode", started)
+
+        request = requests.Request(
+            method,
+            urljoin(self.config.base_url, url),
+            data=data,
+            params=params,
+            auth=auth,
+            headers=headers,
+        ).prepare()
+        if record is not None:
+            record.mark("prepare", started)
+        return request
+
+    async def send(
+        self, request: requests.PreparedRequest, timeout: Timeout = None
+    ) -> httpx.Response:
+        record = current_call.get()
+        timeout = httpx.USE_CLIENT_DEFAULT if timeout is None else httpx_timeout(timeout)
+        if record is None:
+            return await self.client.request(
+                request.method,
+                request.url,
+                content=request.body,
+                headers=dict(request.headers),
+                timeout=timeout,
+            )
+
+        started = time.perf_counter()
+        response = await self.client.send(
+            self.client.build_request(
+                request.method,
+                request.url,
+                content=request.body,
+                headers=dict(request.headers),
+                timeout=timeout,
+                extensions={"trace": trace_connection(record)},
+            ),
+            stream=True,
+        )
+        started = record.mark("send", started)
+        await response.aread()
+        record.mark("read", started)
+        return response
+
+    async def call(
+        self,
+        method: str,
+        url: str,
+        payload=None,
+        params=None,
+        headers: dict = None,
+        auto_retry: bool = False,
+        timeout: Timeout = None,
+        deadline: Deadline = None,
+        partner: str = None,
+    ) -> httpx.Response:
+        request = self.prepare_request(method, url, payload, params, headers, partner)
+        retries = RetryLoop(self.retry if auto_retry else None, method, request.path_url)
+
+        if deadline is None:
+            return await self.send_with_retries(request, retries, timeout)
+        try:
+            return await asyncio.wait_for(
+                self.send_with_retries(request, retries, timeout, deadline), deadline.remaining()
+            )
+        except asyncio.TimeoutError:
+            deadline.exceeded = True
+            raise XCoverDeadlineExceeded(deadline.seconds)
+
+    async def send_with_retries(
+        self,
+        request: requests.PreparedRequest,
+        retries: RetryLoop,
+        timeout: Timeout = None,
+        deadline: Deadline = None,
+    ) -> httpx.Response:
+        while True:
+            try:
+                response = await self.send(request, timeout)
+            except httpx.TransportError as exc:
+                delay = retries.next_delay(error=exc)
+            else:
+                delay = retries.next_delay(response)
+                if delay is None:
+                    return response
+
+            await asyncio.sleep(delay)
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(
+                    endpoint_family(request.path_url),
+                    self.call_partner(request.path_url),
+                    deadline,
+                )
+
+    async def call_partner_endpoint(
+        self,
+        method,
+        url,
+        payload=None,
+        generate_idepmotency_key=True,
+        use_cache=True,
+        model=None,
+        **kwargs,
+    ):
+        self.add_idempotency_key(method, kwargs, generate_idepmotency_key)
+        self.add_timeouts(url, kwargs)
+
+        with self.tracing(method, url, kwargs) as record:
+            cache_key = self.cache_key(method, url, kwargs, use_cache)
+            if cache_key is not None:
+                content = self.cache.get(cache_key)
+                if content is not None:
+                    if record is not None:
+                        record.cached = True
+                    return self.decode(content, record, model)
+                cache_token = self.cache.token()
+
+            response = await self._shared_request(method, url, payload, kwargs)
+            if record is not None:
+                record.status_code = response.status_code
+
+            if response.status_code >= 400:
+                self.raise_for_status(response.status_code, response.reason_phrase, response.url)
+
+            if response.status_code in (204, 202):
+                return True
+
+            if cache_key is not None:
+                self.cache.set(cache_key, resource_id(url), response.content, cache_token)
+
+            return self.decode(response.content, record, model)
+
+    async def _shared_request(self, method: str, url: str, payload, kwargs: dict):
+        coalesce_key = self.coalesce_key(method, url, kwargs)
+        if coalesce_key is None:
+            return await self._request(method, url, payload, kwargs)
+        return await self.singleflight.do(
+            coalesce_key,
+            partial(self._request, method, url, payload, kwargs),
+            kwargs.get("deadline"),
+        )
+
+    async def _admit(self, family: str, partner: str, deadline: Deadline = None):
+        """Wait for the circuit breaker and rate limiter to let a call through in time."""
+        if deadline is not None and deadline.expired:
+            raise XCoverDeadlineExceeded(deadline.seconds)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_call(family, partner)
+        try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(family, partner, deadline)
+            if deadline is not None and deadline.expired:
+                raise XCoverDeadlineExceeded(deadline.seconds)
+        except BaseException:
+            # Not sent, so a half-open circuit's probe slot goes to the next call
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.release(family, partner)
+            raise
+
+    async def _request(self, method: str, url: str, payload, kwargs: dict) -> httpx.Response:
+        family, partner = endpoint_family(url), self.call_partner(url, kwargs.get("partner"))
+        deadline = kwargs.get("deadline")
+        await self._admit(family, partner, deadline)
+
+        started = time.perf_counter()
+        try:
+            response = await self.call(
+                method, self.partner_url(url, kwargs.get("partner")), payload=payload, **kwargs
+            )
+        except (XCoverHttpException, httpx.HTTPError):
+            self.record_failure(url, partner)
+            raise
+        finally:
+            self.invalidate_cache(method, url)
+
+        self.timeouts.observe(url, time.perf_counter() - started)
+        self.record_response(url, response, partner)
+        return response
+
+    async def call_many(
+        self, calls: Iterable[Tuple], max_concurrency: int = None
+    ) -> List[BatchResult]:
+        """
+        Run `call_partner_endpoint` for each `(method, url[, kwargs])` item with at most
+        `max_concurrency` requests in flight. Results are returned in input order.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.config.pool_maxsize)
+
+        async def execute(call):
+            method, url, kwargs = unpack_call(call)
+            async with semaphore:
+                try:
+                    return BatchResult(
+                        result=await self.call_partner_endpoint(method, url, **kwargs)
+                    )
+                except (XCoverError, httpx.HTTPError) as exc:
+                    return BatchResult(error=exc)
+
+        return list(await asyncio.gather(*(execute(call) for call in calls)))
+
+    async def run_workflows(
+        self, workflows: Iterable[Workflow], max_concurrency: int = None
+    ) -> List[WorkflowResult]:
+        """
+        Run each workflow's steps in order, with at most `max_concurrency` workflows running
+        at once. Results are returned in input order.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.config.pool_maxsize)
+        errors = (XCoverError, httpx.HTTPError, LookupError)
+
+        async def execute(workflow):
+            async with semaphore:
+                return await workflow.run_async(self, errors)
+
+        return list(await asyncio.gather(*(execute(workflow) for workflow in workflows)))
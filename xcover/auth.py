@@ -1,38 +1,143 @@
 import base64
 import hmac
-from urllib.parse import quote
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Mapping
+from urllib.parse import quote, urlparse
 
-from requests import PreparedRequest
-from requests.auth import AuthBase
+from .compression import Body, body_digest
+from .config import AuthConfig, PartnerConfig
+from .exceptions import XCoverError
+from .utils import cached_http_date
 
-from .config import AuthConfig
-from .utils import http_date
+if TYPE_CHECKING:
+    from requests import PreparedRequest
 
 
-class XCoverAuth(AuthBase):
+def url_path(url: str) -> str:
+    """
+    Equivalent of `urlparse(url).path` for the absolute URLs built by the client,
+    falling back to `urlparse` for anything unusual.
+    """
+    scheme_end = url.find("://")
+    if scheme_end < 0 or ";" in url or "\t" in url or "\n" in url or "\r" in url:
+        return urlparse(url).path
+
+    netloc_start = scheme_end + 3
+    end = len(url)
+    for delimiter in "?#":
+        index = url.find(delimiter, netloc_start, end)
+        if index >= 0:
+            end = index
+
+    path_start = url.find("/", netloc_start, end)
+    if path_start < 0:
+        return ""
+    return url[path_start:end]
+
+
+class Signer:
+    """Request signer compiled once from `AuthConfig`, giving the same `authorization` header."""
+
     def __init__(self, config: AuthConfig):
         self.config = config
-
-    def __call__(self, request: PreparedRequest):
-        api_key = self.config.api_key
-        api_secret = self.config.api_secret
-        headers = self.config.headers
-        algorithm = self.config.algorithm.value
-        if not request.headers.get("date"):
-            request.headers["date"] = http_date()
-
-        signature = hmac.new(
-            key=api_secret.encode("utf-8", "strict"),
-            msg=self.config.build_string_to_sign(request).encode("utf-8", "strict"),
-            digestmod=self.config.hash_function,
-        ).digest()
-
-        signature = quote(base64.b64encode(signature), safe="")
-        auth_header = (
-            f'Signature keyId="{api_key}",algorithm="{algorithm}",'
-            f'headers="{headers}",signature="{signature}"'
+        self.headers = tuple(config.headers_as_list)
+        self.signs_digest = "digest" in self.headers
+        self._hmac = hmac.new(
+            key=config.api_secret.encode("utf-8", "strict"), digestmod=config.hash_function
+        )
+        self._header_prefix = (
+            f'Signature keyId="{config.api_key}",algorithm="{config.algorithm.value}",'
+            f'headers="{config.headers}",signature="'
         )
 
-        request.headers["authorization"] = auth_header
+    def build_string_to_sign(self, method: str, url: str, headers: Mapping) -> str:
+        parts = []
+        for header in self.headers:
+            if header == "(request-target)":
+                parts.append(f"(request-target): {method.lower()} {url_path(url)}")
+            else:
+                try:
+                    parts.append(f"{header}: {headers[header]}")
+                except KeyError:
+                    continue
+
+        return "\n".join(parts)
+
+    def signature(self, method: str, url: str, headers: Mapping) -> str:
+        mac = self._hmac.copy()
+        mac.update(self.build_string_to_sign(method, url, headers).encode("utf-8", "strict"))
+        return quote(base64.b64encode(mac.digest()), safe="")
+
+    def authorization(self, method: str, url: str, headers: Mapping) -> str:
+        return f'{self._header_prefix}{self.signature(method, url, headers)}"'
+
+    def sign(self, method: str, url: str, headers, body: Body = None):
+        """
+        Add `date` (unless present), `digest` of `body` when signed, and `authorization`
+        headers to a mutable mapping.
+        """
+        if not headers.get("date"):
+            headers["date"] = cached_http_date()
+        if self.signs_digest:
+            headers["digest"] = body_digest(body)
+
+        headers["authorization"] = self.authorization(method, url, headers)
+
+
+class XCoverAuth:
+    """Auth callable signing a `PreparedRequest`, or any request with `method`, `url`, `headers`."""
+
+    def __init__(self, config: AuthConfig):
+        self.config = config
+        self.signer = Signer(config)
+
+    def __call__(self, request: "PreparedRequest"):
+        self.signer.sign(request.method, request.url, request.headers, request.body)
 
         return request
+
+
+class PartnerSigners:
+    """`XCoverAuth` of each partner, kept for the `maxsize` most recently used partners."""
+
+    def __init__(self, headers: str, maxsize: int = 1024):
+        self.headers = headers
+        self.maxsize = maxsize
+        self.partners: Dict[str, PartnerConfig] = {}
+        self._signers = OrderedDict()  # partner code -> XCoverAuth
+        self._lock = threading.Lock()
+
+    def __contains__(self, partner_code: str) -> bool:
+        return partner_code in self.partners
+
+    def __len__(self):
+        return len(self._signers)
+
+    def add(self, partner: PartnerConfig):
+        with self._lock:
+            self.partners[partner.partner_code] = partner
+            self._signers.pop(partner.partner_code, None)
+
+    def remove(self, partner_code: str):
+        with self._lock:
+            self.partners.pop(partner_code, None)
+            self._signers.pop(partner_code, None)
+
+    def get(self, partner_code: str) -> XCoverAuth:
+        with self._lock:
+            auth = self._signers.get(partner_code)
+            if auth is not None:
+                self._signers.move_to_end(partner_code)
+                return auth
+            partner = self.partners.get(partner_code)
+
+        if partner is None:
+            raise XCoverError(f"Unknown partner: {partner_code}")
+        auth = XCoverAuth(partner.auth_config(self.headers))
+        with self._lock:
+            if self.partners.get(partner_code) is partner:
+                self._signers[partner_code] = auth
+                while len(self._signers) > self.maxsize:
+                    self._signers.popitem(last=False)
+        return auth
@@ -0,0 +1,565 @@
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, Optional, Tuple, Type, Union
+from urllib.parse import urlencode, urljoin
+from uuid import uuid4
+
+from .auth import PartnerSigners, XCoverAuth
+from .batch import quote_calls
+from .cache import ResponseCache, resource_id
+from .circuitbreaker import CircuitBreaker
+from .codec import JSONCodec, get_codec
+from .compression import get_compressor
+from .config import PartnerConfig, XCoverConfig
+from .exceptions import XCoverHttpException
+from .hooks import CallRecord, Hooks, current_call
+from .models import Booking, BookingPage, Instalments, Model, QuotePackage, Renewal
+from .ratelimit import RateLimiter
+from .retry import retry_after
+from .timeouts import Deadline, Timeouts
+from .utils import endpoint_family, endpoint_partner, endpoint_template
+
+
+class BaseXCover:
+    """Configuration, helpers and endpoint methods shared by the sync and async clients."""
+
+    default_headers = {"Content-Type": "application/json"}
+
+    def __init__(
+        self,
+        config: XCoverConfig = None,
+        rate_limiter: RateLimiter = None,
+        circuit_breaker: CircuitBreaker = None,
+    ):
+        self.config = config or XCoverConfig()
+        if self.config.accept_encoding:
+            self.default_headers = {
+                **self.default_headers,
+                "Accept-Encoding": self.config.accept_encoding,
+            }
+        self.compressor = get_compressor(self.config.request_compression)
+        self._auth = None
+        self._codec = None
+        self.cache = (
+            ResponseCache(maxsize=self.config.cache_maxsize, ttl=self.config.cache_ttl)
+            if self.config.cache_maxsize
+            else None
+        )
+        if rate_limiter is None and (
+            self.config.rate_limit
+            or self.config.rate_limits
+            or any(partner.has_rate_limits for partner in self.config.partners)
+        ):
+            rate_limiter = RateLimiter(
+                rate=self.config.rate_limit,
+                burst=self.config.rate_limit_burst or None,
+                family_rates=self.config.rate_limits,
+            )
+        self.rate_limiter = rate_limiter
+        if circuit_breaker is None and self.config.circuit_breaker:
+            circuit_breaker = CircuitBreaker(
+                failure_threshold=self.config.circuit_failure_threshold,
+                minimum_calls=self.config.circuit_minimum_calls,
+                window_size=self.config.circuit_window_size,
+                recovery_timeout=self.config.circuit_recovery_timeout,
+            )
+        self.circuit_breaker = circuit_breaker
+        self.timeouts = Timeouts(
+            self.config.http_timeout,
+            self.config.http_timeouts,
+            adaptive=self.config.adaptive_timeouts,
+        )
+        self.signers = PartnerSigners(self.config.headers, maxsize=self.config.signer_cache_size)
+        for partner in self.config.partners:
+            self.add_partner(partner)
+        self.hooks = Hooks()
+        self.singleflight = None
+
+    @property
+    def partner_code(self):
+        return self.config.partner_code
+
+    @property
+    def auth(self) -> XCoverAuth:
+        if self._auth is None:
+            self._auth = XCoverAuth(self.config.auth_config)
+        return self._auth
+
+    @property
+    def codec(self) -> JSONCodec:
+        if self._codec is None:
+            self._codec = get_codec(self.config.json_codec)
+        return self._codec
+
+    def encode(self, payload, headers: dict = None) -> Tuple[Union[str, bytes], dict]:
+        """
+        Body of a request sending `payload` and its headers, the body being compressed when
+        `request_compression` is set and it holds at least `compression_min_size` bytes.
+        """
+        data = self.codec.dumps(payload)
+        headers = {**self.default_headers, **headers} if headers else self.default_headers
+        if self.compressor is None or len(data) < self.config.compression_min_size:
+            return data, headers
+
+        data = self.compressor(data.encode("utf-8") if isinstance(data, str) else data)
+        return data, {**headers, "Content-Encoding": self.config.request_compression}
+
+    def partner_url(self, url: str, partner: str = None) -> str:
+        return urljoin(f"partners/{partner or self.partner_code}/", url)
+
+    def add_partner(self, partner: PartnerConfig):
+        """Register a partner whose calls are made with `partner=` or through `partner()`."""
+        self.signers.add(partner)
+        if partner.has_rate_limits:
+            if self.rate_limiter is None:
+                self.rate_limiter = RateLimiter(burst=self.config.rate_limit_burst or None)
+            self.rate_limiter.add_partner(
+                partner.partner_code, partner.rate_limit or 0, partner.rate_limits
+            )
+
+    def partner(self, partner_code: str) -> "PartnerClient":
+        """View of this client calling endpoints as `partner_code`."""
+        return PartnerClient(self, partner_code)
+
+    def signer(self, partner: str = None) -> XCoverAuth:
+        """Auth of `partner`, by default the partner configured in `XCoverConfig`."""
+        if partner is None or partner == self.partner_code:
+            return self.auth
+        return self.signers.get(partner)
+
+    @staticmethod
+    def add_idempotency_key(method: str, kwargs: dict, generate_idepmotency_key: bool = True):
+        if method in {"POST", "PUT", "PATCH"} and generate_idepmotency_key:
+            headers = kwargs.pop("headers", {})
+            headers.setdefault("x-idempotency-key", str(uuid4()))
+            kwargs["headers"] = headers
+
+    def add_timeouts(self, url: str, kwargs: dict):
+        """
+        Set the `timeout` of each attempt of a call to `url` unless given, and start its
+        `deadline`: seconds (the configured `deadline` by default) or a shared `Deadline`.
+        """
+        if "timeout" not in kwargs:
+            kwargs["timeout"] = self.timeouts.timeout(url)
+        deadline = kwargs.get("deadline") or self.config.deadline
+        if deadline and not isinstance(deadline, Deadline):
+            deadline = Deadline(deadline)
+        kwargs["deadline"] = deadline or None
+
+    @staticmethod
+    def raise_for_status(status_code: int, reason: str, url):
+        error_msg = None
+        if 400 <= status_code < 500:
+            error_msg = f"{status_code} Client Error: {reason} for url {url}"
+
+        elif 500 <= status_code < 600:
+            error_msg = f"{status_code} Server Error: {reason} for url {url}"
+
+        if error_msg:
+            raise XCoverHttpException(error_msg, status_code=status_code)
+
+    def request_key(self, url: str, kwargs: dict) -> tuple:
+        """Identity of a GET call: partner URL, query string and extra headers."""
+        params = kwargs.get("params")
+        if isinstance(params, dict):
+            params = urlencode(params, doseq=True)
+        headers = kwargs.get("headers")
+        return (
+            self.partner_url(url, kwargs.get("partner")),
+            params or None,
+            tuple(sorted(headers.items())) if headers else None,
+        )
+
+    def cache_key(self, method: str, url: str, kwargs: dict, use_cache: bool = True):
+        """Key of a cacheable call (GET of a single quote/booking) or `None`."""
+        if self.cache is None or not use_cache or method != "GET" or not resource_id(url):
+            return None
+        return self.request_key(url, kwargs)
+
+    def coalesce_key(self, method: str, url: str, kwargs: dict):
+        """Key under which concurrent identical GETs share one request, or `None`."""
+        if self.singleflight is None or method != "GET":
+            return None
+        return (*self.request_key(url, kwargs), bool(kwargs.get("auto_retry")))
+
+    def invalidate_cache(self, method: str, url: str):
+        if self.cache is None or method == "GET":
+            return
+
+        resource = resource_id(url)
+        if resource:
+            self.cache.invalidate(resource)
+
+    def call_partner(self, url: str, partner: str = None) -> str:
+        """Partner a call is made as, whose rate limits and circuits it is accounted to."""
+        return partner or endpoint_partner(url) or self.partner_code
+
+    def observe_response(self, url: str, status_code: int, headers):
+        """Feed the rate limiter with the outcome of every request, including retried ones."""
+        if self.rate_limiter is None:
+            return
+
+        if status_code == 429:
+            self.rate_limiter.throttle(
+                endpoint_family(url),
+                retry_after(status_code, headers.get("Retry-After")),
+                partner=self.call_partner(url),
+            )
+        elif status_code < 400:
+            self.rate_limiter.recover(endpoint_family(url), self.call_partner(url))
+
+    def record_response(self, url: str, response, partner: str = None):
+        """Account for the final response of a partner call."""
+        if self.rate_limiter is not None:
+            self.observe_response(
+                self.partner_url(url, partner), response.status_code, response.headers
+            )
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(
+                endpoint_family(url), response.status_code < 500, self.call_partner(url, partner)
+            )
+
+    def record_failure(self, url: str, partner: str = None):
+        """Account for a partner call that got no usable response (timeout, retries exhausted)."""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(
+                endpoint_family(url), False, self.call_partner(url, partner)
+            )
+
+    def before_retry(self, url: str, deadline: Deadline = None):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(endpoint_family(url), self.call_partner(url), deadline)
+
+    def on_retry(self, status_code: Optional[int] = None, error: Exception = None):
+        record = current_call.get()
+        if record is not None:
+            record.attempts += 1
+            record.status_code = status_code
+            record.error = error
+            self.hooks.emit("on_retry", record)
+
+    def tracing(self, method: str, url: str, kwargs: dict):
+        """Context manager yielding the `CallRecord` of a partner call, or `None` without hooks."""
+        if not self.hooks:
+            return nullcontext()
+        return self._trace(method, url, kwargs)
+
+    @contextmanager
+    def _trace(self, method: str, url: str, kwargs: dict):
+        partner = kwargs.get("partner") or self.partner_code
+        record = CallRecord(
+            method=method,
+            endpoint=endpoint_template(url),
+            url=self.partner_url(url, partner),
+            partner_code=partner,
+            idempotency_key=(kwargs.get("headers") or {}).get("x-idempotency-key"),
+        )
+        token = current_call.set(record)
+        self.hooks.emit("before_request", record)
+        try:
+            yield record
+        except BaseException as exc:
+            record.error = exc
+            record.finish()
+            self.hooks.emit("on_error", record)
+            raise
+        else:
+            record.error = None
+            record.finish()
+            self.hooks.emit("after_response", record)
+        finally:
+            current_call.reset(token)
+
+    def traced_auth(self, request):
+        """`auth` callable signing a request and reporting it to the current `CallRecord`."""
+        record = current_call.get()
+        started = time.perf_counter()
+        self.signer(record.partner_code)(request)
+        record.mark("sign", started)
+        self.hooks.emit("after_sign", record)
+        return request
+
+    def decode(
+        self, content: bytes, record: Optional[CallRecord] = None, model: Type[Model] = None
+    ):
+        if record is None:
+            return self.as_model(model, self.codec.loads(content))
+
+        started = time.perf_counter()
+        result = self.as_model(model, self.codec.loads(content))
+        record.mark("decode", started)
+        return result
+
+    def as_model(self, model: Optional[Type[Model]], data):
+        """Wrap decoded `data` in `model` when response models are enabled."""
+        if model is None or not self.config.response_models or not isinstance(data, dict):
+            return data
+        return model(data)
+
+    def call_partner_endpoint(
+        self,
+        method,
+        url,
+        payload=None,
+        generate_idepmotency_key=True,
+        use_cache=True,
+        model=None,
+        **kwargs,
+    ):
+        raise NotImplementedError
+
+    def call_many(self, calls: Iterable[Tuple], max_concurrency: int = None):
+        raise NotImplementedError
+
+    def run_workflows(self, workflows: Iterable, max_concurrency: int = None):
+        raise NotImplementedError
+
+    # Quotes
+    def create_quote(self, payload, **kwargs):
+        return self.call_partner_endpoint(
+            "POST",
+            "quotes/",
+            payload=payload,
+            generate_idepmotency_key=False,
+            model=QuotePackage,
+            **kwargs,
+        )
+
+    def create_quotes_many(self, payloads: Iterable[dict], max_concurrency: int = None, **kwargs):
+        return self.call_many(quote_calls(payloads, **kwargs), max_concurrency=max_concurrency)
+
+    def get_quote(self, quote_id, **kwargs):
+        return self.call_partner_endpoint(
+            "GET", f"quotes/{quote_id}/", model=QuotePackage, **kwargs
+        )
+
+    def update_quote(self, quote_id, payload, **kwargs):
+        return self.call_partner_endpoint(
+            "PATCH", f"quotes/{quote_id}/", payload=payload, model=QuotePackage, **kwargs
+        )
+
+    def opt_out(self, quote_id, payload=None, **kwargs):
+        if payload is None:
+            payload = {}
+        return self.call_partner_endpoint(
+            "POST", f"bookings/{quote_id}/opt_out", payload=payload, **kwargs
+        )
+
+    def add_quotes(self, quote_id, payload, **kwargs):
+        return self.call_partner_endpoint(
+            "POST", f"quotes/{quote_id}/add/", payload=payload, model=QuotePackage, **kwargs
+        )
+
+    def delete_quotes(self, quote_id, payload, **kwargs):
+        return self.call_partner_endpoint(
+            "POST", f"quotes/{quote_id}/delete/", payload=payload, model=QuotePackage, **kwargs
+        )
+
+    # Bookings
+    def create_booking(self, quote_id, payload, auto_retry=True, **kwargs):
+        return self.call_partner_endpoint(
+            "POST",
+            f"bookings/{quote_id}/",
+            auto_retry=auto_retry,
+            payload=payload,
+            model=Booking,
+            **kwargs,
+        )
+
+    def instant_booking(self, payload, auto_retry=True, **kwargs):
+        return self.call_partner_endpoint(
+            "POST",
+            "instant_booking/",
+            payload=payload,
+            auto_retry=auto_retry,
+            model=Booking,
+            **kwargs,
+        )
+
+    def get_booking(self, booking_id, **kwargs):
+        return self.call_partner_endpoint(
+            "GET", f"bookings/{booking_id}/", model=Booking, **kwargs
+        )
+
+    def list_bookings(self, **kwargs):
+        return self.call_partner_endpoint("GET", "bookings/", model=BookingPage, **kwargs)
+
+    def confirm_booking(self, booking_id, payload=None, auto_retry=True, **kwargs):
+        if payload is None:
+            payload = {}
+        return self.call_partner_endpoint(
+            "PUT",
+            f"bookings/{booking_id}/confirm",
+            payload=payload,
+            auto_retry=auto_retry,
+            model=Booking,
+            **kwargs,
+        )
+
+    def trigger_email(self, booking_id, payload=None, auto_retry=True, **kwargs):
+        if payload is None:
+            payload = {}
+
+        return self.call_partner_endpoint(
+            "POST",
+            f"bookings/{booking_id}/send_email",
+            payload=payload,
+            auto_retry=auto_retry,
+            **kwargs,
+        )
+
+    # Mods
+    def booking_modification(self, booking_id, payload, auto_retry=True, **kwargs):
+        return self.call_partner_endpoint(
+            "PATCH",
+            f"bookings/{booking_id}/",
+            payload=payload,
+            auto_retry=auto_retry,
+            model=Booking,
+            **kwargs,
+        )
+
+    def booking_modification_quote(self, booking_id, payload, **kwargs):
+        return self.call_partner_endpoint(
+            "PATCH", f"bookings/{booking_id}/quote_for_update", payload=payload, **kwargs
+        )
+
+    def confirm_booking_modification(
+        self, booking_id, update_id, payload=None, auto_retry=True, **kwargs
+    ):
+        if payload is None:
+            payload = {}
+
+        return self.call_partner_endpoint(
+            "POST",
+            f"bookings/{booking_id}/confirm_update/{update_id}/",
+            payload=payload,
+            auto_retry=auto_retry,
+            **kwargs,
+        )
+
+    # Cancellations
+    def cancel_booking(self, booking_id, payload=None, **kwargs):
+        if payload is None:
+            payload = {}
+
+        return self.call_partner_endpoint(
+            "POST", f"bookings/{booking_id}/cancel", payload=payload, auto_retry=True, **kwargs
+        )
+
+    def confirm_booking_cancellation(
+        self, booking_id, cancellation_id, payload=None, auto_retry=True, **kwargs
+    ):
+        if payload is None:
+            payload = {}
+
+        return self.call_partner_endpoint(
+            "POST",
+            f"bookings/{booking_id}/confirm_cancellation/{cancellation_id}/",
+            payload=payload,
+            auto_retry=auto_retry,
+            **kwargs,
+        )
+
+    # Renewals
+    def quote_for_renewal(self, booking_id, payload=None, **kwargs):
+        if payload is None:
+            payload = {}
+
+        return self.call_partner_endpoint(
+            "PATCH",
+            f"renewals/{booking_id}/quote_for_renewal/",
+            payload=payload,
+            model=Renewal,
+            **kwargs,
+        )
+
+    def renewal_confirmation(
+        self, booking_id, renewal_id, payload=None, auto_retry=True, **kwargs
+    ):
+        if payload is None:
+            payload = {}
+
+        return self.call_partner_endpoint(
+            "POST",
+            f"renewals/{booking_id}/confirm/{renewal_id}/",
+            payload=payload,
+            auto_retry=auto_retry,
+            model=Renewal,
+            **kwargs,
+        )
+
+    def renewal_opt_out(self, booking_id, payload=None, auto_retry=True, **kwargs):
+        if payload is None:
+            payload = {}
+
+        return self.call_partner_endpoint(
+            "POST",
+            f"renewals/{booking_id}/opt_out/",
+            payload=payload,
+            auto_retry=auto_retry,
+            **kwargs,
+        )
+
+    # Instalments
+    def get_instalments(self, booking_id, **kwargs):
+        return self.call_partner_endpoint(
+            "GET",
+            f"bookings/{booking_id}/instalments/",
+            model=Instalments,
+            **kwargs,
+        )
+
+    def update_instalment_payment_status(self, booking_id, payload, auto_retry=True, **kwargs):
+        return self.call_partner_endpoint(
+            "POST",
+            f"bookings/{booking_id}/instalments/",
+            payload=payload,
+            auto_retry=auto_retry,
+            **kwargs,
+        )
+
+
+class PartnerClient(BaseXCover):
+    """View of a client sending its calls as one partner."""
+
+    def __init__(self, client: BaseXCover, partner_code: str):
+        # Nothing of its own to set up, so `BaseXCover.__init__` isn't called
+        self.client = client
+        self._partner_code = partner_code
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    @property
+    def partner_code(self):
+        return self._partner_code
+
+    @property
+    def auth(self) -> XCoverAuth:
+        return self.client.signer(self._partner_code)
+
+    def call_partner_endpoint(
+        self,
+        method,
+        url,
+        payload=None,
+        generate_idepmotency_key=True,
+        use_cache=True,
+        model=None,
+        **kwargs,
+    ):
+        kwargs.setdefault("partner", self._partner_code)
+        return self.client.call_partner_endpoint(
+            method, url, payload, generate_idepmotency_key, use_cache, model, **kwargs
+        )
+
+    # Run by the client's implementation, calling back this view's `call_partner_endpoint`
+    def call_many(self, calls: Iterable[Tuple], max_concurrency: int = None):
+        return type(self.client).call_many(self, calls, max_concurrency)
+
+    def run_workflows(self, workflows: Iterable, max_concurrency: int = None):
+        return type(self.client).run_workflows(self, workflows, max_concurrency)
+
+    def iter_bookings(self, *args, **kwargs):
+        return type(self.client).iter_bookings(self, *args, **kwargs)
@@ -0,0 +1,33 @@
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Tuple
+
+from .models import QuotePackage
+
+
+@dataclass
+class BatchResult:
+    """Outcome of a single call made as part of `call_many`."""
+
+    result: Any = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def unpack_call(call: Tuple) -> Tuple[str, str, dict]:
+    """Normalise a `(method, url)` or `(method, url, kwargs)` item of `call_many`."""
+    method, url, *rest = call
+    kwargs = dict(rest[0]) if rest else {}
+    return method, url, kwargs
+
+
+def quote_calls(payloads: Iterable[dict], **kwargs):
+    for payload in payloads:
+        yield "POST", "quotes/", {
+            "payload": payload,
+            "generate_idepmotency_key": False,
+            "model": QuotePackage,
+            **kwargs,
+        }
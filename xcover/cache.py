@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional
+
+RESOURCE_PREFIXES = frozenset({"quotes", "bookings", "renewals"})
+
+
+def resource_id(url: str) -> Optional[str]:
+    """
+    Id of the quote/booking a partner endpoint URL refers to, e.g. `bookings/{id}/confirm`.
+    Quotes and the bookings made from them share the same id.
+    """
+    prefix, _, rest = url.lstrip("/").partition("/")
+    if prefix not in RESOURCE_PREFIXES:
+        return None
+    return rest.partition("/")[0] or None
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    size: int = 0
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with a TTL for GET responses, invalidated per resource."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30, clock: Callable = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, resource, value)
+        self._resources = {}  # resource -> set of keys
+        self._invalidated = OrderedDict()  # resource -> counter value of last invalidation
+        self._invalidated_floor = 0
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                invalidations=self._stats.invalidations,
+                size=len(self._entries),
+            )
+
+    def token(self) -> int:
+        return self._counter
+
+    def get(self, key: Hashable):
+        """Return the cached value or `None`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self._stats.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry[2]
+
+    def set(self, key: Hashable, resource: str, value, token: int = None):
+        with self._lock:
+            if token is not None:
+                invalidated = self._invalidated.get(resource, self._invalidated_floor)
+                if invalidated > token:
+                    return
+
+            self._remove(key)
+            self._entries[key] = (self.clock() + self.ttl, resource, value)
+            self._resources.setdefault(resource, set()).add(key)
+
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self._stats.evictions += 1
+
+    def invalidate(self, resource: str):
+        with self._lock:
+            self._counter += 1
+            self._invalidated[resource] = self._counter
+            self._invalidated.move_to_end(resource)
+            if len(self._invalidated) > self.maxsize:
+                self._invalidated_floor = self._invalidated.popitem(last=False)[1]
+
+            for key in self._resources.pop(resource, ()):
+                del self._entries[key]
+                self._stats.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._resources.clear()
+            self._counter += 1
+            self._invalidated.clear()
+            self._invalidated_floor = self._counter
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        keys = self._resources[entry[1]]
+        keys.discard(key)
+        if not keys:
+            del self._resources[entry[1]]
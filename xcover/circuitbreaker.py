@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Callable, Dict, Optional, Tuple
+
+from .exceptions import XCoverCircuitOpenError
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class Circuit:
+    """Failure window and state of the circuit of one endpoint family."""
+
+    def __init__(
+        self,
+        failure_threshold: float = 0.5,
+        minimum_calls: int = 10,
+        window_size: int = 20,
+        recovery_timeout: float = 30,
+        half_open_max_calls: int = 1,
+        clock: Callable = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.minimum_calls = minimum_calls
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+        self.state = CircuitState.CLOSED
+        self.outcomes = deque(maxlen=window_size)  # True for failed calls
+        self.opened_at = 0.0
+        self.probes = 0
+        self.probe_started_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def failure_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(self.outcomes) / len(self.outcomes)
+
+    def retry_in(self) -> float:
+        """Seconds until the next call may be let through, 0 if calls are allowed now."""
+        now = self.clock()
+        if self.state == CircuitState.OPEN:
+            return max(0.0, self.opened_at + self.recovery_timeout - now)
+        if self.state == CircuitState.HALF_OPEN and self.probes >= self.half_open_max_calls:
+            return max(0.0, self.probe_started_at + self.recovery_timeout - now)
+        return 0.0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CircuitState.CLOSED:
+                return True
+
+            if self.retry_in() > 0:
+                return False
+
+            if self.state == CircuitState.OPEN or self.probes >= self.half_open_max_calls:
+                self.state = CircuitState.HALF_OPEN
+                self.probes = 0
+            self.probes += 1
+            self.probe_started_at = self.clock()
+            return True
+
+    def release(self):
+        """Give back the probe slot taken by `allow` for a call that ended up not being sent."""
+        with self._lock:
+            if self.state == CircuitState.HALF_OPEN and self.probes:
+                self.probes -= 1
+
+    def record(self, success: bool):
+        with self._lock:
+            if self.state == CircuitState.HALF_OPEN:
+                if success:
+                    self.state = CircuitState.CLOSED
+                    self.outcomes.clear()
+                else:
+                    self._open()
+                return
+
+            self.outcomes.append(not success)
+            if (
+                self.state == CircuitState.CLOSED
+                and len(self.outcomes) >= self.minimum_calls
+                and self.failure_rate >= self.failure_threshold
+            ):
+                self._open()
+
+    def _open(self):
+        self.state = CircuitState.OPEN
+        self.opened_at = self.clock()
+        self.probes = 0
+
+
+class CircuitBreaker:
+    """One `Circuit` per partner and endpoint family."""
+
+    def __init__(self, **circuit_options):
+        self.circuit_options = circuit_options
+        # (partner, family) -> circuit
+        self.circuits: Dict[Tuple[Optional[str], str], Circuit] = {}
+        self._lock = threading.Lock()
+
+    def circuit(self, family: str, partner: str = None) -> Circuit:
+        key = (partner, family)
+        try:
+            return self.circuits[key]
+        except KeyError:
+            with self._lock:
+                return self.circuits.setdefault(key, Circuit(**self.circuit_options))
+
+    def before_call(self, family: str, partner: str = None):
+        circuit = self.circuit(family, partner)
+        if not circuit.allow():
+            raise XCoverCircuitOpenError(family, circuit.retry_in())
+
+    def release(self, family: str, partner: str = None):
+        self.circuit(family, partner).release()
+
+    def record(self, family: str, success: bool, partner: str = None):
+        self.circuit(family, partner).record(success)
+
+    def states(self) -> Dict[Tuple[Optional[str], str], CircuitState]:
+        """Current state of every `(partner, family)` seen so far, e.g. for health checks."""
+        with self._lock:
+            circuits = list(self.circuits.items())
+        return {key: circuit.state for key, circuit in circuits}
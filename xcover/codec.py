@@ -0,0 +1,104 @@
+import decimal
+import enum
+import json
+import math
+from typing import Union
+
+from .encoder import JSONEncoder
+from .exceptions import XCoverError
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+# Encoded alike by orjson and `json`, without anything nested
+PLAIN_TYPES = frozenset({str, int, bool, type(None)})
+
+
+class JSONCodec:
+    """Standard library codec, the reference behaviour for every other codec."""
+
+    name = "json"
+
+    def dumps(self, obj) -> Union[str, bytes]:
+        return json.dumps(obj, cls=JSONEncoder)
+
+    def loads(self, data: bytes):
+        return json.loads(data)
+
+
+def orjson_differs(obj) -> bool:
+    """
+    Whether `obj` holds values orjson encodes unlike the standard library: NaN and infinity,
+    written as `null`, and `Enum` members, written as their value where `json` raises.
+    """
+    pending = [obj]
+    while pending:
+        value = pending.pop()
+        kind = type(value)
+        if kind in PLAIN_TYPES:
+            continue
+        if kind is dict:
+            pending.extend(value.values())
+        elif kind is list or kind is tuple:
+            pending.extend(value)
+        elif kind is float:
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, enum.Enum):
+            return True
+        elif isinstance(value, decimal.Decimal) and not value.is_finite():
+            return True
+    return False
+
+
+class OrjsonCodec(JSONCodec):
+    """orjson backed codec, falling back to `JSONCodec` wherever their output would differ."""
+
+    name = "orjson"
+    options = 0
+
+    def __init__(self):
+        if orjson is None:
+            raise XCoverError("orjson codec requires the `orjson` package to be installed")
+        self.options = (
+            orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+            | orjson.OPT_PASSTHROUGH_SUBCLASS
+        )
+        self._default = JSONEncoder().default
+
+    def dumps(self, obj) -> Union[str, bytes]:
+        if orjson_differs(obj):
+            return super().dumps(obj)
+        try:
+            return orjson.dumps(obj, default=self._default, option=self.options)
+        except TypeError:
+            return super().dumps(obj)
+
+    def loads(self, data: bytes):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return super().loads(data)
+
+
+CODECS = {codec.name: codec for codec in (JSONCodec, OrjsonCodec)}
+
+
+def get_codec(codec: Union[str, JSONCodec, None] = "auto") -> JSONCodec:
+    """
+    Resolve `XCoverConfig.json_codec`: a codec instance, a codec name, or "auto" to pick
+    the fastest installed one.
+    """
+    if isinstance(codec, JSONCodec):
+        return codec
+    if not codec or codec == "auto":
+        codec = OrjsonCodec.name if orjson is not None else JSONCodec.name
+
+    try:
+        return CODECS[codec]()
+    except KeyError:
+        raise XCoverError(f"Unknown JSON codec: {codec}")
@@ -0,0 +1,41 @@
+"""
+Compression of request bodies, and the `Digest` header letting a signature cover the body.
+"""
+
+import base64
+import gzip
+import hashlib
+import zlib
+from typing import Callable, Optional, Union
+
+from .exceptions import XCoverError
+
+Body = Union[str, bytes, None]
+
+# Content-Encoding -> function compressing bytes, "deflate" being the zlib format in HTTP
+COMPRESSORS = {
+    "gzip": lambda data: gzip.compress(data, mtime=0),
+    "deflate": zlib.compress,
+}
+
+
+def get_compressor(encoding: Optional[str]) -> Optional[Callable[[bytes], bytes]]:
+    """Resolve `XCoverConfig.request_compression`, `None` when bodies aren't compressed."""
+    if not encoding:
+        return None
+
+    try:
+        return COMPRESSORS[encoding]
+    except KeyError:
+        raise XCoverError(f"Unknown request compression: {encoding}")
+
+
+def as_bytes(body: Body) -> bytes:
+    if body is None:
+        return b""
+    return body.encode("utf-8") if isinstance(body, str) else body
+
+
+def body_digest(body: Body) -> str:
+    """`Digest` header value (RFC 3230) of a request body as sent, i.e. after compression."""
+    return f"SHA-256={base64.b64encode(hashlib.sha256(as_bytes(body)).digest()).decode()}"
@@ -1,21 +1,56 @@
 import hashlib
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Callable, Tuple, Union
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple, Union
 from urllib.parse import ParseResult, urlparse
 
-from requests import PreparedRequest
+if TYPE_CHECKING:
+    from requests import PreparedRequest
 
 env = os.environ.get
 
 
+def parse_rates(value: Optional[str]) -> Dict[str, float]:
+    """Parse `key=number` pairs, e.g. `"quotes=50,bookings=10"`."""
+    rates = {}
+    for item in filter(None, (value or "").split(",")):
+        key, _, rate = item.partition("=")
+        rates[key.strip()] = float(rate)
+    return rates
+
+
+def env_rates(name: str) -> Dict[str, float]:
+    """`key=number` pairs of env variable `name`, e.g. `XC_RATE_LIMITS="quotes=50,bookings=10"`."""
+    return parse_rates(env(name))
+
+
+def to_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def env_field(name: str, default=None, cast: Callable = None):
+    """Dataclass field defaulting to env variable `name`, read when the config is created."""
+
+    def factory():
+        value = env(name, default)
+        return value if cast is None or value is None else cast(value)
+
+    return field(default_factory=factory)
+
+
 class SignatureAlgorithm(Enum):
     HMAC_SHA256 = "hmac-sha256"
     HMAC_SHA384 = "hmac-sha384"
     HMAC_SHA512 = "hmac-sha512"
 
 
+def signature_algorithm(name: Optional[str]) -> SignatureAlgorithm:
+    return SignatureAlgorithm(name) if name else SignatureAlgorithm.HMAC_SHA512
+
+
 @dataclass
 class AuthConfig:
     SUPPORTED_ALGORITHMS = {
@@ -33,7 +68,7 @@ class AuthConfig:
     def headers_as_list(self) -> list:
         return list(filter(len, self.headers.split(" ")))
 
-    def build_string_to_sign(self, request: PreparedRequest) -> str:
+    def build_string_to_sign(self, request: "PreparedRequest") -> str:
         parts = []
         for header in self.headers_as_list:
             if header == "(request-target)":
@@ -53,28 +88,80 @@ class AuthConfig:
 
 
 @dataclass
-class XCoverConfig:
-    partner_code: str = env("XC_PARTNER_CODE")
-    base_url: str = env("XC_BASE_URL")
-    http_timeout: Union[float, Tuple[float, float]] = float(env("XC_HTTP_TIMEOUT", 60))
-    auth_api_key: str = env("XC_AUTH_API_KEY")
-    auth_api_secret: str = env("XC_AUTH_API_SECRET")
-    auth_algorithm: str = env("XC_AUTH_ALGORITHM")
-    headers: str = env("XC_AUTH_HEADERS", "(request-target) date")
-    retry_total: int = int(env("XC_RETRY_TOTAL", 5))
-    retry_backoff_factor: int = int(env("XC_RETRY_BACKOFF_FACTOR", 2))
+class PartnerConfig:
+    """Code, credentials and rate limits of one partner of a multi-partner client."""
+
+    partner_code: str
+    auth_api_key: str
+    auth_api_secret: str
+    auth_algorithm: str = None
+    headers: str = None
+    rate_limit: float = None
+    rate_limits: Dict[str, float] = None
 
     @property
-    def auth_config(self):
-        algorithm = (
-            SignatureAlgorithm(self.auth_algorithm)
-            if self.auth_algorithm
-            else SignatureAlgorithm.HMAC_SHA512
+    def has_rate_limits(self) -> bool:
+        return self.rate_limit is not None or self.rate_limits is not None
+
+    def auth_config(self, headers: str) -> AuthConfig:
+        """`AuthConfig` of the partner, signing `headers` unless it has its own."""
+        return AuthConfig(
+            api_key=self.auth_api_key,
+            api_secret=self.auth_api_secret,
+            algorithm=signature_algorithm(self.auth_algorithm),
+            headers=self.headers or headers,
         )
 
+
+@dataclass
+class XCoverConfig:
+    partner_code: str = env_field("XC_PARTNER_CODE")
+    base_url: str = env_field("XC_BASE_URL")
+    http_timeout: Union[float, Tuple[float, float]] = env_field("XC_HTTP_TIMEOUT", 60, float)
+    http_timeouts: Dict[str, float] = field(default_factory=lambda: env_rates("XC_HTTP_TIMEOUTS"))
+    adaptive_timeouts: bool = env_field("XC_ADAPTIVE_TIMEOUTS", False, to_bool)
+    deadline: float = env_field("XC_DEADLINE", 0, float)
+    auth_api_key: str = env_field("XC_AUTH_API_KEY")
+    auth_api_secret: str = env_field("XC_AUTH_API_SECRET")
+    auth_algorithm: str = env_field("XC_AUTH_ALGORITHM")
+    headers: str = env_field("XC_AUTH_HEADERS", "(request-target) date")
+    retry_total: int = env_field("XC_RETRY_TOTAL", 5, int)
+    retry_backoff_factor: int = env_field("XC_RETRY_BACKOFF_FACTOR", 2, int)
+    pool_connections: int = env_field("XC_POOL_CONNECTIONS", 10, int)
+    pool_maxsize: int = env_field("XC_POOL_MAXSIZE", 10, int)
+    pool_block: bool = env_field("XC_POOL_BLOCK", False, to_bool)
+    json_codec: str = env_field("XC_JSON_CODEC", "auto")
+    cache_maxsize: int = env_field("XC_CACHE_MAXSIZE", 0, int)
+    cache_ttl: float = env_field("XC_CACHE_TTL", 30, float)
+    rate_limit: float = env_field("XC_RATE_LIMIT", 0, float)
+    rate_limit_burst: float = env_field("XC_RATE_LIMIT_BURST", 0, float)
+    rate_limits: Dict[str, float] = field(default_factory=lambda: env_rates("XC_RATE_LIMITS"))
+    circuit_breaker: bool = env_field("XC_CIRCUIT_BREAKER", False, to_bool)
+    circuit_failure_threshold: float = env_field("XC_CIRCUIT_FAILURE_THRESHOLD", 0.5, float)
+    circuit_minimum_calls: int = env_field("XC_CIRCUIT_MINIMUM_CALLS", 10, int)
+    circuit_window_size: int = env_field("XC_CIRCUIT_WINDOW_SIZE", 20, int)
+    circuit_recovery_timeout: float = env_field("XC_CIRCUIT_RECOVERY_TIMEOUT", 30, float)
+    coalesce_gets: bool = env_field("XC_COALESCE_GETS", False, to_bool)
+    transport: str = env_field("XC_TRANSPORT", "requests")
+    response_models: bool = env_field("XC_RESPONSE_MODELS", False, to_bool)
+    dispatch_workers: int = env_field("XC_DISPATCH_WORKERS", 4, int)
+    dispatch_queue_size: int = env_field("XC_DISPATCH_QUEUE_SIZE", 1000, int)
+    dispatch_overflow: str = env_field("XC_DISPATCH_OVERFLOW", "block")
+    dispatch_drain_timeout: float = env_field("XC_DISPATCH_DRAIN_TIMEOUT", 30, float)
+    hedge_gets: bool = env_field("XC_HEDGE_GETS", False, to_bool)
+    hedge_delay: float = env_field("XC_HEDGE_DELAY", 0, float)
+    hedge_max_rate: float = env_field("XC_HEDGE_MAX_RATE", 0.05, float)
+    request_compression: str = env_field("XC_REQUEST_COMPRESSION")
+    compression_min_size: int = env_field("XC_COMPRESSION_MIN_SIZE", 1024, int)
+    accept_encoding: str = env_field("XC_ACCEPT_ENCODING")
+    partners: List[PartnerConfig] = field(default_factory=list)
+    signer_cache_size: int = env_field("XC_SIGNER_CACHE_SIZE", 1024, int)
+
+    @property
+    def auth_config(self):
         return AuthConfig(
             api_key=self.auth_api_key,
             api_secret=self.auth_api_secret,
-            algorithm=algorithm,
+            algorithm=signature_algorithm(self.auth_algorithm),
             headers=self.headers,
         )
@@ -0,0 +1,139 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+from .exceptions import XCoverError, XCoverQueueFullError
+
+OVERFLOW_POLICIES = ("block", "drop")
+STOP_POLL_INTERVAL = 0.1
+
+
+class Dispatcher:
+    """Bounded queue of calls run by a pool of `workers` threads."""
+
+    def __init__(self, workers: int = 4, maxsize: int = 1000, overflow: str = "block"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise XCoverError(f"Unknown dispatch overflow policy: {overflow}")
+        self.workers = workers
+        self.overflow = overflow
+        self.queue = queue.Queue(maxsize)
+        self.dropped = 0
+        self._threads = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stopping = threading.Event()
+
+    def __len__(self):
+        return self.queue.qsize()
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        Queue `func(*args, **kwargs)`. The returned future holds its result or exception; with
+        the "drop" policy, a call that didn't fit in the queue fails with `XCoverQueueFullError`.
+        A call still waiting for room at shutdown is cancelled.
+        """
+        if self._closed:
+            raise XCoverError("Dispatcher is shut down")
+        self._start()
+
+        future = Future()
+        item = (future, func, args, kwargs)
+        if self.overflow == "block":
+            self._put(item)
+        else:
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                with self._lock:
+                    self.dropped += 1
+                future.set_exception(XCoverQueueFullError(self.queue.maxsize))
+                return future
+        if self._stopping.is_set():
+            future.cancel()  # Queued during shutdown, no worker may be left to run it
+        return future
+
+    def _put(self, item):
+        while not self._stopping.is_set():
+            try:
+                self.queue.put(item, timeout=STOP_POLL_INTERVAL)
+                return
+            except queue.Full:
+                pass
+
+    def _start(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._work, name=f"xcover-dispatch-{index}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None or self._stopping.is_set():
+                    if item is not None:
+                        item[0].cancel()
+                    # Pass the stop on to a worker still waiting for an item
+                    self._wake()
+                    return
+                future, func, args, kwargs = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException as exc:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(result)
+            finally:
+                self.queue.task_done()
+
+    def _wake(self):
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass  # Workers take the queued calls and stop after them
+
+    def join(self, timeout: float = None) -> bool:
+        """Wait for all queued calls to complete. Returns `False` on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self, wait: bool = True, timeout: float = None) -> bool:
+        """
+        Stop accepting calls and stop the workers. With `wait`, queued calls are run first (up
+        to `timeout`); calls still queued afterwards are cancelled. Returns whether the queue
+        was fully drained.
+        """
+        self._closed = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        drained = self.join(timeout) if wait else not self.queue.unfinished_tasks
+        self._stopping.set()
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[0].cancel()
+            self.queue.task_done()
+        self._wake()
+        if wait:
+            for thread in self._threads:
+                thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+        return drained
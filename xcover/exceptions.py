@@ -4,3 +4,32 @@ class XCoverError(Exception):
 
 class XCoverHttpException(XCoverError):
     """Generic class for XCover error"""
+
+    def __init__(self, *args, status_code: int = None):
+        super().__init__(*args)
+        self.status_code = status_code
+
+
+class XCoverCircuitOpenError(XCoverError):
+    """Call rejected without reaching XCover because the circuit of its endpoint family is open"""
+
+    def __init__(self, family: str, retry_in: float):
+        super().__init__(f"Circuit for {family} endpoints is open, retry in {retry_in:.1f}s")
+        self.family = family
+        self.retry_in = retry_in
+
+
+class XCoverQueueFullError(XCoverError):
+    """Call dropped because the dispatch queue was full"""
+
+    def __init__(self, maxsize: int):
+        super().__init__(f"Dispatch queue is full ({maxsize} calls)")
+        self.maxsize = maxsize
+
+
+class XCoverDeadlineExceeded(XCoverHttpException):
+    """Call abandoned because its deadline passed before it got a response"""
+
+    def __init__(self, seconds: float):
+        super().__init__(f"Call deadline of {seconds}s exceeded")
+        self.seconds = seconds
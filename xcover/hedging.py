@@ -0,0 +1,160 @@
+"""Hedged requests: a GET slower than a delay is sent again, the first response wins."""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Hashable, Optional
+
+from .hooks import CallRecord
+
+
+class LatencyTracker:
+    """Latencies of the last `window` calls per key, for percentile estimates."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[Hashable, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key: Hashable, latency: float):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(latency)
+
+    def percentile(self, key: Hashable, percentile: float) -> Optional[float]:
+        """Latency under which `percentile` of the calls completed, `None` if too few calls."""
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+class Hedging:
+    """Hedging policy of a client, sending at most `max_rate` of its calls twice."""
+
+    def __init__(
+        self,
+        delay: float = None,
+        percentile: float = 0.95,
+        max_rate: float = 0.05,
+        burst: float = 10,
+        max_workers: int = 20,
+    ):
+        self.delay = delay
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.burst = burst
+        self.max_workers = max_workers
+        self.latencies = LatencyTracker()
+        self.hedged = 0
+        self._budget = 0.0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._primary_executor = None
+        self._primary_slots = threading.BoundedSemaphore(max_workers)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="xcover-hedge"
+                    )
+        return self._executor
+
+    @property
+    def primary_executor(self) -> ThreadPoolExecutor:
+        if self._primary_executor is None:
+            with self._lock:
+                if self._primary_executor is None:
+                    self._primary_executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="xcover-primary"
+                    )
+        return self._primary_executor
+
+    def hedge_delay(self, key: Hashable) -> Optional[float]:
+        if self.delay:
+            return self.delay
+        return self.latencies.percentile(key, self.percentile)
+
+    def _earn(self) -> bool:
+        """Add this call's share to the hedge budget and tell whether a hedge is affordable."""
+        with self._lock:
+            self._budget = min(self.burst, self._budget + self.max_rate)
+            return self._budget >= 1
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self._budget < 1:
+                return False
+            self._budget -= 1
+            self.hedged += 1
+            return True
+
+    def run(
+        self,
+        key: Hashable,
+        send: Callable,
+        traced_send: Callable = None,
+        record: Optional[CallRecord] = None,
+    ):
+        """
+        Return the response of `send()`, sending it a second time if the first one is slower
+        than the hedge delay of `key`. The slower request is left to complete in the background
+        and its response discarded. Calls that can't be hedged use `traced_send`, which reports
+        its phases to `record`; hedged calls only report their `send` time.
+        """
+        delay = self.hedge_delay(key)
+        # A slot is free only while a primary thread is, so primaries never queue
+        if delay is None or not self._earn() or not self._primary_slots.acquire(blocking=False):
+            started = time.perf_counter()
+            response = (traced_send or send)()
+            self.latencies.observe(key, time.perf_counter() - started)
+            return response
+
+        running = threading.Event()
+        primary = self.primary_executor.submit(self._send_primary, key, send, running)
+        running.wait()
+        started = time.perf_counter()
+        try:
+            done, _ = wait([primary], timeout=delay)
+            if done or not self._spend():
+                return primary.result()
+
+            if record is not None:
+                record.hedged = True
+            pending = {primary, self.executor.submit(send)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+            return primary.result()
+        finally:
+            if record is not None:
+                record.mark("send", started)
+
+    def _send_primary(self, key: Hashable, send: Callable, running: threading.Event):
+        running.set()
+        started = time.perf_counter()
+        try:
+            response = send()
+        finally:
+            self._primary_slots.release()
+        self.latencies.observe(key, time.perf_counter() - started)
+        return response
+
+    def close(self):
+        with self._lock:
+            executors = (self._executor, self._primary_executor)
+            self._executor = self._primary_executor = None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=False)
@@ -0,0 +1,134 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HOOK_EVENTS = ("before_request", "after_sign", "on_retry", "after_response", "on_error")
+
+
+@dataclass
+class CallRecord:
+    """Trace of one partner call, with the seconds spent per phase in `timings`."""
+
+    method: str
+    endpoint: str
+    url: str
+    partner_code: Optional[str] = None
+    idempotency_key: Optional[str] = None
+    status_code: Optional[int] = None
+    attempts: int = 1
+    cached: bool = False
+    hedged: bool = False
+    error: Optional[BaseException] = None
+    started_at: float = field(default_factory=time.perf_counter)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def add(self, phase: str, duration: float):
+        self.timings[phase] = self.timings.get(phase, 0.0) + duration
+
+    def mark(self, phase: str, since: float) -> float:
+        """Add the time elapsed since `since` to `phase` and return the current time."""
+        now = time.perf_counter()
+        self.add(phase, now - since)
+        return now
+
+    def finish(self):
+        timings = self.timings
+        timings["total"] = time.perf_counter() - self.started_at
+        # `prepare` and `send` are measured end to end, report their own share only
+        if "prepare" in timings:
+            timings["prepare"] = max(0.0, timings["prepare"] - timings.get("sign", 0.0))
+        if "send" in timings:
+            connection = sum(timings.get(phase, 0.0) for phase in ("acquire", "connect", "tls"))
+            timings["wait"] = max(0.0, timings.pop("send") - connection)
+
+
+current_call: ContextVar[Optional[CallRecord]] = ContextVar("xcover_current_call", default=None)
+
+
+class Hooks:
+    """Callbacks receiving the `CallRecord` of every partner call of a client."""
+
+    def __init__(self):
+        self._callbacks = {event: [] for event in HOOK_EVENTS}
+
+    def __bool__(self):
+        return any(self._callbacks.values())
+
+    def register(self, event: str, callback: Callable = None):
+        """Register `callback` for `event`; can also be used as a decorator."""
+        if event not in self._callbacks:
+            raise ValueError(f"Unknown hook event {event!r}, expected one of {HOOK_EVENTS}")
+        if callback is None:
+            return lambda func: self.register(event, func)
+
+        self._callbacks[event].append(callback)
+        return callback
+
+    def unregister(self, event: str, callback: Callable):
+        self._callbacks[event].remove(callback)
+
+    def emit(self, event: str, record: CallRecord):
+        for callback in self._callbacks[event]:
+            try:
+                callback(record)
+            except Exception:
+                logger.exception("XCover %s hook %r failed", event, callback)
+
+
+def add_timing(phase: str, since: float):
+    record = current_call.get()
+    if record is not None:
+        record.mark(phase, since)
+
+
+def trace_connection(conn, tls: bool):
+    """Wrap the connect methods of a new pooled connection to time `connect` and `tls`."""
+    open_socket = getattr(conn, "_new_conn", None)
+    connect = conn.connect
+
+    def traced_open_socket():
+        started = time.perf_counter()
+        try:
+            return open_socket()
+        finally:
+            add_timing("connect", started)
+
+    def traced_connect():
+        record = current_call.get()
+        if record is None:
+            return connect()
+
+        started = time.perf_counter()
+        connect_before = record.timings.get("connect", 0.0)
+        try:
+            return connect()
+        finally:
+            # Whatever wasn't spent opening the socket went into the TLS handshake
+            opened = record.timings.get("connect", 0.0) - connect_before
+            if open_socket is None:
+                record.add("connect", time.perf_counter() - started)
+            elif tls:
+                record.add("tls", time.perf_counter() - started - opened)
+
+    if open_socket is not None:
+        conn._new_conn = traced_open_socket
+    conn.connect = traced_connect
+    return conn
+
+
+class TracedPoolMixin:
+    """urllib3 connection pool mixin timing `acquire` and the phases of new connections."""
+
+    def _new_conn(self):
+        return trace_connection(super()._new_conn(), tls=self.scheme == "https")
+
+    def _get_conn(self, timeout=None):
+        started = time.perf_counter()
+        try:
+            return super()._get_conn(timeout)
+        finally:
+            add_timing("acquire", started)
@@ -0,0 +1,517 @@
+"""Load generator driving a mix of `XCover` endpoint calls against an API or a local fake."""
+
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from .config import PartnerConfig, XCoverConfig, parse_rates
+from .exceptions import XCoverDeadlineExceeded, XCoverError
+
+DEFAULT_MIX = "create_quote=70,get_booking=20,instant_booking=10"
+
+# Credentials used with `--fake` when none are configured
+FAKE_PARTNER = PartnerConfig("LOADTEST", "loadtest-api-key", "loadtest-api-secret")
+
+EVENTS = [("Ariana Grande", "The O2"), ("Coldplay", "Wembley Stadium"), ("Adele", "Hyde Park")]
+NAMES = [("Ada", "Lovelace"), ("Alan", "Turing"), ("Grace", "Hopper"), ("Edsger", "Dijkstra")]
+
+
+def quote_payload(rng: random.Random) -> dict:
+    """Event ticket protection quote request, shaped like `tests/factories.py` payloads."""
+    now = datetime.now(timezone.utc)
+    event_name, event_location = rng.choice(EVENTS)
+    tickets = rng.randint(1, 4)
+    return {
+        "request": [
+            {
+                "policy_type": "event_ticket_protection",
+                "policy_type_version": 1,
+                "policy_start_date": now + timedelta(hours=rng.uniform(1, 24)),
+                "event_datetime": now + timedelta(days=rng.uniform(1, 30)),
+                "event_name": event_name,
+                "event_location": event_location,
+                "number_of_tickets": tickets,
+                "tickets": [{"price": rng.choice((50, 100, 250))}] * tickets,
+                "resale_ticket": False,
+                "event_country": "GB",
+            }
+        ],
+        "currency": "GBP",
+        "customer_country": "GB",
+        "customer_region": "London",
+        "customer_language": "en",
+    }
+
+
+def booking_payload(rng: random.Random) -> dict:
+    first_name, last_name = rng.choice(NAMES)
+    payload = quote_payload(rng)
+    payload["policyholder"] = {
+        "first_name": first_name,
+        "last_name": last_name,
+        "age": rng.randint(18, 80),
+        "email": f"{first_name}.{last_name}@test-xcover.com".lower(),
+        "country": "GB",
+    }
+    return payload
+
+
+class IdPool:
+    """Ids of resources created during a run, sampled by calls reading them."""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._ids: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, resource_id: str, rng: random.Random):
+        with self._lock:
+            if len(self._ids) < self.maxsize:
+                self._ids.append(resource_id)
+            else:
+                self._ids[rng.randrange(self.maxsize)] = resource_id
+
+    def pick(self, rng: random.Random) -> str:
+        with self._lock:
+            return self._ids[rng.randrange(len(self._ids))]
+
+
+class Histogram:
+    """Latency histogram with logarithmic buckets `2 ** (1 / resolution)` wide."""
+
+    def __init__(self, lowest: float = 1e-5, resolution: int = 16):
+        self.lowest = lowest
+        self.growth = 2 ** (1 / resolution)
+        self.counts = Counter()  # bucket index -> latencies up to lowest * growth ** index
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, latency: float):
+        index = max(0, math.ceil(math.log(max(latency, self.lowest) / self.lowest, self.growth)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    def upper_bound(self, index: int) -> float:
+        return self.lowest * self.growth**index
+
+    def percentile(self, percentile: float) -> float:
+        """Latency under which `percentile` of the calls completed."""
+        if not self.count:
+            return 0.0
+        rank = percentile * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+    def buckets(self, bounds) -> List[list]:
+        """Number of latencies up to each of `bounds` (seconds), then above the last one."""
+        counts = [0] * (len(bounds) + 1)
+        for index, count in self.counts.items():
+            latency = min(self.upper_bound(index), self.max)
+            position = next(
+                (i for i, bound in enumerate(bounds) if latency <= bound * 1.0001), len(bounds)
+            )
+            counts[position] += count
+        return [[bound, count] for bound, count in zip(list(bounds) + [math.inf], counts)]
+
+
+# Bucket bounds, in seconds, of the histograms in reports
+REPORT_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 30)
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.service_time = Histogram()
+        self.errors = Counter()
+
+    def report(self, elapsed: float) -> dict:
+        latency = self.latency
+        return {
+            "calls": latency.count,
+            "errors": dict(self.errors),
+            "calls_per_second": round(latency.count / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {
+                "mean": round(latency.total / latency.count * 1000, 3) if latency.count else 0.0,
+                "p50": round(latency.percentile(0.5) * 1000, 3),
+                "p90": round(latency.percentile(0.9) * 1000, 3),
+                "p99": round(latency.percentile(0.99) * 1000, 3),
+                "p99.9": round(latency.percentile(0.999) * 1000, 3),
+                "max": round(latency.max * 1000, 3),
+            },
+            "service_time_p99_ms": round(self.service_time.percentile(0.99) * 1000, 3),
+            # Upper bounds in ms, `None` for calls slower than the last bound
+            "histogram": [
+                [bound * 1000 if bound != math.inf else None, count]
+                for bound, count in latency.buckets(REPORT_BUCKETS)
+            ],
+        }
+
+
+def error_name(exc: Exception) -> str:
+    if isinstance(exc, XCoverDeadlineExceeded):
+        return "deadline exceeded"
+    status_code = getattr(exc, "status_code", None)
+    return f"HTTP {status_code}" if status_code else type(exc).__name__
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """`name=weight` pairs of endpoint calls, as shares of the calls made."""
+    weights = parse_rates(value)
+    unknown = sorted(set(weights) - set(OPERATIONS))
+    if unknown:
+        raise XCoverError(f"Unknown operations: {', '.join(unknown)}")
+    total = sum(weights.values())
+    if total <= 0:
+        raise XCoverError("The call mix needs a positive weight")
+    return {name: weight / total for name, weight in weights.items() if weight > 0}
+
+
+def create_quote(test: "LoadTest", rng: random.Random):
+    test.quotes.add(test.client.create_quote(quote_payload(rng)).get("id"), rng)
+
+
+def get_quote(test: "LoadTest", rng: random.Random):
+    test.client.get_quote(test.quotes.pick(rng))
+
+
+def instant_booking(test: "LoadTest", rng: random.Random):
+    test.bookings.add(test.client.instant_booking(booking_payload(rng)).get("id"), rng)
+
+
+def get_booking(test: "LoadTest", rng: random.Random):
+    test.client.get_booking(test.bookings.pick(rng))
+
+
+def list_bookings(test: "LoadTest", rng: random.Random):
+    test.client.list_bookings(params={"limit": 20, "offset": rng.randrange(5) * 20})
+
+
+# Operation name -> call it makes, and the operation creating the ids it reads, if any
+OPERATIONS: Dict[str, Callable] = {
+    "create_quote": create_quote,
+    "get_quote": get_quote,
+    "instant_booking": instant_booking,
+    "get_booking": get_booking,
+    "list_bookings": list_bookings,
+}
+PREREQUISITES = {"get_quote": "create_quote", "get_booking": "instant_booking"}
+
+
+class LoadTest:
+    """Drives `client` with calls drawn from `mix` (operation name -> share of the calls)."""
+
+    def __init__(self, client, mix: Dict[str, float], seed: int = None, prefill: int = 10):
+        self.client = client
+        self.mix = mix
+        self.prefill = prefill
+        self.quotes = IdPool()
+        self.bookings = IdPool()
+        self.stats: Dict[str, EndpointStats] = {name: EndpointStats() for name in mix}
+        self.retries = Counter()  # endpoint template -> retries
+        self._random = random.Random(seed)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        client.hooks.register("on_retry", self.on_retry)
+
+    @property
+    def rng(self) -> random.Random:
+        rng = getattr(self._local, "rng", None)
+        if rng is None:
+            with self._lock:
+                rng = self._local.rng = random.Random(self._random.getrandbits(64))
+        return rng
+
+    def on_retry(self, record):
+        with self._lock:
+            self.retries[record.endpoint] += 1
+
+    def choose(self) -> str:
+        return self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+
+    def prepare(self):
+        """
+        Create `prefill` resources for each operation reading them, allowing for failed calls
+        when faults are injected. Fails only when no resource could be created at all.
+        """
+        prerequisites = {PREREQUISITES[name] for name in self.mix if name in PREREQUISITES}
+        for prerequisite in sorted(prerequisites):
+            created, error = 0, None
+            for _ in range(3 * self.prefill):
+                try:
+                    OPERATIONS[prerequisite](self, self.rng)
+                except Exception as exc:
+                    error = exc
+                    continue
+                created += 1
+                if created == self.prefill:
+                    break
+            if created == 0 and self.prefill:
+                raise XCoverError(f"Could not prefill {prerequisite}: {error}") from error
+
+    def execute(self, name: str, scheduled: float):
+        """Make one call, its latency counted from `scheduled` (a `perf_counter` time)."""
+        started = time.perf_counter()
+        error = None
+        try:
+            OPERATIONS[name](self, self.rng)
+        except Exception as exc:
+            error = error_name(exc)
+        finished = time.perf_counter()
+
+        stats = self.stats[name]
+        with self._lock:
+            stats.latency.record(finished - scheduled)
+            stats.service_time.record(finished - started)
+            if error is not None:
+                stats.errors[error] += 1
+
+    def run_rate(
+        self,
+        rate: float,
+        duration: float = None,
+        requests: int = None,
+        max_in_flight: int = 256,
+        poisson: bool = True,
+    ) -> dict:
+        """Start `rate` calls per second, spaced evenly or as Poisson arrivals (open loop)."""
+        self.prepare()
+        executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        cpu, started = os.times(), time.perf_counter()
+        scheduled, calls, lag = started, 0, 0.0
+        while not self.done(calls, scheduled - started, duration, requests):
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                lag = max(lag, -delay)
+            executor.submit(self.execute, self.choose(), scheduled)
+            calls += 1
+            scheduled += self._random.expovariate(rate) if poisson else 1 / rate
+        executor.shutdown(wait=True)
+
+        report = self.report(started, cpu, mode="open", rate=rate, concurrency=max_in_flight)
+        report["max_schedule_lag_ms"] = round(lag * 1000, 3)
+        return report
+
+    def run_concurrency(
+        self, concurrency: int, duration: float = None, requests: int = None
+    ) -> dict:
+        """Keep `concurrency` calls in flight, each worker calling back to back (closed loop)."""
+        self.prepare()
+        counter = itertools.count()
+        cpu, started = os.times(), time.perf_counter()
+
+        def worker():
+            while True:
+                now = time.perf_counter()
+                if self.done(next(counter), now - started, duration, requests):
+                    return
+                self.execute(self.choose(), now)
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return self.report(started, cpu, mode="closed", concurrency=concurrency)
+
+    @staticmethod
+    def done(calls: int, elapsed: float, duration: Optional[float], requests: Optional[int]):
+        if requests is not None and calls >= requests:
+            return True
+        return duration is not None and elapsed >= duration
+
+    def report(self, started: float, cpu, **run) -> dict:
+        elapsed = time.perf_counter() - started
+        cpu_now = os.times()
+        user, system = cpu_now.user - cpu.user, cpu_now.system - cpu.system
+        calls = sum(stats.latency.count for stats in self.stats.values())
+        errors = sum(sum(stats.errors.values()) for stats in self.stats.values())
+        return {
+            **run,
+            "seconds": round(elapsed, 3),
+            "calls": calls,
+            "calls_per_second": round(calls / elapsed, 2) if elapsed else 0.0,
+            "errors": errors,
+            "retries": sum(self.retries.values()),
+            "retries_by_endpoint": dict(self.retries),
+            "cpu": {
+                "user_seconds": round(user, 3),
+                "system_seconds": round(system, 3),
+                "percent": round((user + system) / elapsed * 100, 1) if elapsed else 0.0,
+                "us_per_call": round((user + system) / calls * 1e6, 1) if calls else 0.0,
+            },
+            "endpoints": {name: stats.report(elapsed) for name, stats in self.stats.items()},
+        }
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"{report['calls']} calls in {report['seconds']}s: {report['calls_per_second']:,.1f}/s, "
+        f"{report['errors']} errors, {report['retries']} retries, "
+        f"client CPU {report['cpu']['percent']}% ({report['cpu']['us_per_call']}us/call)",
+        "",
+        f"{'endpoint':<18} {'calls':>8} {'errors':>7} {'calls/s':>9} {'p50 ms':>9} "
+        f"{'p90 ms':>9} {'p99 ms':>9} {'p99.9 ms':>9} {'max ms':>9}",
+    ]
+    for name, stats in report["endpoints"].items():
+        latency = stats["latency_ms"]
+        lines.append(
+            f"{name:<18} {stats['calls']:>8} {sum(stats['errors'].values()):>7} "
+            f"{stats['calls_per_second']:>9,.1f} {latency['p50']:>9,.1f} {latency['p90']:>9,.1f} "
+            f"{latency['p99']:>9,.1f} {latency['p99.9']:>9,.1f} {latency['max']:>9,.1f}"
+        )
+    for name, stats in report["endpoints"].items():
+        lines += ["", f"{name} latency"]
+        calls = max(stats["calls"], 1)
+        for bound, count in stats["histogram"]:
+            if count:
+                label = f"<= {bound:g} ms" if bound is not None else "slower"
+                lines.append(f"  {label:>12} {count:>8} {'#' * round(40 * count / calls)}")
+        for error, count in stats["errors"].items():
+            lines.append(f"  error {error}: {count}")
+    return "\n".join(lines)
+
+
+def serve_fake(ready, partners: List[PartnerConfig], faults: dict, seed: int = None):
+    """Run a `FakeXCoverServer` until the process is terminated, putting its URL in `ready`."""
+    from .testing import FakeXCover, FakeXCoverServer, Faults, lognormal
+
+    median = faults.pop("latency")
+    engine = FakeXCover(Faults(latency=lognormal(median) if median else None, **faults), seed=seed)
+    for partner in partners:
+        engine.add_partner(partner)
+    server = FakeXCoverServer(engine)
+    server.start()
+    ready.put(server.url)
+    server.thread.join()
+
+
+def start_fake(config: XCoverConfig, args) -> multiprocessing.Process:
+    """
+    Serve a fake XCover for `config` from another process, so that its CPU time isn't
+    charged to the client, and point `config` at it.
+    """
+    faults = {
+        "latency": args.fake_latency,
+        "throttle_rate": args.fake_throttle_rate,
+        "error_rate": args.fake_error_rate,
+        "timeout_rate": args.fake_timeout_rate,
+    }
+    partner = PartnerConfig(
+        config.partner_code, config.auth_api_key, config.auth_api_secret, config.auth_algorithm
+    )
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    process = context.Process(
+        target=serve_fake, args=(ready, [partner], faults, args.seed), daemon=True
+    )
+    process.start()
+    config.base_url = ready.get(timeout=30)
+    return process
+
+
+def build_config(args) -> XCoverConfig:
+    config = XCoverConfig()
+    if args.fake and not (config.partner_code and config.auth_api_key):
+        config = replace(
+            config,
+            partner_code=FAKE_PARTNER.partner_code,
+            auth_api_key=FAKE_PARTNER.auth_api_key,
+            auth_api_secret=FAKE_PARTNER.auth_api_secret,
+        )
+    if args.base_url:
+        config.base_url = args.base_url
+    if args.transport:
+        config.transport = args.transport
+    # Enough pooled connections for every call in flight
+    config.pool_maxsize = max(config.pool_maxsize, args.concurrency or args.max_in_flight)
+    return config
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m xcover.loadtest", description=__doc__)
+    load = parser.add_mutually_exclusive_group(required=True)
+    load.add_argument("--rate", type=float, help="calls started per second (open loop)")
+    load.add_argument("--concurrency", type=int, help="calls kept in flight (closed loop)")
+    parser.add_argument("--duration", type=float, help="seconds to run (default 60)")
+    parser.add_argument("--requests", type=int, help="number of calls to make")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation=weight pairs")
+    parser.add_argument("--arrivals", choices=("poisson", "uniform"), default="poisson")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="open loop threads")
+    parser.add_argument("--prefill", type=int, default=10, help="ids created before the run")
+    parser.add_argument("--base-url", help="XCover base URL (default XC_BASE_URL)")
+    parser.add_argument("--transport", help="XCoverConfig.transport to use")
+    parser.add_argument("--seed", type=int, help="seed of calls, payloads and fake faults")
+    parser.add_argument("--output", help="JSON report file, `-` for stdout")
+    fake = parser.add_argument_group("local fake XCover")
+    fake.add_argument("--fake", action="store_true", help="run against a local fake XCover")
+    fake.add_argument("--fake-latency", type=float, default=0.05, help="median, in seconds")
+    fake.add_argument("--fake-throttle-rate", type=float, default=0, help="share of 429s")
+    fake.add_argument("--fake-error-rate", type=float, default=0, help="share of 5xx")
+    fake.add_argument("--fake-timeout-rate", type=float, default=0, help="share of timeouts")
+    args = parser.parse_args(argv)
+    if args.duration is None and args.requests is None:
+        args.duration = 60
+    return args
+
+
+def main(argv=None):
+    from .xcover import XCover
+
+    args = parse_args(argv)
+    mix = parse_mix(args.mix)
+    config = build_config(args)
+    server = start_fake(config, args) if args.fake else None
+    try:
+        with XCover(config) as client:
+            test = LoadTest(client, mix, seed=args.seed, prefill=args.prefill)
+            if args.rate:
+                report = test.run_rate(
+                    args.rate,
+                    args.duration,
+                    args.requests,
+                    max_in_flight=args.max_in_flight,
+                    poisson=args.arrivals == "poisson",
+                )
+            else:
+                report = test.run_concurrency(args.concurrency, args.duration, args.requests)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+
+    print(format_report(report), file=sys.stderr if args.output == "-" else sys.stdout)
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Typed, read-only views over XCover API responses, converting fields on first access."""
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional
+
+
+def to_decimal(value) -> Optional[Decimal]:
+    """Decimal of a JSON number or numeric string; floats keep their shortest repr (2.01)."""
+    if value is None:
+        return None
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(value)
+
+
+def to_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    if value.endswith("Z"):
+        value = f"{value[:-1]}+00:00"
+    return datetime.fromisoformat(value)
+
+
+def to_model(model: type) -> Callable:
+    def convert(value):
+        return None if value is None else model(value)
+
+    return convert
+
+
+def to_model_list(model: type) -> Callable:
+    """Convert a list of items, or the `{"0": ..., "1": ...}` mapping some endpoints return."""
+
+    def convert(value) -> Optional[List]:
+        if value is None:
+            return None
+        if isinstance(value, dict):
+            value = [item for _, item in sorted(value.items(), key=lambda item: int(item[0]))]
+        return [model(item) for item in value]
+
+    return convert
+
+
+class Field:
+    """Value of `raw[key]`, converted on first access and cached in the `_<name>` slot."""
+
+    __slots__ = ("key", "convert", "slot")
+
+    def __init__(self, convert: Callable = None, key: str = None):
+        self.key = key
+        self.convert = convert
+        self.slot = None
+
+    def __set_name__(self, owner, name):
+        if self.key is None:
+            self.key = name
+        self.slot = owner.__dict__[f"_{name}"]
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return self.slot.__get__(instance, owner)
+        except AttributeError:
+            value = instance.raw.get(self.key)
+            if value is not None and self.convert is not None:
+                value = self.convert(value)
+            self.slot.__set__(instance, value)
+            return value
+
+
+class ModelMeta(type):
+    """Gives each `Field` of a model class the slot caching its converted value."""
+
+    def __new__(mcs, name, bases, namespace):
+        if "__slots__" not in namespace:
+            namespace["__slots__"] = tuple(
+                f"_{key}" for key, value in namespace.items() if isinstance(value, Field)
+            )
+        return super().__new__(mcs, name, bases, namespace)
+
+
+class Model(metaclass=ModelMeta):
+    __slots__ = ("raw",)
+
+    def __init__(self, raw: dict):
+        self.raw = raw
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.raw.get('id')}>"
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.raw == self.raw
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Raw value of a response field, including fields the model doesn't declare."""
+        return self.raw.get(key, default)
+
+
+class Quote(Model):
+    id = Field()
+    status = Field()
+    price = Field(to_decimal)
+    price_formatted = Field()
+    policy_start_date = Field(to_datetime)
+    policy_end_date = Field(to_datetime)
+    policy = Field()
+    tax = Field()
+
+
+class QuotePackage(Model):
+    id = Field()
+    status = Field()
+    currency = Field()
+    total_price = Field(to_decimal)
+    total_price_formatted = Field()
+    partner_transaction_id = Field()
+    created_at = Field(to_datetime)
+    updated_at = Field(to_datetime)
+    pds_url = Field()
+    security_token = Field()
+    quotes = Field(to_model_list(Quote))
+
+
+class Booking(QuotePackage):
+    policyholder = Field()
+
+
+class BookingPage(Model):
+    """A page of `list_bookings`."""
+
+    count = Field()
+    next = Field()
+    previous = Field()
+    results = Field(to_model_list(Booking))
+
+
+class Instalment(Model):
+    id = Field()
+    number = Field()
+    quote = Field()
+    status = Field()
+    period_start_date = Field(to_datetime)
+    period_end_date = Field(to_datetime)
+    total_amount = Field(to_decimal)
+    commission = Field(to_decimal)
+    tax = Field()
+
+
+class QuoteInstalments(Model):
+    id = Field()
+    paid_until = Field(to_datetime)
+    next_payment = Field(to_model(Instalment))
+    payment_schedule = Field(to_model_list(Instalment))
+
+
+class Instalments(Model):
+    """Instalments of a booking, per quote."""
+
+    quotes = Field(to_model_list(QuoteInstalments))
+
+
+class Renewal(QuotePackage):
+    """Quote package returned by the renewal endpoints."""
@@ -0,0 +1,309 @@
+"""Durable SQLite outbox sending journaled mutation calls once each, across restarts."""
+
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from .auth import XCoverAuth
+from .base import BaseXCover
+from .cache import resource_id
+from .codec import JSONCodec
+from .exceptions import XCoverCircuitOpenError, XCoverError
+from .retry import backoff_time
+
+logger = logging.getLogger(__name__)
+
+PENDING, SENDING, DONE, FAILED = "pending", "sending", "done", "failed"
+MUTATION_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+# Client errors that another attempt with the same request can fix
+RETRYABLE_CLIENT_ERRORS = frozenset({408, 409, 425, 429})
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    resource TEXT,
+    payload TEXT,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS outbox_resource ON outbox (resource, status);
+"""
+
+# Due entries of resources without an earlier unsent entry, to keep calls in order per booking
+CLAIM_QUERY = """
+SELECT id, idempotency_key, method, url, payload, options, attempts FROM outbox AS entry
+WHERE status = 'pending' AND next_attempt_at <= ? AND NOT EXISTS (
+    SELECT 1 FROM outbox AS earlier
+    WHERE earlier.resource = entry.resource AND earlier.id < entry.id
+    AND earlier.status IN ('pending', 'sending')
+)
+ORDER BY id LIMIT ?
+"""
+
+
+@dataclass
+class OutboxEntry:
+    key: str
+    method: str
+    url: str
+    status: str
+    attempts: int = 0
+    result: Any = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == DONE
+
+
+class Outbox(BaseXCover):
+    """Journals the mutation calls of `client`, returning the key of each journaled call."""
+
+    def __init__(
+        self,
+        client,
+        path: str,
+        batch_size: int = 50,
+        max_concurrency: int = None,
+        max_attempts: int = 10,
+        flush_interval: float = 1.0,
+    ):
+        # Calls are sent by `client`, so like `PartnerClient` it isn't set up a second time
+        self.client = client
+        self.path = path
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.flush_interval = flush_interval
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+        with self._db_lock:
+            self._db.executescript(SCHEMA)
+            # Calls interrupted by a crash are sent again, with the same idempotency key
+            self._db.execute("UPDATE outbox SET status = ? WHERE status = ?", (PENDING, SENDING))
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    @property
+    def auth(self) -> XCoverAuth:
+        return self.client.auth
+
+    @property
+    def codec(self) -> JSONCodec:
+        return self.client.codec
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def call_partner_endpoint(
+        self,
+        method,
+        url,
+        payload=None,
+        generate_idepmotency_key=True,
+        use_cache=True,
+        model=None,
+        **kwargs,
+    ) -> str:
+        if method not in MUTATION_METHODS:
+            raise XCoverError(f"Only mutation calls can go through the outbox, not {method}")
+
+        kwargs["headers"] = dict(kwargs.get("headers") or {})
+        self.add_idempotency_key(method, kwargs, generate_idepmotency_key)
+        # Calls sent without an idempotency key are still journaled under a key of their own
+        key = kwargs["headers"].get("x-idempotency-key") or str(uuid4())
+        options = {**kwargs, "generate_idepmotency_key": False}
+        now = time.time()
+        with self._db_lock:
+            self._db.execute(
+                "INSERT INTO outbox (idempotency_key, method, url, resource, payload, options,"
+                " status, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    method,
+                    url,
+                    resource_id(url),
+                    None if payload is None else self.dumps(payload),
+                    self.dumps(options),
+                    PENDING,
+                    now,
+                    now,
+                ),
+            )
+        self._wakeup.set()
+        return key
+
+    def dumps(self, obj) -> str:
+        data = self.codec.dumps(obj)
+        return data.decode() if isinstance(data, bytes) else data
+
+    def call_many(self, calls, max_concurrency: int = None):
+        raise XCoverError("Batches of calls can't go through the outbox, call them one by one")
+
+    def flush(self) -> int:
+        """Send one batch of due calls and record their outcome. Returns the number sent."""
+        now = time.time()
+        with self._db_lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(CLAIM_QUERY, (now, self.batch_size)).fetchall()
+                self._db.executemany(
+                    "UPDATE outbox SET status = ? WHERE id = ?",
+                    [(SENDING, row[0]) for row in rows],
+                )
+            finally:
+                self._db.execute("COMMIT")
+        if not rows:
+            return 0
+
+        calls = []
+        for _, _, method, url, payload, options, _ in rows:
+            kwargs = self.codec.loads(options)
+            kwargs["payload"] = None if payload is None else self.codec.loads(payload)
+            calls.append((method, url, kwargs))
+        try:
+            results = self.client.call_many(calls, max_concurrency=self.max_concurrency)
+        except BaseException:
+            with self._db_lock:
+                self._db.executemany(
+                    "UPDATE outbox SET status = ? WHERE id = ?",
+                    [(PENDING, row[0]) for row in rows],
+                )
+            raise
+
+        updates = []
+        for row, batch_result in zip(rows, results):
+            entry_id, attempts = row[0], row[6] + 1
+            if batch_result.ok:
+                updates.append((DONE, attempts, now, self.dumps(batch_result.result), None))
+            else:
+                status, next_attempt_at = self.reschedule(batch_result.error, attempts)
+                updates.append((status, attempts, next_attempt_at, None, str(batch_result.error)))
+            updates[-1] += (entry_id,)
+        with self._db_lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, result = ?,"
+                " error = ? WHERE id = ?",
+                updates,
+            )
+            self._db.execute("COMMIT")
+        return len(rows)
+
+    def reschedule(self, error: Exception, attempts: int):
+        """Status and next attempt time of a call that failed for the `attempts`-th time."""
+        status_code = getattr(error, "status_code", None)
+        if attempts >= self.max_attempts or (
+            status_code is not None
+            and 400 <= status_code < 500
+            and status_code not in RETRYABLE_CLIENT_ERRORS
+        ):
+            return FAILED, time.time()
+
+        delay = backoff_time(self.config.retry_backoff_factor, attempts + 1)
+        if isinstance(error, XCoverCircuitOpenError):
+            delay = max(delay, error.retry_in)
+        return PENDING, time.time() + delay
+
+    def start(self):
+        """Flush the outbox from a background thread until `stop()`."""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="xcover-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """Stop the background thread. Unsent calls stay in the journal for the next start."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def close(self):
+        self.stop()
+        with self._db_lock:
+            self._db.close()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                sent = self.flush()
+            except Exception:
+                logger.exception("Error flushing XCover outbox %s", self.path)
+                sent = 0
+            if not sent:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+
+    def drain(self, timeout: float = None) -> bool:
+        """Wait until no call is pending or being sent. Returns `False` on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            counts = self.counts()
+            if not counts.get(PENDING) and not counts.get(SENDING):
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if self._thread is None:
+                self.flush()
+            time.sleep(0.01)
+
+    def counts(self) -> Dict[str, int]:
+        """Number of journaled calls by status."""
+        with self._db_lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"))
+
+    def entry(self, key: str) -> Optional[OutboxEntry]:
+        entries = self._entries("WHERE idempotency_key = ?", (key,))
+        return entries[0] if entries else None
+
+    def entries(self, status: str = None) -> List[OutboxEntry]:
+        if status is None:
+            return self._entries("ORDER BY id", ())
+        return self._entries("WHERE status = ? ORDER BY id", (status,))
+
+    def _entries(self, clause: str, args: tuple) -> List[OutboxEntry]:
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT idempotency_key, method, url, status, attempts, result, error FROM outbox "
+                + clause,
+                args,
+            ).fetchall()
+        return [
+            OutboxEntry(
+                key=key,
+                method=method,
+                url=url,
+                status=status,
+                attempts=attempts,
+                result=None if result is None else self.codec.loads(result),
+                error=error,
+            )
+            for key, method, url, status, attempts, result, error in rows
+        ]
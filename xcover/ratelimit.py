@@ -0,0 +1,143 @@
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+from .exceptions import XCoverDeadlineExceeded
+
+if TYPE_CHECKING:
+    from .timeouts import Deadline
+
+
+class TokenBucket:
+    """Token bucket whose `reserve()` returns how long to wait before using the token taken."""
+
+    min_rate_factor = 0.1
+    recovery_factor = 0.05
+
+    def __init__(self, rate: float, burst: float = None, clock: Callable = time.monotonic):
+        self.rate = rate
+        self.current_rate = rate
+        self.burst = burst or max(rate, 1)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.current_rate)
+            self.updated = now
+
+    def reserve(self, max_wait: float = None) -> Optional[float]:
+        with self._lock:
+            now = self.clock()
+            # No tokens are accumulated while the bucket is paused
+            self._refill(max(now, self.blocked_until))
+
+            ready_at = max(now, self.blocked_until)
+            if self.tokens < 1:
+                ready_at += (1 - self.tokens) / self.current_rate
+            if max_wait is not None and ready_at - now >= max_wait:
+                return None
+            self.tokens -= 1
+            return ready_at - now
+
+    def throttle(self, retry_after: Optional[float] = None):
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                self.updated = max(self.updated, self.blocked_until)
+            self.current_rate = max(self.rate * self.min_rate_factor, self.current_rate / 2)
+            self.tokens = min(self.tokens, 0)
+
+    def recover(self):
+        if self.current_rate >= self.rate:
+            return
+        with self._lock:
+            self._refill(self.clock())
+            self.current_rate = min(
+                self.rate, self.current_rate + self.rate * self.recovery_factor
+            )
+
+
+class RateLimiter:
+    """Client-side rate limits per partner and endpoint family, 0 meaning unlimited."""
+
+    def __init__(
+        self,
+        rate: float = 0,
+        burst: float = None,
+        family_rates: Dict[str, float] = None,
+        clock: Callable = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.family_rates = family_rates or {}
+        self.clock = clock
+        # partner code -> limiter holding its rates, the buckets are kept here
+        self.partners: Dict[str, RateLimiter] = {}
+        # (partner, family) -> bucket
+        self.buckets: Dict[Tuple[Optional[str], str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, family: str, partner: str = None) -> Optional[TokenBucket]:
+        key = (partner, family)
+        try:
+            return self.buckets[key]
+        except KeyError:
+            pass
+
+        limits = self.partners.get(partner, self)
+        rate = limits.family_rates.get(family, limits.rate)
+        with self._lock:
+            if key not in self.buckets:
+                self.buckets[key] = (
+                    TokenBucket(rate, burst=limits.burst, clock=self.clock) if rate > 0 else None
+                )
+            return self.buckets[key]
+
+    def add_partner(self, partner: str, rate: float = 0, family_rates: Dict[str, float] = None):
+        """Give `partner` its own `rate` and `family_rates` instead of the default ones."""
+        with self._lock:
+            self.partners[partner] = RateLimiter(rate, self.burst, family_rates, self.clock)
+            for key in [key for key in self.buckets if key[0] == partner]:
+                del self.buckets[key]
+
+    def reserve(self, family: str, partner: str = None, deadline: "Deadline" = None) -> float:
+        """
+        Seconds to wait for a token. Raises `XCoverDeadlineExceeded`, without taking a token,
+        when the wait wouldn't end before `deadline`.
+        """
+        bucket = self.bucket(family, partner)
+        if bucket is None:
+            return 0
+        delay = bucket.reserve(None if deadline is None else deadline.remaining())
+        if delay is None:
+            deadline.exceeded = True
+            raise XCoverDeadlineExceeded(deadline.seconds)
+        return delay
+
+    def acquire(self, family: str, partner: str = None, deadline: "Deadline" = None):
+        delay = self.reserve(family, partner, deadline)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, family: str, partner: str = None, deadline: "Deadline" = None):
+        import asyncio
+
+        delay = self.reserve(family, partner, deadline)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def throttle(self, family: str, retry_after: Optional[float] = None, partner: str = None):
+        bucket = self.bucket(family, partner)
+        if bucket is not None:
+            bucket.throttle(retry_after)
+
+    def recover(self, family: str, partner: str = None):
+        bucket = self.bucket(family, partner)
+        if bucket is not None:
+            bucket.recover()
@@ -0,0 +1,250 @@
+"""Resumable bulk renewals, checkpointed in a SQLite file."""
+
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+from uuid import uuid4
+
+from .exceptions import XCoverError
+from .outbox import RETRYABLE_CLIENT_ERRORS
+
+logger = logging.getLogger(__name__)
+
+# Decided, the confirmation or opt-out is being sent or its outcome is unknown
+RENEWING, OPTING_OUT = "renewing", "opting_out"
+RENEWED, OPTED_OUT, SKIPPED, FAILED = "renewed", "opted_out", "skipped", "failed"
+DONE_STATUSES = frozenset({RENEWED, OPTED_OUT, SKIPPED})
+# Already handled by the current run
+SEEN = "seen"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS renewals (
+    booking_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    renewal_id TEXT,
+    idempotency_key TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class RenewalSummary:
+    """Outcome of a `BulkRenewal.run`, counting the bookings processed by that run."""
+
+    renewed: int = 0
+    opted_out: int = 0
+    skipped: int = 0
+    failed: int = 0
+    already_done: int = 0  # Completed by an earlier run
+    elapsed: float = 0.0
+    errors: Dict[str, str] = field(default_factory=dict)  # booking id -> error
+
+    @property
+    def processed(self) -> int:
+        return self.renewed + self.opted_out + self.skipped + self.failed
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+class BulkRenewal:
+    """Renews the bookings passed to `run` with `client` as `decide` tells."""
+
+    def __init__(
+        self,
+        client,
+        path: str,
+        decide: Callable[[str, object], Optional[bool]],
+        max_concurrency: int = None,
+    ):
+        self.client = client
+        self.path = path
+        self.decide = decide
+        self.max_concurrency = max_concurrency
+        self.errors = client.errors
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db_lock = threading.Lock()
+        with self._db_lock:
+            self._db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        with self._db_lock:
+            self._db.close()
+
+    def run(self, booking_ids: Iterable[str]) -> RenewalSummary:
+        """
+        Renew `booking_ids`, skipping those completed by an earlier run. Bookings are read
+        from `booking_ids` as workers free up, so it can be a generator over a large export.
+        An exception raised by `decide` stops the run once the bookings in flight complete.
+        """
+        started = time.perf_counter()
+        # Checkpoints saved from now on were made by this run
+        run_started = time.time()
+        summary = RenewalSummary()
+        max_workers = self.max_concurrency or self.client.config.pool_maxsize
+        slots = threading.BoundedSemaphore(2 * max_workers)
+        lock = threading.Lock()
+        aborted = []
+
+        def collect(booking_id, future):
+            slots.release()
+            error = future.exception()
+            with lock:
+                in_flight.discard(booking_id)
+                if error is not None:
+                    aborted.append(error)
+                    return
+                status, error = future.result()
+                setattr(summary, status, getattr(summary, status) + 1)
+                if error is not None:
+                    summary.errors[booking_id] = str(error)
+
+        # Only the bookings being processed are kept in memory, the rest is read from the file
+        in_flight: Set[str] = set()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for booking_id in booking_ids:
+                with lock:
+                    if booking_id in in_flight:
+                        continue
+                status = self.check(booking_id, run_started)
+                if status == SEEN:
+                    continue
+                if status in DONE_STATUSES:
+                    summary.already_done += 1
+                    continue
+                slots.acquire()
+                if aborted:
+                    slots.release()
+                    break
+                with lock:
+                    in_flight.add(booking_id)
+                future = executor.submit(self.renew, booking_id)
+                future.add_done_callback(
+                    lambda future, booking_id=booking_id: collect(booking_id, future)
+                )
+
+        summary.elapsed = time.perf_counter() - started
+        logger.info(
+            "Renewals of %s: %d renewed, %d opted out, %d skipped, %d failed, %d already done"
+            " in %.1fs",
+            self.path,
+            summary.renewed,
+            summary.opted_out,
+            summary.skipped,
+            summary.failed,
+            summary.already_done,
+            summary.elapsed,
+        )
+        if aborted:
+            raise aborted[0]
+        return summary
+
+    def renew(self, booking_id: str) -> Tuple[str, Optional[Exception]]:
+        """Quote, decide and confirm or opt out the renewal of one booking."""
+        row = self.checkpoint(booking_id)
+        if row is not None and row[0] in (RENEWING, OPTING_OUT):
+            status, renewal_id, key = row
+        else:
+            try:
+                renewal = self.client.quote_for_renewal(booking_id)
+            except self.errors as exc:
+                self.save(booking_id, FAILED, error=str(exc))
+                return FAILED, exc
+            decision = self.decide(booking_id, renewal)
+            if decision is None:
+                self.save(booking_id, SKIPPED)
+                return SKIPPED, None
+            status = RENEWING if decision else OPTING_OUT
+            renewal_id, key = renewal.get("renewal_id"), str(uuid4())
+            if status == RENEWING and renewal_id is None:
+                error = XCoverError(f"Renewal quote of {booking_id} has no renewal_id")
+                self.save(booking_id, FAILED, error=str(error))
+                return FAILED, error
+            # Journaled before sending, so a crash can't lose the key of a call that was applied
+            self.save(booking_id, status, renewal_id, key)
+        return self.send(booking_id, status, renewal_id, key)
+
+    def send(self, booking_id: str, status: str, renewal_id: str, key: str):
+        headers = {"x-idempotency-key": key}
+        try:
+            if status == RENEWING:
+                self.client.renewal_confirmation(booking_id, renewal_id, headers=headers)
+            else:
+                self.client.renewal_opt_out(booking_id, headers=headers)
+        except self.errors as exc:
+            status_code = getattr(exc, "status_code", None)
+            if (
+                status_code is not None
+                and 400 <= status_code < 500
+                and status_code not in RETRYABLE_CLIENT_ERRORS
+            ):
+                self.save(booking_id, FAILED, error=str(exc))
+            else:
+                self.save(booking_id, status, renewal_id, key, error=str(exc))
+            return FAILED, exc
+
+        status = RENEWED if status == RENEWING else OPTED_OUT
+        self.save(booking_id, status, renewal_id, key)
+        return status, None
+
+    def checkpoint(self, booking_id: str) -> Optional[Tuple[str, str, str]]:
+        """Status, renewal id and idempotency key recorded for `booking_id`, if any."""
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT status, renewal_id, idempotency_key FROM renewals WHERE booking_id = ?",
+                (booking_id,),
+            ).fetchone()
+
+    def save(
+        self,
+        booking_id: str,
+        status: str,
+        renewal_id: str = None,
+        key: str = None,
+        error: str = None,
+    ):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO renewals (booking_id, status, renewal_id,"
+                " idempotency_key, error, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (booking_id, status, renewal_id, key, error, time.time()),
+            )
+
+    def check(self, booking_id: str, since: float) -> Optional[str]:
+        """
+        Status recorded for `booking_id` before `since`, or `SEEN` if it was recorded or
+        checked since. Checking a completed booking marks it as seen at `since`.
+        """
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT status, updated_at FROM renewals WHERE booking_id = ?", (booking_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            status, updated_at = row
+            if updated_at >= since:
+                return SEEN
+            if status in DONE_STATUSES:
+                self._db.execute(
+                    "UPDATE renewals SET updated_at = ? WHERE booking_id = ?", (since, booking_id)
+                )
+            return status
+
+    def counts(self) -> Dict[str, int]:
+        """Number of checkpointed bookings by status."""
+        with self._db_lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM renewals GROUP BY status"))
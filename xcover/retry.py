@@ -0,0 +1,83 @@
+from typing import TYPE_CHECKING, Optional
+
+from .exceptions import XCoverHttpException
+
+if TYPE_CHECKING:
+    from .timeouts import Deadline
+
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+RETRY_METHODS = frozenset({"HEAD", "GET", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"})
+
+
+def backoff_time(backoff_factor: float, attempt: int) -> float:
+    """
+    Delay before retry number `attempt` (1-based), same formula as urllib3 `Retry`:
+    no delay before the first retry, then exponential growth capped at `Retry.DEFAULT_BACKOFF_MAX`.
+    """
+    # Imported on first use to keep urllib3 out of `import xcover`
+    from urllib3.util.retry import Retry
+
+    if attempt <= 1:
+        return 0
+    return min(Retry.DEFAULT_BACKOFF_MAX, backoff_factor * (2 ** (attempt - 1)))
+
+
+def retry_after(status_code: int, value: Optional[str]) -> Optional[float]:
+    """Parse `Retry-After` header the same way urllib3 does for the statuses it respects."""
+    from urllib3.exceptions import InvalidHeader
+    from urllib3.util.retry import Retry
+
+    if not value or status_code not in Retry.RETRY_AFTER_STATUS_CODES:
+        return None
+    try:
+        return Retry().parse_retry_after(value)
+    except InvalidHeader:
+        return None
+
+
+class RetryLoop:
+    """Retries of a request whose attempts are sent by the caller rather than by urllib3."""
+
+    def __init__(self, retry, method: str, url: str, deadline: "Deadline" = None):
+        self.retry = retry
+        self.method = method
+        self.url = url
+        self.deadline = deadline
+        self.retries = retry.total if retry is not None and method in retry.allowed_methods else 0
+        self.attempt = 0
+
+    def next_delay(self, response=None, error: Exception = None) -> Optional[float]:
+        """
+        Seconds to wait before retrying after `response`, or after `error` when the attempt
+        failed. Running out of retries raises `error`, or `XCoverHttpException` for a response;
+        so does a delay reaching past the deadline.
+        """
+        observer = self.retry.observer if self.retry is not None else None
+        status_code = None
+        if response is None:
+            if self.attempt >= self.retries:
+                raise error
+            delay = None
+        else:
+            status_code = response.status_code
+            delay = retry_after(status_code, response.headers.get("Retry-After"))
+            if not self.retries or not self.retry.is_retry(
+                self.method, status_code, has_retry_after=delay is not None
+            ):
+                return None
+            if observer is not None:
+                observer.observe_response(self.url, status_code, response.headers)
+            if self.attempt >= self.retries:
+                raise XCoverHttpException(
+                    f"Max retries exceeded with url: {self.url} "
+                    f"(too many {status_code} error responses)"
+                )
+
+        if observer is not None:
+            observer.on_retry(status_code, error)
+        self.attempt += 1
+        if delay is None:
+            delay = backoff_time(self.retry.backoff_factor, self.attempt)
+        if self.deadline is not None and not self.deadline.allows(delay):
+            raise XCoverHttpException(f"Call deadline exceeded with url: {self.url}")
+        return delay
@@ -0,0 +1,91 @@
+import threading
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Hashable, Optional
+
+from .exceptions import XCoverDeadlineExceeded
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from .timeouts import Deadline
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-safe request coalescing: concurrent `do()` calls with one key share one call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    def do(self, key: Hashable, func: Callable, deadline: Optional["Deadline"] = None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(None if deadline is None else deadline.remaining()):
+                deadline.exceeded = True
+                raise XCoverDeadlineExceeded(deadline.seconds)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """asyncio flavour of `SingleFlight`, running the shared call in its own task."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, "asyncio.Task"] = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(
+        self, key: Hashable, func: Callable[[], Awaitable], deadline: Optional["Deadline"] = None
+    ):
+        import asyncio
+
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda done: self._done(key, done))
+        if deadline is None:
+            return await asyncio.shield(task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), deadline.remaining())
+        except asyncio.TimeoutError:
+            if task.done():
+                raise
+            deadline.exceeded = True
+            raise XCoverDeadlineExceeded(deadline.seconds) from None
+
+    def _done(self, key: Hashable, task: "asyncio.Task"):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved even when every caller has been cancelled
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,912 @@
+"""In-memory fake of the XCover partner API for offline load simulation."""
+
+import asyncio
+import base64
+import gzip
+import hmac
+import json
+import math
+import random
+import re
+import string
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta, timezone
+from http.client import responses as reasons
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Mapping, Optional, Tuple
+from urllib.parse import parse_qs
+from urllib.parse import quote as url_quote
+from urllib.parse import urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .compression import body_digest
+from .config import AuthConfig, PartnerConfig, SignatureAlgorithm, XCoverConfig
+from .models import to_datetime
+from .retry import RetryLoop
+from .timeouts import Deadline, Timeout, connect_read
+from .transport import Request, Response, Transport, add_query, build_retry
+from .utils import endpoint_family, endpoint_template
+
+FAKE_BASE_URL = "https://fake.xcover.test/api/v2/"
+
+ID_CHARS = string.ascii_uppercase + string.digits
+TOKEN_CHARS = string.ascii_letters + string.digits
+CURRENCY_SYMBOLS = {"GBP": "£", "EUR": "€", "USD": "$", "AUD": "A$"}
+DECOMPRESSORS = {"gzip": gzip.decompress, "deflate": zlib.decompress}
+
+# Statuses of quote packages that aren't bookings
+QUOTE_STATUSES = frozenset({"RECEIVED", "OPTED_OUT"})
+
+LatencyDistribution = Callable[[random.Random], float]
+
+
+def constant(seconds: float) -> LatencyDistribution:
+    return lambda rng: seconds
+
+
+def uniform(low: float, high: float) -> LatencyDistribution:
+    return lambda rng: rng.uniform(low, high)
+
+
+def exponential(mean: float) -> LatencyDistribution:
+    return lambda rng: rng.expovariate(1 / mean)
+
+
+def lognormal(median: float, sigma: float = 0.5) -> LatencyDistribution:
+    """Latencies around `median` with a long tail, the usual shape of API latencies."""
+    return lambda rng: rng.lognormvariate(math.log(median), sigma)
+
+
+@dataclass
+class Faults:
+    """Latency, 429s, 5xx and timeouts injected by `FakeXCover`."""
+
+    latency: Optional[LatencyDistribution] = None
+    throttle_rate: float = 0
+    retry_after: Optional[float] = 1
+    error_rate: float = 0
+    error_statuses: Tuple[int, ...] = (500, 502, 503, 504)
+    timeout_rate: float = 0
+
+    def draw(self, rng: random.Random) -> Tuple[Optional[int], float]:
+        """Status forced on a request (`None` to process it) and its latency, `inf` if lost."""
+        latency = self.latency(rng) if self.latency is not None else 0.0
+        roll = rng.random()
+        if roll < self.throttle_rate:
+            return 429, latency
+        roll -= self.throttle_rate
+        if roll < self.error_rate:
+            return rng.choice(self.error_statuses), latency
+        roll -= self.error_rate
+        if roll < self.timeout_rate:
+            return None, math.inf
+        return None, latency
+
+
+@dataclass
+class FakeResponse:
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+    latency: float = 0.0
+
+    @property
+    def timed_out(self) -> bool:
+        return self.latency == math.inf
+
+
+class FakeError(Exception):
+    """Error answered by the fake, with XCover's error body."""
+
+    TYPES = {400: "parse_error", 401: "authentication_error", 404: "not_found", 429: "throttled"}
+
+    def __init__(self, status: int, *errors):
+        super().__init__(status, *errors)
+        self.status = status
+        self.body = {
+            "type": self.TYPES.get(
+                status, "server_error" if status >= 500 else "validation_error"
+            ),
+            "message": "An API error occurred.",
+            "errors": list(errors),
+        }
+
+
+def now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def timestamp(value: datetime = None) -> str:
+    return (value or now()).isoformat().replace("+00:00", "Z")
+
+
+def parse_datetime(value) -> datetime:
+    try:
+        parsed = to_datetime(value)
+    except (TypeError, ValueError):
+        parsed = None
+    return parsed or now()
+
+
+def price_of(item: dict) -> float:
+    """Price of a quote request, growing with the value of its tickets like staging prices."""
+    value = 0.0
+    for ticket in item.get("tickets") or ():
+        if isinstance(ticket, dict):
+            value += float(ticket.get("price") or 0)
+    return round(2 + value / 12000, 2)
+
+
+def formatted(amount: float, currency: str) -> str:
+    return f"{CURRENCY_SYMBOLS.get(currency, currency + ' ')}{amount:.2f}"
+
+
+def parse_authorization(value: Optional[str]) -> Dict[str, str]:
+    if not value or not value.startswith("Signature "):
+        raise FakeError(401, "Authorization header is missing or malformed.")
+    return dict(re.findall(r'(\w+)="([^"]*)"', value))
+
+
+def route(pattern: str):
+    """Regex matching an endpoint path, without trailing slash, `{name}` matching an id."""
+    return re.compile(re.sub(r"{(\w+)}", r"(?P<\1>[^/]+)", pattern))
+
+
+class FakeXCover:
+    """Thread-safe in-memory XCover partner API, reproducible with `seed`."""
+
+    ROUTES = [
+        ("POST", route("quotes"), "create_quote"),
+        ("GET", route("quotes/{quote_id}"), "get_quote"),
+        ("PATCH", route("quotes/{quote_id}"), "update_quote"),
+        ("POST", route("quotes/{quote_id}/add"), "add_quotes"),
+        ("POST", route("quotes/{quote_id}/delete"), "delete_quotes"),
+        ("POST", route("bookings/{quote_id}/opt_out"), "opt_out"),
+        ("POST", route("bookings/{quote_id}"), "create_booking"),
+        ("POST", route("instant_booking"), "instant_booking"),
+        ("GET", route("bookings"), "list_bookings"),
+        ("GET", route("bookings/{booking_id}"), "get_booking"),
+        ("PATCH", route("bookings/{booking_id}"), "modify_booking"),
+        ("PUT", route("bookings/{booking_id}/confirm"), "confirm_booking"),
+        ("POST", route("bookings/{booking_id}/send_email"), "send_email"),
+        ("PATCH", route("bookings/{booking_id}/quote_for_update"), "quote_for_update"),
+        ("POST", route("bookings/{booking_id}/confirm_update/{update_id}"), "confirm_update"),
+        ("POST", route("bookings/{booking_id}/cancel"), "cancel_booking"),
+        (
+            "POST",
+            route("bookings/{booking_id}/confirm_cancellation/{cancellation_id}"),
+            "confirm_cancellation",
+        ),
+        ("PATCH", route("renewals/{booking_id}/quote_for_renewal"), "quote_for_renewal"),
+        ("POST", route("renewals/{booking_id}/confirm/{renewal_id}"), "confirm_renewal"),
+        ("POST", route("renewals/{booking_id}/opt_out"), "renewal_opt_out"),
+        ("GET", route("bookings/{booking_id}/instalments"), "get_instalments"),
+        ("POST", route("bookings/{booking_id}/instalments"), "update_instalments"),
+    ]
+
+    def __init__(
+        self,
+        faults: Faults = None,
+        endpoint_faults: Dict[str, Faults] = None,
+        seed: int = None,
+    ):
+        self.faults = faults or Faults()
+        self.endpoint_faults = endpoint_faults or {}
+        self.random = random.Random(seed)
+        self.partners: Dict[str, PartnerConfig] = {}
+        self.packages: Dict[str, Dict[str, dict]] = {}  # partner code -> id -> quote package
+        self.pending: Dict[str, tuple] = {}  # cancellation, update or renewal id -> change
+        self.instalments: Dict[str, dict] = {}  # quote id -> instalments of the quote
+        self.idempotent: Dict[tuple, Tuple[int, bytes]] = {}
+        self.calls = Counter()  # (endpoint template, status) -> number of requests
+        self._lock = threading.RLock()
+
+    # Partners and clients
+    def add_partner(self, partner: PartnerConfig):
+        with self._lock:
+            self.partners[partner.partner_code] = partner
+            self.packages.setdefault(partner.partner_code, {})
+
+    def add_config(self, config: XCoverConfig):
+        """Register the partner of `config` and its other `partners`."""
+        self.add_partner(
+            PartnerConfig(
+                config.partner_code,
+                config.auth_api_key,
+                config.auth_api_secret,
+                config.auth_algorithm,
+            )
+        )
+        for partner in config.partners:
+            self.add_partner(partner)
+
+    def client(self, config: XCoverConfig, **kwargs):
+        """`XCover` sending its calls to this fake in process, its partners registered."""
+        from .xcover import XCover
+
+        config = replace(config, base_url=config.base_url or FAKE_BASE_URL)
+        self.add_config(config)
+        client = XCover(config, **kwargs)
+        client._transport = FakeTransport(config, self, observer=client)
+        return client
+
+    def async_client(self, config: XCoverConfig, **kwargs):
+        """`AsyncXCover` sending its calls to this fake in process, its partners registered."""
+        from .aio import AsyncXCover
+
+        config = replace(config, base_url=config.base_url or FAKE_BASE_URL)
+        self.add_config(config)
+        return AsyncXCover(config, transport=FakeAsyncTransport(self), **kwargs)
+
+    # Requests
+    def handle(self, method: str, url: str, headers: Mapping, body: bytes = b"") -> FakeResponse:
+        """
+        Answer a request to `url` (absolute, or a path with its query) made of `headers` and
+        the `body` as sent. The response's `latency` is how long the caller should wait
+        before delivering it, `inf` when it should time out.
+        """
+        headers = {name.lower(): value for name, value in headers.items()}
+        parts = urlsplit(url)
+        partner_code, _, endpoint = parts.path.partition("/partners/")[2].partition("/")
+        template = endpoint_template(endpoint)
+        faults = self.endpoint_faults.get(template) or self.endpoint_faults.get(
+            endpoint_family(endpoint), self.faults
+        )
+        with self._lock:
+            status, latency = faults.draw(self.random)
+
+        if status is None:
+            response = self.respond(method, url, partner_code, endpoint, headers, body)
+        else:
+            response = json_response(status, FakeError(status, reasons.get(status, "")).body)
+            if status == 429 and faults.retry_after is not None:
+                response.headers["Retry-After"] = str(faults.retry_after)
+        response.latency = latency
+        with self._lock:
+            self.calls[(template, response.status)] += 1
+        return response
+
+    def respond(
+        self, method: str, url: str, partner_code: str, endpoint: str, headers: dict, body: bytes
+    ) -> FakeResponse:
+        try:
+            self.verify(partner_code, method, url, headers, body)
+            handler, ids = self.route(method, endpoint)
+            payload = self.decode(headers, body)
+            key = headers.get("x-idempotency-key")
+            with self._lock:
+                if key and (partner_code, key) in self.idempotent:
+                    status, content = self.idempotent[(partner_code, key)]
+                    return FakeResponse(status, json_headers(content), content)
+                status, data = handler(partner_code, payload, url, **ids)
+                response = json_response(status, data)
+                if key:
+                    self.idempotent[(partner_code, key)] = (status, response.body)
+                return response
+        except FakeError as exc:
+            return json_response(exc.status, exc.body)
+
+    def verify(self, partner_code: str, method: str, url: str, headers: dict, body: bytes):
+        """Check the signature with `AuthConfig.build_string_to_sign`, as XCover does."""
+        partner = self.partners.get(partner_code)
+        if partner is None:
+            raise FakeError(401, f"Unknown partner: {partner_code}")
+        params = parse_authorization(headers.get("authorization"))
+        if params.get("keyId") != partner.auth_api_key:
+            raise FakeError(401, "Invalid API key.")
+        try:
+            algorithm = SignatureAlgorithm(params.get("algorithm"))
+        except ValueError:
+            raise FakeError(401, f"Unsupported algorithm: {params.get('algorithm')}")
+
+        config = AuthConfig(
+            partner.auth_api_key, partner.auth_api_secret, algorithm, params.get("headers", "")
+        )
+        missing = [
+            name
+            for name in config.headers_as_list
+            if name != "(request-target)" and name not in headers
+        ]
+        if missing or "date" not in config.headers_as_list:
+            raise FakeError(401, f"Signed headers are missing: {', '.join(missing) or 'date'}")
+        if "digest" in headers and headers["digest"] != body_digest(body):
+            raise FakeError(401, "Digest doesn't match the body.")
+
+        string_to_sign = config.build_string_to_sign(Request(method, url, headers, body))
+        mac = hmac.new(partner.auth_api_secret.encode(), digestmod=config.hash_function)
+        mac.update(string_to_sign.encode("utf-8"))
+        expected = url_quote(base64.b64encode(mac.digest()), safe="")
+        if not hmac.compare_digest(expected, params.get("signature", "")):
+            raise FakeError(401, "Invalid signature.")
+
+    def route(self, method: str, endpoint: str) -> Tuple[Callable, dict]:
+        path = endpoint.rstrip("/")
+        for route_method, pattern, name in self.ROUTES:
+            match = pattern.fullmatch(path)
+            if match is not None and route_method == method:
+                return getattr(self, name), match.groupdict()
+        raise FakeError(404, f"No endpoint {method} {endpoint}")
+
+    @staticmethod
+    def decode(headers: dict, body: bytes):
+        encoding = headers.get("content-encoding")
+        try:
+            if encoding:
+                body = DECOMPRESSORS[encoding](body)
+            return json.loads(body) if body else {}
+        except (KeyError, OSError, zlib.error, ValueError):
+            raise FakeError(400, "Request body can't be decoded.")
+
+    # State
+    def random_id(self, groups: int, chars: str = ID_CHARS, suffix: str = None) -> str:
+        parts = ["".join(self.random.choices(chars, k=5)) for _ in range(groups)]
+        if suffix:
+            parts.append(suffix)
+        return "-".join(parts)
+
+    def random_uuid(self) -> str:
+        return str(uuid.UUID(int=self.random.getrandbits(128), version=4))
+
+    def new_quote(self, item: dict, currency: str, status: str) -> dict:
+        price = price_of(item)
+        start = parse_datetime(item.get("policy_start_date"))
+        end = parse_datetime(item.get("event_datetime") or item.get("policy_end_date"))
+        created_at = timestamp()
+        return {
+            "id": self.random_uuid(),
+            "policy_start_date": timestamp(start),
+            "policy_end_date": timestamp(max(start, end)),
+            "status": status,
+            "price": price,
+            "price_formatted": formatted(price, currency),
+            "policy": {
+                "policy_type": item.get("policy_type"),
+                "policy_version": item.get("policy_type_version"),
+            },
+            "insured": [],
+            "tax": {"total_tax": round(price * 0.55, 2)},
+            "created_at": created_at,
+            "confirmed_at": created_at if status == "CONFIRMED" else None,
+            "updated_at": created_at,
+            "cancelled_at": None,
+            "is_renewable": True,
+            "can_be_cancelled": status == "CONFIRMED",
+            "extra_fields": item,
+        }
+
+    def new_package(self, partner_code: str, payload: dict, status: str) -> dict:
+        items = payload.get("request")
+        if not items or not isinstance(items, list):
+            raise FakeError(422, {"request": ["This field is required."]})
+
+        package_id = self.random_id(2, suffix="INS")
+        currency = payload.get("currency") or "GBP"
+        created_at = timestamp()
+        package = {
+            "id": package_id,
+            "status": status,
+            "currency": currency,
+            "partner_transaction_id": payload.get("partner_transaction_id"),
+            "created_at": created_at,
+            "updated_at": created_at,
+            "pds_url": f"https://staging.xcover.com/en/pds/{package_id}",
+            "security_token": self.random_id(4, TOKEN_CHARS),
+            "quotes": [self.new_quote(item, currency, status) for item in items],
+            "policyholder": payload.get("policyholder"),
+        }
+        self.packages[partner_code][package_id] = update_totals(package)
+        return package
+
+    def package(self, partner_code: str, package_id: str, *statuses: str) -> dict:
+        package = self.packages[partner_code].get(package_id)
+        if package is None:
+            raise FakeError(404, f"Quote package {package_id} not found.")
+        if statuses and package["status"] not in statuses:
+            raise FakeError(422, f"Quote package {package_id} is {package['status']}.")
+        return package
+
+    def booking(self, partner_code: str, booking_id: str, *statuses: str) -> dict:
+        package = self.packages[partner_code].get(booking_id)
+        if package is None or package["status"] in QUOTE_STATUSES:
+            raise FakeError(404, f"Booking {booking_id} not found.")
+        return self.package(partner_code, booking_id, *statuses)
+
+    def add_pending(self, suffix: str, partner_code: str, booking_id: str, change) -> str:
+        pending_id = self.random_id(3, TOKEN_CHARS, suffix)
+        self.pending[pending_id] = (suffix, partner_code, booking_id, change)
+        return pending_id
+
+    def take_pending(self, suffix: str, partner_code: str, booking_id: str, pending_id: str):
+        pending = self.pending.get(pending_id)
+        if pending is None or pending[:3] != (suffix, partner_code, booking_id):
+            raise FakeError(404, f"{pending_id} not found for booking {booking_id}.")
+        del self.pending[pending_id]
+        return pending[3]
+
+    def confirm(self, package: dict, payload: dict):
+        package["status"] = "CONFIRMED"
+        package["updated_at"] = timestamp()
+        if payload.get("policyholder"):
+            package["policyholder"] = payload["policyholder"]
+        plans = {
+            item.get("id"): item.get("instalment_plan")
+            for item in payload.get("quotes") or ()
+            if isinstance(item, dict)
+        }
+        for quote in package["quotes"]:
+            quote.update(
+                status="CONFIRMED",
+                confirmed_at=package["updated_at"],
+                updated_at=package["updated_at"],
+                can_be_cancelled=True,
+            )
+            if plans.get(quote["id"]):
+                self.instalments[quote["id"]] = self.payment_schedule(quote)
+
+    def payment_schedule(self, quote: dict, payments: int = 12) -> dict:
+        amount = round(quote["price"] / payments, 2)
+        start = parse_datetime(quote["policy_start_date"])
+        schedule = [
+            {
+                "id": self.random_uuid(),
+                "number": number + 1,
+                "quote": quote["id"],
+                "period_start_date": timestamp(start + timedelta(days=30 * number)),
+                "period_end_date": timestamp(start + timedelta(days=30 * (number + 1))),
+                "status": "PAID" if number == 0 else "UNPAID",
+                "commission": 0.0,
+                "total_amount": amount,
+                "tax": {"total_tax": round(amount * 0.55, 2)},
+            }
+            for number in range(payments)
+        ]
+        return {"id": quote["id"], "payment_schedule": schedule}
+
+    # Quotes
+    def create_quote(self, partner_code, payload, url):
+        package = self.new_package(partner_code, payload, "RECEIVED")
+        # Created quotes come back as a `{"0": ..., "1": ...}` mapping, as XCover does
+        return 201, {**package, "quotes": dict(enumerate(package["quotes"]))}
+
+    def get_quote(self, partner_code, payload, url, quote_id):
+        return 200, self.package(partner_code, quote_id)
+
+    def update_quote(self, partner_code, payload, url, quote_id):
+        package = self.package(partner_code, quote_id, "RECEIVED")
+        if payload.get("request"):
+            currency = payload.get("currency") or package["currency"]
+            package["currency"] = currency
+            package["quotes"] = [
+                self.new_quote(item, currency, "RECEIVED") for item in payload["request"]
+            ]
+        return 200, update_totals(package)
+
+    def add_quotes(self, partner_code, payload, url, quote_id):
+        package = self.package(partner_code, quote_id, "RECEIVED")
+        for item in payload.get("request") or ():
+            package["quotes"].append(self.new_quote(item, package["currency"], "RECEIVED"))
+        return 200, update_totals(package)
+
+    def delete_quotes(self, partner_code, payload, url, quote_id):
+        package = self.package(partner_code, quote_id, "RECEIVED")
+        deleted = {
+            item.get("id") if isinstance(item, dict) else item
+            for item in payload.get("quotes") or ()
+        }
+        package["quotes"] = [quote for quote in package["quotes"] if quote["id"] not in deleted]
+        return 200, update_totals(package)
+
+    def opt_out(self, partner_code, payload, url, quote_id):
+        package = self.package(partner_code, quote_id, "RECEIVED")
+        package["status"] = "OPTED_OUT"
+        for quote in package["quotes"]:
+            quote["status"] = "OPTED_OUT"
+        return 204, None
+
+    # Bookings
+    def create_booking(self, partner_code, payload, url, quote_id):
+        package = self.package(partner_code, quote_id, "RECEIVED")
+        if not payload.get("policyholder"):
+            raise FakeError(422, {"policyholder": ["This field is required."]})
+        self.confirm(package, payload)
+        return 200, package
+
+    def instant_booking(self, partner_code, payload, url):
+        if not payload.get("policyholder"):
+            raise FakeError(422, {"policyholder": ["This field is required."]})
+        package = self.new_package(partner_code, payload, "RECEIVED")
+        self.confirm(package, payload)
+        return 200, package
+
+    def list_bookings(self, partner_code, payload, url):
+        parts = urlsplit(url)
+        query = parse_qs(parts.query)
+        try:
+            limit = int(query.get("limit", ["10"])[0])
+            offset = int(query.get("offset", ["0"])[0])
+        except ValueError:
+            raise FakeError(400, "limit and offset must be integers.")
+        bookings = [
+            package
+            for package in self.packages[partner_code].values()
+            if package["status"] not in QUOTE_STATUSES
+        ]
+
+        end = offset + limit
+
+        def page_url(page_offset):
+            params = {"limit": limit, "offset": page_offset} if page_offset else {"limit": limit}
+            return urlunsplit(parts._replace(query=urlencode(params)))
+
+        return 200, {
+            "count": len(bookings),
+            "next": page_url(end) if end < len(bookings) else None,
+            "previous": page_url(max(0, offset - limit)) if offset else None,
+            "results": bookings[offset:end],
+        }
+
+    def get_booking(self, partner_code, payload, url, booking_id):
+        return 200, self.booking(partner_code, booking_id)
+
+    def modify_booking(self, partner_code, payload, url, booking_id):
+        booking = self.booking(partner_code, booking_id, "CONFIRMED")
+        policyholder = payload.get("policyholder") or {}
+        phone = policyholder.get("phone")
+        if phone is not None and not re.fullmatch(r"\+?\d{6,15}", str(phone)):
+            raise FakeError(422, {"policyholder": {"phone": ["Enter a valid phone number."]}})
+        booking["policyholder"] = {**(booking["policyholder"] or {}), **policyholder}
+        booking["updated_at"] = timestamp()
+        return 200, booking
+
+    def confirm_booking(self, partner_code, payload, url, booking_id):
+        package = self.package(partner_code, booking_id, "RECEIVED", "CONFIRMED")
+        if package["status"] == "RECEIVED":
+            self.confirm(package, payload)
+        return 201, package
+
+    def send_email(self, partner_code, payload, url, booking_id):
+        booking = self.booking(partner_code, booking_id)
+        if payload.get("event") == "BOOKING_CANCELLED" and booking["status"] != "CANCELLED":
+            raise FakeError(
+                422, "BOOKING_CANCELLED email can be only triggered for CANCELLED bookings."
+            )
+        return 202, None
+
+    # Modifications
+    def quote_for_update(self, partner_code, payload, url, booking_id):
+        booking = self.booking(partner_code, booking_id, "CONFIRMED")
+        quotes = {quote["id"]: quote for quote in booking["quotes"]}
+        prices = {}
+        for item in payload.get("quotes") or ():
+            quote = quotes.get(item.get("id"))
+            if quote is None:
+                raise FakeError(422, {"quotes": [f"Unknown quote {item.get('id')}."]})
+            fields = item.get("update_fields") or {}
+            prices[quote["id"]] = price_of({**quote["extra_fields"], **fields})
+
+        update = {
+            **booking,
+            "quotes": [
+                {
+                    **quote,
+                    "price": prices.get(quote["id"], quote["price"]),
+                    "price_diff": round(
+                        prices.get(quote["id"], quote["price"]) - quote["price"], 2
+                    ),
+                }
+                for quote in booking["quotes"]
+            ],
+        }
+        update_totals(update)
+        update["total_price_diff"] = round(update["total_price"] - booking["total_price"], 2)
+        update["update_id"] = self.add_pending("UPD", partner_code, booking_id, prices)
+        return 200, update
+
+    def confirm_update(self, partner_code, payload, url, booking_id, update_id):
+        prices = self.take_pending("UPD", partner_code, booking_id, update_id)
+        booking = self.booking(partner_code, booking_id, "CONFIRMED")
+        for quote in booking["quotes"]:
+            if quote["id"] in prices:
+                quote["price"] = prices[quote["id"]]
+                quote["price_formatted"] = formatted(quote["price"], booking["currency"])
+        booking["updated_at"] = timestamp()
+        return 201, update_totals(booking)
+
+    # Cancellations
+    def cancel_booking(self, partner_code, payload, url, booking_id):
+        booking = self.booking(partner_code, booking_id, "CONFIRMED")
+        if not payload.get("preview"):
+            return 200, cancel(booking)
+
+        preview = cancel(json.loads(json.dumps(booking)), preview=True)
+        preview["cancellation_id"] = self.add_pending("CCL", partner_code, booking_id, None)
+        preview["confirm_before"] = timestamp(now() + timedelta(days=1))
+        return 200, preview
+
+    def confirm_cancellation(self, partner_code, payload, url, booking_id, cancellation_id):
+        self.take_pending("CCL", partner_code, booking_id, cancellation_id)
+        booking = cancel(self.booking(partner_code, booking_id, "CONFIRMED"))
+        return 200, {**booking, "cancellation_id": None, "confirm_before": None}
+
+    # Renewals
+    def quote_for_renewal(self, partner_code, payload, url, booking_id):
+        booking = self.booking(partner_code, booking_id, "CONFIRMED")
+        if not all(quote["is_renewable"] for quote in booking["quotes"]):
+            raise FakeError(422, f"Booking {booking_id} isn't renewable.")
+        renewal_id = self.add_pending("RNW", partner_code, booking_id, None)
+        return 200, {**booking, "renewal_id": renewal_id}
+
+    def confirm_renewal(self, partner_code, payload, url, booking_id, renewal_id):
+        self.take_pending("RNW", partner_code, booking_id, renewal_id)
+        booking = self.booking(partner_code, booking_id, "CONFIRMED")
+        for quote in booking["quotes"]:
+            start = parse_datetime(quote["policy_start_date"])
+            end = parse_datetime(quote["policy_end_date"])
+            quote["policy_start_date"] = timestamp(end)
+            quote["policy_end_date"] = timestamp(end + max(end - start, timedelta(days=1)))
+        booking["updated_at"] = timestamp()
+        return 200, booking
+
+    def renewal_opt_out(self, partner_code, payload, url, booking_id):
+        booking = self.booking(partner_code, booking_id, "CONFIRMED")
+        for quote in booking["quotes"]:
+            quote["is_renewable"] = False
+        return 204, None
+
+    # Instalments
+    def get_instalments(self, partner_code, payload, url, booking_id):
+        booking = self.booking(partner_code, booking_id)
+        quotes = []
+        for quote in booking["quotes"]:
+            instalments = self.instalments.get(quote["id"])
+            if instalments is None:
+                continue
+            schedule = instalments["payment_schedule"]
+            paid = [item for item in schedule if item["status"] == "PAID"]
+            unpaid = [item for item in schedule if item["status"] != "PAID"]
+            quotes.append(
+                {
+                    **instalments,
+                    "paid_until": paid[-1]["period_end_date"] if paid else None,
+                    "next_payment": unpaid[0] if unpaid else None,
+                }
+            )
+        return 200, {"quotes": quotes, "currency": booking["currency"]}
+
+    def update_instalments(self, partner_code, payload, url, booking_id):
+        self.booking(partner_code, booking_id)
+        for item in payload.get("quotes") or ():
+            schedule = self.instalments.get(item.get("id"), {}).get("payment_schedule", [])
+            number = item.get("instalment_number")
+            if not 0 < (number or 0) <= len(schedule):
+                raise FakeError(422, {"quotes": [f"Unknown instalment {number}."]})
+            schedule[number - 1]["status"] = item.get("payment_status") or "PAID"
+        return 204, None
+
+
+def update_totals(package: dict) -> dict:
+    currency = package["currency"]
+    total = round(sum(quote["price"] for quote in package["quotes"]), 2)
+    tax = round(sum(quote["tax"]["total_tax"] for quote in package["quotes"]), 2)
+    for quote in package["quotes"]:
+        quote["price_formatted"] = formatted(quote["price"], currency)
+    package.update(
+        total_price=total,
+        total_price_formatted=formatted(total, currency),
+        total_tax=tax,
+        total_tax_formatted=formatted(tax, currency),
+        total_premium=round(total - tax, 2),
+        total_premium_formatted=formatted(round(total - tax, 2), currency),
+    )
+    return package
+
+
+def cancel(booking: dict, preview: bool = False) -> dict:
+    cancelled_at = None if preview else timestamp()
+    booking["status"] = "CANCELLED"
+    for quote in booking["quotes"]:
+        quote.update(status="CANCELLED", refund_value=quote["price"], can_be_cancelled=False)
+        quote["cancelled_at"] = cancelled_at
+    booking["total_refund"] = booking["total_price"]
+    booking["total_refund_formatted"] = formatted(booking["total_price"], booking["currency"])
+    return booking
+
+
+def json_headers(content: bytes) -> Dict[str, str]:
+    return {"Content-Type": "application/json"} if content else {}
+
+
+def json_response(status: int, data) -> FakeResponse:
+    content = json.dumps(data).encode() if data is not None else b""
+    return FakeResponse(status, json_headers(content), content)
+
+
+class FakeTransport(Transport):
+    """Transport handing requests to a `FakeXCover` in process."""
+
+    name = "fake"
+    errors = (requests.RequestException,)
+
+    def __init__(self, config: XCoverConfig, engine: FakeXCover, observer=None):
+        super().__init__(config, observer)
+        self.engine = engine
+        self.retry = build_retry(config, observer=observer)
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        data=None,
+        params=None,
+        headers: dict = None,
+        auth: Callable = None,
+        auto_retry: bool = False,
+        record=None,
+        timeout: Timeout = None,
+        deadline: Deadline = None,
+    ) -> Response:
+        started = time.perf_counter() if record is not None else 0.0
+        url = add_query(url, params)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        request = Request(method, url, CaseInsensitiveDict(headers or {}), data)
+        if auth is not None:
+            auth(request)
+        if record is not None:
+            started = record.mark("prepare", started)
+
+        path = urlsplit(request.url).path
+        retries = RetryLoop(self.retry if auto_retry else None, method, path, deadline)
+        response = self.send_with_retries(request, retries, timeout, deadline)
+        if record is not None:
+            record.mark("send", started)
+        return response
+
+    def send_with_retries(
+        self,
+        request: Request,
+        retries: RetryLoop,
+        timeout: Timeout = None,
+        deadline: Deadline = None,
+    ) -> Response:
+        while True:
+            try:
+                response = self.attempt(request, timeout, deadline)
+            except requests.exceptions.ReadTimeout as exc:
+                delay = retries.next_delay(error=exc)
+            else:
+                delay = retries.next_delay(response)
+                if delay is None:
+                    return response
+
+            time.sleep(delay)
+            self.report("before_retry", retries.url, deadline)
+
+    def report(self, event: str, *args, **kwargs):
+        if self.observer is not None:
+            getattr(self.observer, event)(*args, **kwargs)
+
+    def attempt(self, request: Request, timeout: Timeout = None, deadline: Deadline = None):
+        read = connect_read(self.config.http_timeout if timeout is None else timeout)[1]
+        if deadline is not None:
+            read = min(read, deadline.remaining())
+
+        fake = self.engine.handle(request.method, request.url, request.headers, request.body)
+        if fake.latency >= read:
+            time.sleep(read)
+            raise requests.exceptions.ReadTimeout(
+                f"Read timed out. (read timeout={read})", request=request
+            )
+        time.sleep(fake.latency)
+        return Response(
+            status_code=fake.status,
+            reason=reasons.get(fake.status, ""),
+            url=request.url,
+            headers=CaseInsensitiveDict(fake.headers),
+            content=fake.body,
+            request=request,
+        )
+
+
+class FakeAsyncTransport:
+    """httpx async transport handing requests to a `FakeXCover`, for `AsyncXCover`."""
+
+    def __init__(self, engine: FakeXCover):
+        self.engine = engine
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def handle_async_request(self, request):
+        # Imported on first use, httpx being only needed by the asyncio client
+        import httpx
+
+        body = await request.aread()
+        fake = self.engine.handle(request.method, str(request.url), request.headers, body)
+        read = (request.extensions.get("timeout") or {}).get("read")
+        if read is not None and fake.latency >= read:
+            await asyncio.sleep(read)
+            raise httpx.ReadTimeout(f"Read timed out. (read timeout={read})", request=request)
+        await asyncio.sleep(fake.latency if fake.latency != math.inf else 3600)
+        return httpx.Response(fake.status, headers=fake.headers, content=fake.body)
+
+    async def aclose(self):
+        pass
+
+
+class FakeXCoverServer:
+    """Local HTTP server answering with a `FakeXCover`."""
+
+    def __init__(
+        self, engine: FakeXCover = None, host: str = "127.0.0.1", port: int = 0, hang: float = 60
+    ):
+        self.engine = engine or FakeXCover()
+        self.hang = hang
+        self.stopped = threading.Event()
+        self.httpd = ThreadingHTTPServer((host, port), self.handler_class())
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        """Base URL to configure clients with."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def handle_request(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length)
+                fake = server.engine.handle(self.command, self.path, self.headers, body)
+                if fake.timed_out:
+                    server.stopped.wait(server.hang)
+                    self.close_connection = True
+                    return
+                if server.stopped.wait(fake.latency):
+                    self.close_connection = True
+                    return
+
+                self.send_response(fake.status)
+                for name, value in fake.headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(fake.body)))
+                self.end_headers()
+                self.wfile.write(fake.body)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_request
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
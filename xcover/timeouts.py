@@ -0,0 +1,88 @@
+"""Per endpoint or adaptive timeouts of each attempt, and deadlines of whole calls."""
+
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple, Union
+
+from .hedging import LatencyTracker
+from .utils import endpoint_family, endpoint_template
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class Deadline:
+    """Time by which a call, with every retry, must be done."""
+
+    __slots__ = ("seconds", "expires", "exceeded")
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+        self.exceeded = False
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.exceeded or time.monotonic() >= self.expires
+
+    def allows(self, delay: float) -> bool:
+        """Whether another attempt can start after a `delay`, else mark the deadline exceeded."""
+        if time.monotonic() + delay >= self.expires:
+            self.exceeded = True
+        return not self.exceeded
+
+
+# Deadline of the call being sent in this context, read by retries made inside urllib3
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("xcover_deadline", default=None)
+
+
+def connect_read(timeout: Timeout) -> Tuple[float, float]:
+    return timeout if isinstance(timeout, tuple) else (timeout, timeout)
+
+
+class Timeouts:
+    """Timeout of each attempt of a partner call, per endpoint or adaptive."""
+
+    def __init__(
+        self,
+        default: Timeout,
+        endpoints: Dict[str, Timeout] = None,
+        adaptive: bool = False,
+        percentile: float = 0.99,
+        factor: float = 3,
+        minimum: float = 1,
+    ):
+        self.default = default
+        self.endpoints = endpoints or {}
+        self.percentile = percentile
+        self.factor = factor
+        self.minimum = minimum
+        self.latencies = LatencyTracker() if adaptive else None
+
+    def configured(self, template: str) -> Timeout:
+        timeout = self.endpoints.get(template)
+        if timeout is None:
+            timeout = self.endpoints.get(endpoint_family(template), self.default)
+        return timeout
+
+    def timeout(self, url: str) -> Optional[Timeout]:
+        """Timeout for a call to `url` (relative to `partners/{code}/`), `None` for the default."""
+        if not self.endpoints and self.latencies is None:
+            return None
+
+        template = endpoint_template(url)
+        timeout = self.configured(template)
+        if self.latencies is None:
+            return timeout
+
+        latency = self.latencies.percentile(template, self.percentile)
+        if latency is None:
+            return timeout
+        connect, read = connect_read(timeout)
+        return connect, min(read, max(self.minimum, self.factor * latency))
+
+    def observe(self, url: str, latency: float):
+        if self.latencies is not None:
+            self.latencies.observe(endpoint_template(url), latency)
@@ -0,0 +1,473 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.client import responses as reasons
+from http.cookiejar import DefaultCookiePolicy
+from typing import Callable, Optional, Type, Union
+from urllib.parse import urlencode, urljoin, urlparse
+
+import requests
+import urllib3
+from requests import certs
+from requests.adapters import HTTPAdapter
+from requests.models import DEFAULT_REDIRECT_LIMIT
+from requests.utils import DEFAULT_ACCEPT_ENCODING, default_user_agent
+from urllib3 import exceptions as urllib3_errors
+from urllib3._collections import HTTPHeaderDict
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from .config import XCoverConfig
+from .exceptions import XCoverError, XCoverHttpException
+from .hooks import CallRecord, TracedPoolMixin
+from .retry import RETRY_METHODS, RETRY_STATUS_CODES
+from .timeouts import Deadline, Timeout, connect_read, current_deadline
+
+
+class XCoverRetry(Retry):
+    """`Retry` reporting retries to the client and letting it delay them."""
+
+    def __init__(self, *args, observer=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.observer = observer
+        self.url = None
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.observer = self.observer
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, **kwargs):
+        if self.observer is not None and response is not None:
+            self.observer.observe_response(url, response.status, response.headers)
+
+        retry = super().increment(method, url, response, error, _pool, **kwargs)
+        retry.url = url
+        deadline = current_deadline.get()
+        if deadline is not None and not deadline.allows(retry.delay(response)):
+            reason = error or urllib3_errors.ResponseError("call deadline exceeded")
+            raise urllib3_errors.MaxRetryError(_pool, url, reason)
+        if self.observer is not None:
+            self.observer.on_retry(response.status if response is not None else None, error)
+        return retry
+
+    def delay(self, response=None) -> float:
+        """Seconds `sleep` will wait before the next attempt."""
+        if self.respect_retry_after_header and response is not None:
+            retry_after = self.get_retry_after(response)
+            if retry_after:
+                return retry_after
+        return self.get_backoff_time()
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        if self.observer is not None and self.url is not None:
+            self.observer.before_retry(self.url, current_deadline.get())
+
+
+def build_retry(config: XCoverConfig, observer=None) -> Retry:
+    return XCoverRetry(
+        total=config.retry_total,
+        backoff_factor=config.retry_backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=RETRY_METHODS,
+        respect_retry_after_header=True,
+        observer=observer,
+    )
+
+
+class DeadlineTimeout(urllib3.Timeout):
+    """`Timeout` whose copy made for each attempt is cut to the time left before `deadline`."""
+
+    def __init__(self, timeout: Timeout, deadline: Deadline):
+        connect, read = connect_read(timeout)
+        super().__init__(connect=connect, read=read)
+        self.deadline = deadline
+
+    def clone(self) -> urllib3.Timeout:
+        remaining = self.deadline.remaining()
+        if not remaining:
+            self.deadline.exceeded = True
+            raise urllib3_errors.ReadTimeoutError(None, None, "call deadline exceeded")
+        return urllib3.Timeout(
+            connect=remaining if self._connect is None else min(self._connect, remaining),
+            read=remaining if self._read is None else min(self._read, remaining),
+        )
+
+
+def build_timeout(timeout: Timeout, deadline: Deadline = None) -> urllib3.Timeout:
+    if deadline is not None:
+        return DeadlineTimeout(timeout, deadline)
+    connect, read = connect_read(timeout)
+    return urllib3.Timeout(connect=connect, read=read)
+
+
+class TracedHTTPConnectionPool(TracedPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class TracedHTTPSConnectionPool(TracedPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+TRACED_POOL_CLASSES = {"http": TracedHTTPConnectionPool, "https": TracedHTTPSConnectionPool}
+
+
+class TracedHTTPAdapter(HTTPAdapter):
+    """`HTTPAdapter` whose pools report connection phases to the current `CallRecord`."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = TRACED_POOL_CLASSES
+
+
+class Transport:
+    """Sends the requests built by `XCover.call`, like `requests.Session.send` would."""
+
+    name = None
+    errors = ()
+
+    def __init__(self, config: XCoverConfig, observer=None):
+        self.config = config
+        self.observer = observer
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        data=None,
+        params=None,
+        headers: dict = None,
+        auth: Callable = None,
+        auto_retry: bool = False,
+        record: Optional[CallRecord] = None,
+        timeout: Timeout = None,
+        deadline: Deadline = None,
+    ):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class RequestsTransport(Transport):
+    """Default transport: a pooled `requests.Session` per retry policy."""
+
+    name = "requests"
+    errors = (requests.RequestException,)
+
+    def __init__(self, config: XCoverConfig, observer=None):
+        super().__init__(config, observer)
+        self._session = None
+        self._auto_retry_session = None
+        self._session_lock = threading.Lock()
+
+    def _build_session(self, max_retries=0) -> requests.Session:
+        session = requests.Session()
+        # Sessions are shared between threads, so keep them stateless
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = TracedHTTPAdapter(
+            pool_connections=self.config.pool_connections,
+            pool_maxsize=self.config.pool_maxsize,
+            pool_block=self.config.pool_block,
+            max_retries=max_retries,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        return session
+
+    @property
+    def auto_retry_session(self) -> requests.Session:
+        if self._auto_retry_session is None:
+            with self._session_lock:
+                if self._auto_retry_session is None:
+                    self._auto_retry_session = self._build_session(
+                        max_retries=build_retry(self.config, observer=self.observer)
+                    )
+
+        return self._auto_retry_session
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._build_session()
+
+        return self._session
+
+    def close(self):
+        with self._session_lock:
+            for session in (self._session, self._auto_retry_session):
+                if session is not None:
+                    session.close()
+            self._session = None
+            self._auto_retry_session = None
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        data=None,
+        params=None,
+        headers: dict = None,
+        auth: Callable = None,
+        auto_retry: bool = False,
+        record: Optional[CallRecord] = None,
+        timeout: Timeout = None,
+        deadline: Deadline = None,
+    ) -> requests.Response:
+        started = time.perf_counter() if record is not None else 0.0
+        session = self.auto_retry_session if auto_retry else self.session
+
+        request = requests.Request(
+            method, url, data=data, params=params, auth=auth, headers=headers
+        )
+        prepared_request: requests.PreparedRequest = session.prepare_request(request)
+        if record is not None:
+            started = record.mark("prepare", started)
+
+        if timeout is None:
+            timeout = self.config.http_timeout
+        if deadline is not None:
+            timeout = build_timeout(timeout, deadline)
+
+        token = current_deadline.set(deadline)
+        try:
+            response = session.send(prepared_request, timeout=timeout, stream=True)
+        except requests.exceptions.RetryError as exc:
+            raise XCoverHttpException(exc)
+        finally:
+            current_deadline.reset(token)
+        if record is not None:
+            started = record.mark("send", started)
+
+        # Read the body so that the connection goes back to the pool
+        response.content
+        if record is not None:
+            record.mark("read", started)
+
+        return response
+
+
+def add_query(url: str, params=None) -> str:
+    """`url` with `params` (a mapping or an encoded query string) appended to its query."""
+    if not params:
+        return url
+    query = params if isinstance(params, str) else urlencode(params, doseq=True)
+    return f"{url}{'&' if '?' in url else '?'}{query}"
+
+
+class Request:
+    """What `auth` callables read from a request, as in `requests.PreparedRequest`."""
+
+    __slots__ = ("method", "url", "headers", "body")
+
+    def __init__(self, method: str, url: str, headers, body: Optional[bytes]):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+
+
+class Response:
+    """Fully read response of `Urllib3Transport`, with the parts of `requests.Response` used."""
+
+    __slots__ = ("status_code", "reason", "url", "headers", "content", "request")
+
+    def __init__(self, status_code: int, reason: str, url: str, headers, content, request):
+        self.status_code = status_code
+        self.reason = reason
+        self.url = url
+        self.headers = headers
+        self.content = content
+        self.request = request
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", "replace")
+
+    def json(self, **kwargs):
+        return json.loads(self.content, **kwargs)
+
+
+# urllib3 error -> `requests` exception raised by `requests.adapters.HTTPAdapter` in its place
+ERROR_CLASSES = (
+    (urllib3_errors.ConnectTimeoutError, requests.exceptions.ConnectTimeout),
+    (urllib3_errors.SSLError, requests.exceptions.SSLError),
+    (urllib3_errors.ReadTimeoutError, requests.exceptions.ReadTimeout),
+    (urllib3_errors.InvalidHeader, requests.exceptions.InvalidHeader),
+)
+
+
+@contextmanager
+def requests_errors(request: Request):
+    """
+    Raise urllib3 errors as the `requests` exceptions `RequestsTransport` raises, and exhausted
+    retries as `XCoverHttpException`.
+    """
+    try:
+        yield
+    except (urllib3_errors.HTTPError, OSError) as exc:
+        reason = exc.reason if isinstance(exc, urllib3_errors.MaxRetryError) else exc
+        if isinstance(reason, urllib3_errors.ResponseError):
+            raise XCoverHttpException(requests.exceptions.RetryError(exc, request=request))
+        for urllib3_error, error_class in ERROR_CLASSES:
+            if isinstance(reason, urllib3_error):
+                break
+        else:
+            error_class = requests.exceptions.ConnectionError
+        raise error_class(exc, request=request)
+
+
+def redirect_request(request: Request, response) -> Request:
+    """Request following the redirect `response`, changed the way `requests` changes it."""
+    url = urljoin(request.url, response.get_redirect_location())
+    method, headers, body = request.method, HTTPHeaderDict(request.headers), request.body
+    if (response.status in (302, 303) and method != "HEAD") or (
+        response.status == 301 and method == "POST"
+    ):
+        method = "GET"
+    if response.status not in (307, 308):
+        for name in ("Content-Length", "Content-Type", "Transfer-Encoding"):
+            headers.pop(name, None)
+        body = None
+    if urlparse(url).netloc != urlparse(request.url).netloc:
+        headers.pop("Authorization", None)
+    return Request(method, url, headers, body)
+
+
+class Urllib3Transport(Transport):
+    """Transport talking to a urllib3 `PoolManager` directly, without a `requests` session."""
+
+    name = "urllib3"
+    errors = (requests.RequestException,)
+    default_headers = {
+        "User-Agent": default_user_agent(),
+        "Accept-Encoding": DEFAULT_ACCEPT_ENCODING,
+        "Accept": "*/*",
+    }
+
+    def __init__(self, config: XCoverConfig, observer=None):
+        super().__init__(config, observer)
+        self.pool = urllib3.PoolManager(
+            num_pools=config.pool_connections,
+            maxsize=config.pool_maxsize,
+            block=config.pool_block,
+            cert_reqs="CERT_REQUIRED",
+            ca_certs=certs.where(),
+        )
+        self.pool.pool_classes_by_scheme = TRACED_POOL_CLASSES
+        self.retry = build_retry(config, observer=observer)
+        self.no_retry = Retry(0, read=False)
+        self.timeout = build_timeout(config.http_timeout)
+
+    def close(self):
+        self.pool.clear()
+
+    def attempt_timeout(self, timeout: Timeout = None, deadline: Deadline = None):
+        if timeout is None and deadline is None:
+            return self.timeout
+        return build_timeout(self.config.http_timeout if timeout is None else timeout, deadline)
+
+    def urlopen(self, request: Request, auto_retry: bool, timeout: Timeout, deadline: Deadline):
+        """Send `request`, following redirects. Returns the last request sent and its response."""
+        response = self._urlopen(request, auto_retry, timeout, deadline)
+        redirects = 0
+        while response.get_redirect_location():
+            response.drain_conn()
+            response.release_conn()
+            if redirects == DEFAULT_REDIRECT_LIMIT:
+                raise requests.TooManyRedirects(
+                    f"Exceeded {DEFAULT_REDIRECT_LIMIT} redirects.", request=request
+                )
+            redirects += 1
+            request = redirect_request(request, response)
+            response = self._urlopen(request, auto_retry, timeout, deadline)
+        return request, response
+
+    def _urlopen(self, request: Request, auto_retry: bool, timeout: Timeout, deadline: Deadline):
+        with requests_errors(request):
+            return self.pool.urlopen(
+                request.method,
+                request.url,
+                body=request.body,
+                headers=request.headers,
+                retries=self.retry if auto_retry else self.no_retry,
+                redirect=False,
+                assert_same_host=False,
+                preload_content=False,
+                decode_content=True,
+                timeout=self.attempt_timeout(timeout, deadline),
+            )
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        data=None,
+        params=None,
+        headers: dict = None,
+        auth: Callable = None,
+        auto_retry: bool = False,
+        record: Optional[CallRecord] = None,
+        timeout: Timeout = None,
+        deadline: Deadline = None,
+    ) -> Response:
+        started = time.perf_counter() if record is not None else 0.0
+        url = add_query(url, params)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        request = Request(method, url, HTTPHeaderDict(self.default_headers), data)
+        if headers:
+            request.headers.update(headers)
+        if auth is not None:
+            auth(request)
+        if record is not None:
+            started = record.mark("prepare", started)
+
+        token = current_deadline.set(deadline)
+        try:
+            request, response = self.urlopen(request, auto_retry, timeout, deadline)
+        finally:
+            current_deadline.reset(token)
+        if record is not None:
+            started = record.mark("send", started)
+
+        try:
+            with requests_errors(request):
+                content = response.read()
+        finally:
+            response.release_conn()
+        if record is not None:
+            record.mark("read", started)
+
+        return Response(
+            status_code=response.status,
+            reason=response.reason or reasons.get(response.status, ""),
+            url=request.url,
+            headers=response.headers,
+            content=content,
+            request=request,
+        )
+
+
+TRANSPORTS = {transport.name: transport for transport in (RequestsTransport, Urllib3Transport)}
+
+
+def get_transport(transport: Union[str, Type[Transport], None] = "requests") -> Type[Transport]:
+    """Resolve `XCoverConfig.transport`: a `Transport` subclass or the name of a built-in one."""
+    if isinstance(transport, type) and issubclass(transport, Transport):
+        return transport
+
+    try:
+        return TRANSPORTS[transport or RequestsTransport.name]
+    except KeyError:
+        raise XCoverError(f"Unknown transport: {transport}")
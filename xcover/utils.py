@@ -1,6 +1,77 @@
+import time
 from datetime import datetime, timezone
+from typing import Optional
+
+HTTP_DATE_FORMAT = "%a, %d %b %Y %H:%M:%S GMT"  # RFC 7231 format
+
+_http_date_cache = (None, "")
 
 
 def http_date():
     now = datetime.now(timezone.utc)
-    return now.strftime("%a, %d %b %Y %H:%M:%S GMT")  # RFC 7231 format
+    return now.strftime(HTTP_DATE_FORMAT)
+
+
+def cached_http_date():
+    """Same value as `http_date`, formatted at most once per second."""
+    global _http_date_cache
+
+    second = int(time.time())
+    cached_second, value = _http_date_cache
+    if cached_second != second:
+        value = datetime.fromtimestamp(second, timezone.utc).strftime(HTTP_DATE_FORMAT)
+        _http_date_cache = (second, value)
+
+    return value
+
+
+ENDPOINT_FAMILIES = ("quotes", "bookings", "renewals", "instalments")
+
+
+def endpoint_family(url: str) -> str:
+    """
+    Family (quotes, bookings, renewals, instalments) of a partner endpoint, given either the URL
+    relative to `partners/{code}/` or any URL containing it. Unknown endpoints are "other".
+    """
+    path = url.split("?", 1)[0]
+    if "partners/" in path:
+        path = path.split("partners/", 1)[1].partition("/")[2]
+    path = path.lstrip("/")
+
+    prefix = path.partition("/")[0]
+    if prefix == "bookings" and "/instalments" in path:
+        return "instalments"
+    if prefix == "instant_booking":
+        return "bookings"
+    if prefix in ENDPOINT_FAMILIES:
+        return prefix
+    return "other"
+
+
+def endpoint_partner(url: str) -> Optional[str]:
+    """Partner code of a URL containing `partners/{code}/`, `None` for relative URLs."""
+    path = url.split("?", 1)[0]
+    if "partners/" not in path:
+        return None
+    return path.split("partners/", 1)[1].partition("/")[0] or None
+
+
+# Name of the id following each of these path segments in partner endpoint URLs
+ENDPOINT_ID_NAMES = {
+    "quotes": "quote_id",
+    "bookings": "booking_id",
+    "renewals": "booking_id",
+    "confirm": "renewal_id",
+    "confirm_update": "update_id",
+    "confirm_cancellation": "cancellation_id",
+}
+
+
+def endpoint_template(url: str) -> str:
+    """Partner endpoint URL with ids replaced by placeholders, e.g. `bookings/{booking_id}/`."""
+    segments = url.split("?", 1)[0].split("/")
+    for index in range(1, len(segments)):
+        name = ENDPOINT_ID_NAMES.get(segments[index - 1])
+        if name and segments[index]:
+            segments[index] = f"{{{name}}}"
+    return "/".join(segments)
@@ -0,0 +1,140 @@
+"""Chains of dependent calls, such as quote -> book -> confirm -> email for one customer."""
+
+import inspect
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class Step:
+    """A call of a workflow: `call(client, results)` gets the results of the previous steps."""
+
+    name: str
+    call: Callable
+
+
+@dataclass
+class Workflow:
+    name: Optional[str] = None
+    steps: List[Step] = field(default_factory=list)
+
+    def then(self, name: str, call: Callable) -> "Workflow":
+        if any(step.name == name for step in self.steps):
+            raise ValueError(f"Duplicate step name: {name}")
+        self.steps.append(Step(name, call))
+        return self
+
+    def run(self, client, errors: Tuple = (Exception,)) -> "WorkflowResult":
+        result = WorkflowResult(self.name)
+        for step in self.steps:
+            try:
+                result.results[step.name] = step.call(client, result.results)
+            except errors as exc:
+                result.error, result.failed_step = exc, step.name
+                break
+        return result
+
+    async def run_async(self, client, errors: Tuple = (Exception,)) -> "WorkflowResult":
+        result = WorkflowResult(self.name)
+        for step in self.steps:
+            try:
+                value = step.call(client, result.results)
+                if inspect.isawaitable(value):
+                    value = await value
+                result.results[step.name] = value
+            except errors as exc:
+                result.error, result.failed_step = exc, step.name
+                break
+        return result
+
+
+@dataclass
+class WorkflowResult:
+    """Outcome of a workflow: the results of the steps run and the error that stopped it."""
+
+    name: Optional[str] = None
+    results: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[Exception] = None
+    failed_step: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def quote_ids(package) -> List[str]:
+    """Ids of the quotes of a quote package, as a dict or as a `QuotePackage`."""
+    quotes = package.get("quotes") or []
+    if isinstance(quotes, dict):
+        quotes = [quote for _, quote in sorted(quotes.items(), key=lambda item: int(item[0]))]
+    return [quote.get("id") for quote in quotes]
+
+
+def booking_workflow(
+    quote_payload: dict,
+    policyholder: dict,
+    booking_payload: dict = None,
+    confirm: bool = True,
+    email: bool = False,
+    name: str = None,
+) -> Workflow:
+    """`create_quote`, `create_booking` of all its quotes, `confirm_booking`, `trigger_email`."""
+
+    def book(client, results):
+        quote = results["quote"]
+        payload = {
+            "quotes": [{"id": quote_id} for quote_id in quote_ids(quote)],
+            "policyholder": policyholder,
+            **(booking_payload or {}),
+        }
+        return client.create_booking(quote.get("id"), payload)
+
+    workflow = Workflow(name)
+    workflow.then("quote", lambda client, results: client.create_quote(quote_payload))
+    workflow.then("booking", book)
+    if confirm:
+        workflow.then(
+            "confirmation",
+            lambda client, results: client.confirm_booking(results["booking"].get("id")),
+        )
+    if email:
+        workflow.then(
+            "email", lambda client, results: client.trigger_email(results["booking"].get("id"))
+        )
+    return workflow
+
+
+def cancellation_workflow(booking_id: str, payload: dict = None, name: str = None) -> Workflow:
+    """Preview a cancellation with `cancel_booking`, then `confirm_booking_cancellation`."""
+    return (
+        Workflow(name or booking_id)
+        .then(
+            "cancellation",
+            lambda client, results: client.cancel_booking(
+                booking_id, {"preview": True, **(payload or {})}
+            ),
+        )
+        .then(
+            "confirmation",
+            lambda client, results: client.confirm_booking_cancellation(
+                booking_id, results["cancellation"]["cancellation_id"]
+            ),
+        )
+    )
+
+
+def modification_workflow(booking_id: str, payload: dict, name: str = None) -> Workflow:
+    """`booking_modification_quote`, then `confirm_booking_modification` of its update."""
+    return (
+        Workflow(name or booking_id)
+        .then(
+            "quote",
+            lambda client, results: client.booking_modification_quote(booking_id, payload),
+        )
+        .then(
+            "confirmation",
+            lambda client, results: client.confirm_booking_modification(
+                booking_id, results["quote"]["update_id"]
+            ),
+        )
+    )
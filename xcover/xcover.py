@@ -1,46 +1,116 @@
-import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Tuple, Union
 from urllib.parse import urljoin
-from uuid import uuid4
 
-import requests
-from requests.adapters import HTTPAdapter
-from requests.exceptions import RetryError
-from urllib3.util.retry import Retry
-
-from .auth import XCoverAuth
+from .base import BaseXCover
+from .batch import BatchResult, unpack_call
+from .cache import resource_id
+from .circuitbreaker import CircuitBreaker
 from .config import XCoverConfig
-from .encoder import JSONEncoder
-from .exceptions import XCoverHttpException
+from .dispatch import Dispatcher
+from .exceptions import XCoverDeadlineExceeded, XCoverError, XCoverHttpException
+from .hedging import Hedging
+from .hooks import current_call
+from .models import Booking
+from .ratelimit import RateLimiter
+from .singleflight import SingleFlight
+from .timeouts import Deadline, Timeout
+from .utils import endpoint_family, endpoint_template
+from .workflow import Workflow, WorkflowResult
+
+if TYPE_CHECKING:
+    import requests
+
+    from .transport import Transport
 
 
-class XCover:
-    def __init__(self, config: XCoverConfig = None):
-        self.config = config or XCoverConfig()
+class XCover(BaseXCover):
+    def __init__(
+        self,
+        config: XCoverConfig = None,
+        rate_limiter: RateLimiter = None,
+        circuit_breaker: CircuitBreaker = None,
+    ):
+        super().__init__(config, rate_limiter=rate_limiter, circuit_breaker=circuit_breaker)
+        if self.config.coalesce_gets:
+            self.singleflight = SingleFlight()
+        self.hedging = None
+        if self.config.hedge_gets:
+            self.hedging = Hedging(
+                delay=self.config.hedge_delay or None,
+                max_rate=self.config.hedge_max_rate,
+                max_workers=2 * self.config.pool_maxsize,
+            )
+        self._transport = None
+        self._transport_lock = threading.Lock()
+        self._dispatcher = None
+        self._dispatcher_lock = threading.Lock()
 
-    default_headers = {"Content-Type": "application/json"}
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
     @property
-    def auto_retry_session(self):
-        session = requests.Session()
-        retries = Retry(
-            total=self.config.retry_total,
-            backoff_factor=self.config.retry_backoff_factor,
-            status_forcelist={429, 502, 503, 504},
-            allowed_methods={"HEAD", "GET", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"},
-            respect_retry_after_header=True,
-        )
-        adapter = HTTPAdapter(max_retries=retries)
-        session.mount("https://", adapter)
+    def transport(self) -> "Transport":
+        # Built on first use: importing the HTTP stack is most of the cost of a cold start
+        if self._transport is None:
+            with self._transport_lock:
+                if self._transport is None:
+                    from .transport import get_transport
+
+                    self._transport = get_transport(self.config.transport)(
+                        self.config, observer=self
+                    )
+        return self._transport
 
-        return session
+    @property
+    def errors(self) -> tuple:
+        """Exceptions raised by calls that failed: XCover errors and transport errors."""
+        return (XCoverError,) + self.transport.errors
+
+    @property
+    def auto_retry_session(self) -> "requests.Session":
+        return self.transport.auto_retry_session
 
     @property
-    def session(self):
-        return requests.Session()
+    def session(self) -> "requests.Session":
+        return self.transport.session
 
     @property
-    def partner_code(self):
-        return self.config.partner_code
+    def dispatcher(self) -> Dispatcher:
+        if self._dispatcher is None:
+            with self._dispatcher_lock:
+                if self._dispatcher is None:
+                    self._dispatcher = Dispatcher(
+                        workers=self.config.dispatch_workers,
+                        maxsize=self.config.dispatch_queue_size,
+                        overflow=self.config.dispatch_overflow,
+                    )
+        return self._dispatcher
+
+    def dispatch(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        Run `func(*args, **kwargs)`, typically an endpoint method of this client such as
+        `client.trigger_email`, on the dispatch queue and return a future of its result.
+        """
+        return self.dispatcher.submit(func, *args, **kwargs)
+
+    def close(self):
+        """Run the calls left on the dispatch queue, then release connections."""
+        with self._dispatcher_lock:
+            dispatcher, self._dispatcher = self._dispatcher, None
+        if dispatcher is not None:
+            dispatcher.shutdown(timeout=self.config.dispatch_drain_timeout)
+        if self.hedging is not None:
+            self.hedging.close()
+        if self._transport is not None:
+            self._transport.close()
 
     def call(
         self,
@@ -50,232 +120,217 @@ class XCover:
         params=None,
         headers: dict = None,
         auto_retry: bool = False,
-    ) -> requests.Response:
-        if headers is None:
-            headers = {}
-        full_url = urljoin(self.config.base_url, url)
-        session = self.auto_retry_session if auto_retry else self.session
-
-        request = requests.Request(
+        timeout: Timeout = None,
+        deadline: Deadline = None,
+        partner: str = None,
+    ) -> "requests.Response":
+        record = current_call.get()
+        started = time.perf_counter() if record is not None else 0.0
+
+        data, headers = self.encode(payload, headers)
+        if record is not None:
+            record.mark("encode", started)
+
+        send = partial(
+            self.transport.send,
             method,
-            full_url,
-            data=json.dumps(payload, cls=JSONEncoder),
+            urljoin(self.config.base_url, url),
+            data=data,
             params=params,
-            auth=XCoverAuth(self.config.auth_config),
-            headers={**self.default_headers, **headers},
+            headers=headers,
+            auto_retry=auto_retry,
+            timeout=timeout,
+            deadline=deadline,
         )
-        prepared_request: requests.PreparedRequest = session.prepare_request(request)
-        response = session.send(prepared_request, timeout=self.config.http_timeout)
-
-        return response
+        auth = self.signer(partner)
+        if record is None:
+            traced_send = partial(send, auth=auth)
+        else:
+            traced_send = partial(send, auth=self.traced_auth, record=record)
+
+        if self.hedging is not None and method == "GET":
+            return self.hedging.run(
+                endpoint_template(url), partial(send, auth=auth), traced_send, record
+            )
+        return traced_send()
 
     def call_partner_endpoint(
-        self, method, url, payload=None, generate_idepmotency_key=True, **kwargs
+        self,
+        method,
+        url,
+        payload=None,
+        generate_idepmotency_key=True,
+        use_cache=True,
+        model=None,
+        **kwargs,
     ):
-        # Generate full URL
-        full_url = urljoin(f"partners/{self.partner_code}/", url)
-
-        # Call server
-        if method in {"POST", "PUT", "PATCH"} and generate_idepmotency_key:
-            headers = kwargs.pop("headers", {})
-            headers.setdefault("x-idempotency-key", str(uuid4()))
-            kwargs["headers"] = headers
+        self.add_idempotency_key(method, kwargs, generate_idepmotency_key)
+        self.add_timeouts(url, kwargs)
+
+        with self.tracing(method, url, kwargs) as record:
+            # Serve from cache
+            cache_key = self.cache_key(method, url, kwargs, use_cache)
+            if cache_key is not None:
+                content = self.cache.get(cache_key)
+                if content is not None:
+                    if record is not None:
+                        record.cached = True
+                    return self.decode(content, record, model)
+                cache_token = self.cache.token()
+
+            # Call server
+            response = self._shared_request(method, url, payload, kwargs)
+            if record is not None:
+                record.status_code = response.status_code
+
+            # Check response for errors
+            if response.status_code >= 400:
+                self.raise_for_status(response.status_code, response.reason, response.url)
+
+            if response.status_code in (204, 202):
+                return True
+
+            if cache_key is not None:
+                self.cache.set(cache_key, resource_id(url), response.content, cache_token)
+
+            return self.decode(response.content, record, model)
+
+    def _shared_request(self, method: str, url: str, payload, kwargs: dict):
+        # Concurrent identical GETs share one upstream request
+        coalesce_key = self.coalesce_key(method, url, kwargs)
+        if coalesce_key is None:
+            return self._request(method, url, payload, kwargs)
+        return self.singleflight.do(
+            coalesce_key,
+            partial(self._request, method, url, payload, kwargs),
+            kwargs.get("deadline"),
+        )
 
+    def _admit(self, family: str, partner: str, deadline: Deadline = None):
+        """Wait for the circuit breaker and rate limiter to let a call through in time."""
+        if deadline is not None and deadline.expired:
+            raise XCoverDeadlineExceeded(deadline.seconds)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_call(family, partner)
+        try:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(family, partner, deadline)
+            if deadline is not None and deadline.expired:
+                raise XCoverDeadlineExceeded(deadline.seconds)
+        except BaseException:
+            # Not sent, so a half-open circuit's probe slot goes to the next call
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.release(family, partner)
+            raise
+
+    def _request(self, method: str, url: str, payload, kwargs: dict) -> "requests.Response":
+        family, partner = endpoint_family(url), self.call_partner(url, kwargs.get("partner"))
+        deadline = kwargs.get("deadline")
+        self._admit(family, partner, deadline)
+
+        started = time.perf_counter()
         try:
-            response = self.call(method, full_url, payload=payload, **kwargs)
-        except RetryError as exc:
-            raise XCoverHttpException(exc)
-
-        # Check response for errors
-        error_msg = None
-        if 400 <= response.status_code < 500:
-            error_msg = (
-                f"{response.status_code} Client Error: {response.reason} for url {response.url}"
+            response = self.call(
+                method, self.partner_url(url, kwargs.get("partner")), payload=payload, **kwargs
             )
+        except (XCoverHttpException,) + self.transport.errors as exc:
+            self.record_failure(url, partner)
+            if deadline is not None and deadline.expired:
+                raise XCoverDeadlineExceeded(deadline.seconds) from exc
+            raise
+        finally:
+            self.invalidate_cache(method, url)
+
+        self.timeouts.observe(url, time.perf_counter() - started)
+        self.record_response(url, response, partner)
+        return response
 
-        elif 500 <= response.status_code < 600:
-            error_msg = (
-                f"{response.status_code} Server Error: {response.reason} for url {response.url}"
+    def call_many(self, calls: Iterable[Tuple], max_concurrency: int = None) -> List[BatchResult]:
+        """
+        Run `call_partner_endpoint` for each `(method, url[, kwargs])` item using a pool of
+        threads sharing this client's connection pool. Results are returned in input order;
+        a failed call is reported in its `BatchResult` instead of aborting the batch.
+        """
+        calls = [unpack_call(call) for call in calls]
+        if not calls:
+            return []
+
+        errors = self.errors
+
+        def execute(call):
+            method, url, kwargs = call
+            try:
+                return BatchResult(result=self.call_partner_endpoint(method, url, **kwargs))
+            except errors as exc:
+                return BatchResult(error=exc)
+
+        max_workers = min(max_concurrency or self.config.pool_maxsize, len(calls))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(execute, calls))
+
+    def run_workflows(
+        self, workflows: Iterable[Workflow], max_concurrency: int = None
+    ) -> List[WorkflowResult]:
+        """
+        Run each workflow's steps in order, with up to `max_concurrency` workflows running at
+        once. Results are returned in input order; a failed step stops its workflow only.
+        """
+        workflows = list(workflows)
+        if not workflows:
+            return []
+
+        errors = self.errors + (LookupError,)
+        max_workers = min(max_concurrency or self.config.pool_maxsize, len(workflows))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda workflow: workflow.run(self, errors), workflows))
+
+    def iter_bookings(
+        self, page_size: int = 100, prefetch: int = 2, **filters
+    ) -> Iterator[Union[dict, Booking]]:
+        """
+        Yield bookings one by one across all `list_bookings` pages. Pages are requested
+        by `limit`/`offset` and up to `prefetch` following pages are fetched in the
+        background while the current one is consumed, so at most `prefetch + 1` pages
+        are held in memory. `filters` are sent as query parameters, except `partner`, which
+        selects the partner whose bookings are listed.
+        """
+        partner = filters.pop("partner", None) or self.partner_code
+
+        def fetch(offset):
+            # Raw pages, bookings are wrapped one by one as they are yielded
+            return self.call_partner_endpoint(
+                "GET",
+                "bookings/",
+                params={**filters, "limit": page_size, "offset": offset},
+                partner=partner,
             )
 
-        if error_msg:
-            raise XCoverHttpException(error_msg)
-
-        if response.status_code in (204, 202):
-            return True
-
-        return response.json()
-
-    # Quotes
-    def create_quote(self, payload, **kwargs):
-        return self.call_partner_endpoint(
-            "POST", "quotes/", payload=payload, generate_idepmotency_key=False, **kwargs
-        )
-
-    def get_quote(self, quote_id, **kwargs):
-        return self.call_partner_endpoint("GET", f"quotes/{quote_id}/", **kwargs)
-
-    def update_quote(self, quote_id, payload, **kwargs):
-        return self.call_partner_endpoint(
-            "PATCH", f"quotes/{quote_id}/", payload=payload, **kwargs
-        )
-
-    def opt_out(self, quote_id, payload=None, **kwargs):
-        if payload is None:
-            payload = {}
-        return self.call_partner_endpoint(
-            "POST", f"bookings/{quote_id}/opt_out", payload=payload, **kwargs
-        )
-
-    def add_quotes(self, quote_id, payload, **kwargs):
-        return self.call_partner_endpoint(
-            "POST", f"quotes/{quote_id}/add/", payload=payload, **kwargs
-        )
-
-    def delete_quotes(self, quote_id, payload, **kwargs):
-        return self.call_partner_endpoint(
-            "POST", f"quotes/{quote_id}/delete/", payload=payload, **kwargs
-        )
-
-    # Bookings
-    def create_booking(self, quote_id, payload, auto_retry=True, **kwargs):
-        return self.call_partner_endpoint(
-            "POST", f"bookings/{quote_id}/", auto_retry=auto_retry, payload=payload, **kwargs
-        )
-
-    def instant_booking(self, payload, auto_retry=True, **kwargs):
-        return self.call_partner_endpoint(
-            "POST", "instant_booking/", payload=payload, auto_retry=auto_retry, **kwargs
-        )
-
-    def get_booking(self, booking_id, **kwargs):
-        return self.call_partner_endpoint("GET", f"bookings/{booking_id}/", **kwargs)
-
-    def list_bookings(self, **kwargs):
-        return self.call_partner_endpoint("GET", "bookings/", **kwargs)
-
-    def confirm_booking(self, booking_id, payload=None, auto_retry=True, **kwargs):
-        if payload is None:
-            payload = {}
-        return self.call_partner_endpoint(
-            "PUT",
-            f"bookings/{booking_id}/confirm",
-            payload=payload,
-            auto_retry=auto_retry,
-            **kwargs,
-        )
-
-    def trigger_email(self, booking_id, payload=None, auto_retry=True, **kwargs):
-        if payload is None:
-            payload = {}
-
-        return self.call_partner_endpoint(
-            "POST",
-            f"bookings/{booking_id}/send_email",
-            payload=payload,
-            auto_retry=auto_retry,
-            **kwargs,
-        )
-
-    # Mods
-    def booking_modification(self, booking_id, payload, auto_retry=True, **kwargs):
-        return self.call_partner_endpoint(
-            "PATCH", f"bookings/{booking_id}/", payload=payload, auto_retry=auto_retry, **kwargs
-        )
-
-    def booking_modification_quote(self, booking_id, payload, **kwargs):
-        return self.call_partner_endpoint(
-            "PATCH", f"bookings/{booking_id}/quote_for_update", payload=payload, **kwargs
-        )
-
-    def confirm_booking_modification(
-        self, booking_id, update_id, payload=None, auto_retry=True, **kwargs
-    ):
-        if payload is None:
-            payload = {}
-
-        return self.call_partner_endpoint(
-            "POST",
-            f"bookings/{booking_id}/confirm_update/{update_id}/",
-            payload=payload,
-            auto_retry=auto_retry,
-            **kwargs,
-        )
-
-    # Cancellations
-    def cancel_booking(self, booking_id, payload=None, **kwargs):
-        if payload is None:
-            payload = {}
-
-        return self.call_partner_endpoint(
-            "POST", f"bookings/{booking_id}/cancel", payload=payload, auto_retry=True, **kwargs
-        )
-
-    def confirm_booking_cancellation(
-        self, booking_id, cancellation_id, payload=None, auto_retry=True, **kwargs
-    ):
-        if payload is None:
-            payload = {}
-
-        return self.call_partner_endpoint(
-            "POST",
-            f"bookings/{booking_id}/confirm_cancellation/{cancellation_id}/",
-            payload=payload,
-            auto_retry=auto_retry,
-            **kwargs,
-        )
-
-    # Renewals
-    def quote_for_renewal(self, booking_id, payload=None, **kwargs):
-        if payload is None:
-            payload = {}
-
-        return self.call_partner_endpoint(
-            "PATCH",
-            f"renewals/{booking_id}/quote_for_renewal/",
-            payload=payload,
-            **kwargs,
-        )
-
-    def renewal_confirmation(
-        self, booking_id, renewal_id, payload=None, auto_retry=True, **kwargs
-    ):
-        if payload is None:
-            payload = {}
-
-        return self.call_partner_endpoint(
-            "POST",
-            f"renewals/{booking_id}/confirm/{renewal_id}/",
-            payload=payload,
-            auto_retry=auto_retry,
-            **kwargs,
-        )
-
-    def renewal_opt_out(self, booking_id, payload=None, auto_retry=True, **kwargs):
-        if payload is None:
-            payload = {}
-
-        return self.call_partner_endpoint(
-            "POST",
-            f"renewals/{booking_id}/opt_out/",
-            payload=payload,
-            auto_retry=auto_retry,
-            **kwargs,
-        )
-
-    # Instalments
-    def get_instalments(self, booking_id, **kwargs):
-        return self.call_partner_endpoint(
-            "GET",
-            f"bookings/{booking_id}/instalments/",
-            **kwargs,
-        )
-
-    def update_instalment_payment_status(self, booking_id, payload, auto_retry=True, **kwargs):
-        return self.call_partner_endpoint(
-            "POST",
-            f"bookings/{booking_id}/instalments/",
-            payload=payload,
-            auto_retry=auto_retry,
-            **kwargs,
-        )
+        page = fetch(0)
+        count = page.get("count")
+        next_offset = page_size
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=max(prefetch, 1)) as executor:
+            try:
+                while True:
+                    has_next = bool(page.get("next")) and bool(page["results"])
+                    while (
+                        has_next
+                        and len(pending) < prefetch
+                        and (count is None or next_offset < count)
+                    ):
+                        pending.append(executor.submit(fetch, next_offset))
+                        next_offset += page_size
+
+                    for booking in page["results"]:
+                        yield self.as_model(Booking, booking)
+
+                    if not has_next:
+                        break
+                    if not pending:
+                        pending.append(executor.submit(fetch, next_offset))
+                        next_offset += page_size
+                    page = pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()